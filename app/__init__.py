@@ -2,33 +2,91 @@
 from flask import Flask
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
-from pymongo import MongoClient
+import logging
 import os
+from config import Config
+
+logger = logging.getLogger(__name__)
 
 def create_app():
     app = Flask(__name__)
     
-    # Basic configuration
-    app.config["SECRET_KEY"] = "dev-secret-key-change-in-production"
-    app.config["JWT_SECRET_KEY"] = "jwt-secret-key-change-in-production"
-    app.config["MONGODB_URI"] = "mongodb://localhost:27017/ethiopian_vital_management"
-    app.config["UPLOAD_FOLDER"] = "./uploads"
+    # Configuration (environment variables, see config.py)
+    app.config.from_object(Config)
+    
+    # Take the client address from X-Forwarded-For when behind reverse proxies
+    if app.config['TRUSTED_PROXY_COUNT']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config['TRUSTED_PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+    
+    # JSON log lines written by a background thread, with request ids and personal data redacted
+    from app.logs import init_logging
+    init_logging(app)
+    
+    # Fast JSON encoding with native ObjectId/datetime support
+    from app.json_provider import init_json
+    init_json(app)
+    
+    # Opt-in cProfile / stack-sampling profiles of chosen or sampled requests
+    from app.profiling import init_profiling
+    init_profiling(app)
+    
+    # Latency, status and MongoDB command metrics (first in, so it times every other hook)
+    from app.metrics import init_metrics
+    init_metrics(app)
     
     # Ensure upload directory exists
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
     
-    # Initialize MongoDB
+    # Initialize MongoDB (one pooled client per process, created on first use)
     try:
-        app.mongo = MongoClient(app.config["MONGODB_URI"])
-        app.db = app.mongo.get_database()
-        print("✅ MongoDB connected successfully!")
+        from app.db import init_db
+        init_db(app)
+        logger.info('MongoDB connected')
     except Exception as e:
-        print(f"❌ MongoDB connection failed: {e}")
+        logger.error('MongoDB connection failed: %s', e)
         return None
     
+    try:
+        from app.indexes import ensure_indexes
+        ensure_indexes(app.db)
+    except Exception as e:
+        logger.warning('Index creation skipped: %s', e)
+    
+    # Slow MongoDB commands are logged with their shape and sampled with explain()
+    from app.slow_queries import init_slow_query_log
+    init_slow_query_log(app)
+    
+    # Process-local cache of user profiles shared by all blueprints
+    from app.user_context import init_user_cache
+    init_user_cache(app)
+    
+    # Listing results shared between users with the same scope and filters
+    from app.query_cache import init_query_cache
+    init_query_cache(app)
+    
+    # gzip/brotli responses, and precompressed dashboard payloads
+    from app.compression import init_compression
+    init_compression(app)
+    
+    # Bounded thread pool for bcrypt, so logins don't tie up request threads
+    from app.passwords import init_password_hasher
+    init_password_hasher(app)
+    
+    # Login throttling (in-process, or shared through MongoDB across nodes)
+    from app.rate_limit import init_login_limiter
+    init_login_limiter(app)
+    
     # Initialize extensions
-    JWTManager(app)
-    CORS(app)
+    jwt = JWTManager(app)
+    
+    # Revoked tokens are checked in memory on every request
+    from app.revocation import init_revocation
+    init_revocation(app, jwt)
+    # Browsers may read the write's operation time to request read-your-writes on replicas,
+    # and the request id to quote in bug reports
+    CORS(app, expose_headers=['X-Operation-Time', 'X-Request-ID'])
     
     # Import and register blueprints directly
     try:
@@ -50,8 +108,23 @@ def create_app():
         from app.routes.users import bp as users_bp
         app.register_blueprint(users_bp)
         
-        print("✅ All blueprints registered successfully!")
+        from app.routes.reports import bp as reports_bp
+        app.register_blueprint(reports_bp)
+        
+        from app.routes.exports import bp as exports_bp
+        app.register_blueprint(exports_bp)
+        
+        from app.routes.dashboard import bp as dashboard_bp
+        app.register_blueprint(dashboard_bp)
+        
+        from app.routes.diagnostics import bp as diagnostics_bp
+        app.register_blueprint(diagnostics_bp)
+        
+        from app.routes.metrics import bp as metrics_bp
+        app.register_blueprint(metrics_bp)
+        
+        logger.info('All blueprints registered')
     except Exception as e:
-        print(f"❌ Blueprint registration failed: {e}")
+        logger.exception('Blueprint registration failed: %s', e)
     
     return app
@@ -0,0 +1,364 @@
+"""
+Async serving mode (ASGI).
+
+`asgi.py` serves the API under an ASGI server. The read-heavy endpoints -
+record listings, record details and the dashboard statistics - run as coroutines on the server's event loop with Motor, so one
+worker keeps many MongoDB round trips in flight instead of one per thread.
+Independent queries run concurrently with asyncio.gather: a listing's page and
+its count (per its count strategy, see app/listing.py), a record's registrar
+and approver, and every dashboard count.
+All other requests go to the Flask WSGI app on a thread pool (a2wsgi).
+
+The async handlers run inside a normal Flask request context built from the
+ASGI scope, so JWT checks, the user cache, the role scopes, error handlers and
+the after-request hooks (CORS, X-Operation-Time, compression) behave as in
+the WSGI app.
+
+Needs the motor, a2wsgi and uvicorn packages:
+    uvicorn asgi:app --workers 4
+"""
+import asyncio
+import io
+import re
+import sys
+from contextlib import asynccontextmanager
+from functools import partial
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+from .compression import precompressed_response_async
+from .dashboard import officer_stat_queries, admin_stat_queries, summarize_stats, count_stats_async, record_collections, admin_collections, snapshot_key, OFFICER_TOTALS, ADMIN_TOTALS
+from .db import client_options, command_listeners, operation_options, parse_operation_time, allows_stale_reads, AFTER_OPERATION_TIME_HEADER
+from .http_cache import listing_etag, record_etag, is_not_modified, cache_headers, not_modified
+from .listing import fetch_page_async
+from .registry import REGISTRY
+from .routes.records import page_params, listing_response, detail_response, listing_cache_key, count_strategy, LISTING_SORT, TIMESTAMP_PROJECTION
+from .scope import get_scope, find_scoped_async
+from .user_context import get_current_user_async, load_user_async, load_users_async
+from .versions import version_document_async, collection_versions_async
+
+class MotorConnection:
+    """The Motor client of this process's event loop, with the same pool settings and operation classes as app.mongo"""
+
+    def __init__(self, uri, config):
+        self.uri = uri
+        self.config = config
+        self.options = client_options(config)
+        self._client = None
+        self._loop = None
+        self._databases = {}
+
+    @property
+    def client(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # A Motor client is bound to the loop it was created on
+            self._client = AsyncIOMotorClient(
+                self.uri, io_loop=loop, event_listeners=command_listeners(self.config), **self.options
+            )
+            self._loop = loop
+            self._databases = {}
+        return self._client
+
+    def get_database(self, operation='default'):
+        client = self.client
+        database = self._databases.get(operation)
+        if database is None:
+            database = client.get_database(**operation_options(self.config, operation))
+            self._databases[operation] = database
+        return database
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+        self._client = None
+        self._loop = None
+        self._databases = {}
+
+@asynccontextmanager
+async def causal_session(mongo):
+    """
+    A causally consistent session advanced to the client's X-After-Operation-Time,
+    or None when the header is absent. Sessions don't allow concurrent operations,
+    so each gathered query opens its own.
+    """
+    after = parse_operation_time(request.headers.get(AFTER_OPERATION_TIME_HEADER))
+    if after is None:
+        yield None
+        return
+    session = await mongo.client.start_session(causal_consistency=True)
+    session.advance_operation_time(after)
+    try:
+        yield session
+    finally:
+        await session.end_session()
+
+async def current_user(mongo):
+    return await get_current_user_async(mongo.get_database())
+
+# --- Handlers ----------------------------------------------------------------
+# Same responses as the Flask routes in app/routes/records.py and dashboard.py
+
+async def get_records(mongo, record_type):
+    verify_jwt_in_request()
+    try:
+        current_user_id = get_jwt_identity()
+        user = await current_user(mongo)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        filters = record_type.build_filters(user, current_user_id, request.args)
+
+        page, per_page = page_params(request.args, record_type.max_per_page)
+        skip = (page - 1) * per_page
+
+        async with causal_session(mongo) as page_session, causal_session(mongo) as count_session:
+            versions = await version_document_async(mongo.get_database('listing'), record_type.collection, session=page_session)
+            etag = listing_etag(
+                record_type.collection,
+                versions.get('version', 0),
+                filters,
+                page,
+                per_page,
+                current_app.config.get('LISTING_ETAG_TTL', 60)
+            )
+            if is_not_modified(etag):
+                return not_modified('listing', etag)
+
+            # The cache backends are synchronous; both are a local lookup (memory, or a nearby Redis)
+            query_cache = current_app.query_cache
+            key = None
+            cached = None
+            if query_cache:
+                scope = get_scope(record_type, user, current_user_id)
+                key = listing_cache_key(query_cache, record_type, versions, scope, request.args, filters, skip, per_page)
+                cached = query_cache.get(key)
+
+            if cached is not None:
+                records, total = cached
+            else:
+                records, total = await fetch_page_async(
+                    mongo.get_database('listing')[record_type.collection],
+                    filters,
+                    record_type.listing_projection,
+                    LISTING_SORT,
+                    skip,
+                    per_page,
+                    strategy=count_strategy(record_type, current_app.config),
+                    sessions=(page_session, count_session)
+                )
+                if query_cache:
+                    query_cache.set(key, (records, total))
+
+        registrars = await load_users_async(mongo.get_database(), [record.get('registered_by') for record in records])
+
+        response = jsonify(listing_response(record_type, records, registrars, total, page, per_page))
+        return cache_headers(response, 'listing', etag), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+async def get_record(mongo, record_type, record_id):
+    verify_jwt_in_request()
+    try:
+        current_user_id = get_jwt_identity()
+        user = await current_user(mongo)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        collection = mongo.get_database('detail' if allows_stale_reads() else 'default')[record_type.collection]
+        scope = get_scope(record_type, user, current_user_id, access='view')
+        async with causal_session(mongo) as session:
+            if request.if_none_match:
+                probe, status_code = await find_scoped_async(collection, record_id, scope, TIMESTAMP_PROJECTION, session=session)
+                etag = record_etag(record_type.collection, probe) if status_code == 200 else None
+                if is_not_modified(etag):
+                    return not_modified('detail', etag)
+
+            record, status_code = await find_scoped_async(collection, record_id, scope, session=session)
+        if status_code == 404:
+            return jsonify({'error': f'{record_type.label} record not found'}), 404
+        if status_code == 403:
+            return jsonify({'error': 'Permission denied'}), 403
+
+        db = mongo.get_database()
+        registrar, approver = await asyncio.gather(
+            load_user_async(db, record.get('registered_by')),
+            load_user_async(db, record.get('approved_by'))
+        )
+
+        response = jsonify(detail_response(record_type, record, registrar, approver))
+        return cache_headers(response, 'detail', record_etag(record_type.collection, record)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+async def get_admin_stats(mongo):
+    verify_jwt_in_request()
+    try:
+        user = await current_user(mongo)
+        if not user or user['role'] != 'admin':
+            return jsonify({'error': 'Permission denied'}), 403
+
+        db = mongo.get_database('listing')
+        queries = admin_stat_queries()
+
+        async def load():
+            return summarize_stats(await count_stats_async(db, queries), ADMIN_TOTALS)
+
+        key = snapshot_key('admin', queries, await collection_versions_async(db, admin_collections()))
+        return cache_headers(await precompressed_response_async(key, load), 'dashboard'), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+async def get_officer_stats(mongo):
+    verify_jwt_in_request()
+    try:
+        current_user_id = get_jwt_identity()
+        user = await current_user(mongo)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        db = mongo.get_database('listing')
+        queries = officer_stat_queries(user, current_user_id)
+
+        async def load():
+            return summarize_stats(await count_stats_async(db, queries), OFFICER_TOTALS)
+
+        key = snapshot_key('officer', queries, await collection_versions_async(db, record_collections()))
+        return cache_headers(await precompressed_response_async(key, load), 'dashboard'), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def build_routes():
+    """(method, path pattern, handler) for every endpoint served natively"""
+    routes = [
+        ('GET', re.compile(r'^/api/users/stats$'), get_admin_stats),
+        ('GET', re.compile(r'^/api/users/officer-stats$'), get_officer_stats)
+    ]
+    for record_type in REGISTRY.values():
+        prefix = re.escape(record_type.url_prefix)
+        routes += [
+            ('GET', re.compile(f'^{prefix}/?$'), partial(get_records, record_type=record_type)),
+            # Only well-formed ids; anything else falls through to Flask (export, import, ...)
+            ('GET', re.compile(f'^{prefix}/(?P<record_id>[0-9a-fA-F]{{24}})$'), partial(get_record, record_type=record_type))
+        ]
+    return routes
+
+# --- ASGI plumbing -------------------------------------------------------------
+
+def build_environ(scope, body=b''):
+    """WSGI environ for an ASGI HTTP scope, so the Flask request context can be used"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+def forwarded_environ(proxies):
+    """
+    environ -> environ with the X-Forwarded-For/-Proto of `proxies` trusted proxies
+    applied: the ProxyFix the Flask app is wrapped in (TRUSTED_PROXY_COUNT), for
+    the native routes, which never go through app.wsgi_app
+    """
+    from werkzeug.middleware.proxy_fix import ProxyFix
+
+    # ProxyFix rewrites the environ and hands it to the wrapped app, which here returns it
+    proxy_fix = ProxyFix(lambda environ, start_response: environ, x_for=proxies, x_proto=proxies)
+    return lambda environ: proxy_fix(environ, None)
+
+class AsyncApp:
+    """ASGI application: native async handlers for the routes above, Flask for the rest"""
+
+    def __init__(self, flask_app, wsgi_threads=16):
+        from a2wsgi import WSGIMiddleware
+
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=wsgi_threads)
+        proxies = flask_app.config.get('TRUSTED_PROXY_COUNT', 0)
+        self.forwarded = forwarded_environ(proxies) if proxies else None
+        self.mongo = MotorConnection(flask_app.config['MONGODB_URI'], flask_app.config)
+        self.routes = build_routes()
+
+    def match(self, scope):
+        for method, pattern, handler in self.routes:
+            if scope['method'] == method:
+                match = pattern.match(scope['path'])
+                if match:
+                    return partial(handler, **match.groupdict())
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+
+        handler = self.match(scope) if scope['type'] == 'http' else None
+        if handler is None:
+            await self.wsgi(scope, receive, send)
+            return
+
+        app = self.flask_app
+        environ = build_environ(scope)
+        if self.forwarded:
+            environ = self.forwarded(environ)
+        with app.request_context(environ):
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    rv = await handler(self.mongo)
+            except Exception as e:
+                # JWT errors and the like go through the app's error handlers
+                rv = app.handle_user_exception(e)
+            response = app.process_response(app.make_response(rv))
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()]
+        })
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.mongo.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+def create_asgi_app(flask_app):
+    return AsyncApp(flask_app, wsgi_threads=flask_app.config.get('ASGI_WSGI_THREADS', 16))
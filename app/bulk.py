@@ -0,0 +1,410 @@
+"""
+Helpers for bulk record operations: parsing uploaded batches, validating rows
+in parallel, allocating certificate numbers in blocks, batched inserts,
+bulk status transitions and batched audit logging.
+"""
+import csv
+import io
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from .registry import REGISTRY
+from .validators import validate_request_data
+
+CERTIFICATE_PREFIXES = {
+    'birth': 'BR',
+    'death': 'DR',
+    'marriage': 'MR',
+    'divorce': 'DV'
+}
+
+RECORD_STATUSES = ['draft', 'submitted', 'approved', 'rejected']
+
+# How many times a registration is renumbered when its certificate number is already taken
+CERTIFICATE_ATTEMPTS = 3
+
+def detect_format(filename, content_type, requested=None):
+    """Work out whether an upload is CSV or NDJSON"""
+    if requested:
+        return requested.lower()
+    filename = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if filename.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'ndjson'
+    return 'csv'
+
+def parse_rows(text, fmt):
+    """Parse an uploaded batch into a list of (row_number, data) pairs"""
+    rows = []
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(text))
+        for row_number, row in enumerate(reader, start=2):
+            rows.append((row_number, {k.strip(): v for k, v in row.items() if k}))
+    elif fmt == 'ndjson':
+        for row_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append((row_number, json.loads(line)))
+            except ValueError as e:
+                rows.append((row_number, {'__parse_error__': str(e)}))
+    else:
+        raise ValueError(f'Unsupported import format: {fmt}')
+
+    # Same cleaning as the single-record endpoints
+    for _, data in rows:
+        for key, value in list(data.items()):
+            if value == '' or value == 'null':
+                data[key] = None
+    return rows
+
+def validate_rows(db, record_type, rows, workers=4):
+    """
+    Validate rows in a thread pool. Returns a list of
+    (row_number, data, is_valid, errors, warnings, quality_score).
+    """
+    def validate(item):
+        row_number, data = item
+        if '__parse_error__' in data:
+            return row_number, data, False, [f"Invalid JSON: {data['__parse_error__']}"], [], 0
+        is_valid, errors, warnings, quality_score = validate_request_data(db, record_type, data)
+        return row_number, data, is_valid, errors, warnings, quality_score
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return list(executor.map(validate, rows))
+
+def allocate_certificate_numbers(db, record_type, region, woreda_code, count, year=None):
+    """
+    Reserve `count` consecutive certificate numbers with a single counter update.
+    Format: [TYPE]/[REGION]/[WOREDA]/[ET-YEAR]/[SEQUENCE]
+    """
+    if count <= 0:
+        return []
+
+    if not year:
+        year = str(datetime.now().year - 8)
+
+    woreda_code = str(woreda_code).zfill(2)
+    prefix = CERTIFICATE_PREFIXES.get(record_type, 'XX')
+
+    counter_id = f'certificate:{prefix}:{region}:{woreda_code}:{year}'
+    number_prefix = f'{prefix}/{region}/{woreda_code}/{year}/'
+    if db.counters.find_one({'_id': counter_id}, {'_id': 1}) is None:
+        # First use: continue after the numbers already issued (older versions drew them at random)
+        highest = highest_sequence(db[REGISTRY[record_type].collection], number_prefix)
+        try:
+            db.counters.update_one({'_id': counter_id}, {'$max': {'seq': highest}}, upsert=True)
+        except DuplicateKeyError:
+            # Another request created the counter first; $max is safe to repeat
+            db.counters.update_one({'_id': counter_id}, {'$max': {'seq': highest}})
+
+    counter = db.counters.find_one_and_update(
+        {'_id': counter_id},
+        {'$inc': {'seq': count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    first = counter['seq'] - count + 1
+
+    return [f"{number_prefix}{str(sequence).zfill(5)}" for sequence in range(first, first + count)]
+
+def highest_sequence(collection, number_prefix):
+    """Highest sequence among the certificate numbers starting with number_prefix"""
+    documents = collection.find(
+        {'certificate_number': {'$regex': '^' + re.escape(number_prefix)}},
+        {'certificate_number': 1, '_id': 0}
+    )
+    sequences = [document['certificate_number'][len(number_prefix):] for document in documents]
+    return max((int(sequence) for sequence in sequences if sequence.isdigit()), default=0)
+
+def is_certificate_clash(error):
+    """
+    Whether a record insert failed because its certificate number is taken.
+    `error` is a DuplicateKeyError or a bulk write error; a new record's only
+    unique key besides its fresh _id is its certificate number.
+    """
+    details = getattr(error, 'details', error) or {}
+    if getattr(error, 'code', None) != 11000 and details.get('code') != 11000:
+        return False
+    return 'certificate_number' in (details.get('keyPattern') or {'certificate_number': 1})
+
+def insert_in_batches(collection, documents, batch_size=1000, session=None):
+    """
+    Insert documents with unordered insert_many batches.
+    Returns (inserted, failed) where inserted maps document index to its _id
+    and failed maps document index to its write error (code, errmsg, ...).
+    """
+    inserted = {}
+    failed = {}
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+        try:
+            result = collection.insert_many(batch, ordered=False, session=session)
+            for offset, inserted_id in enumerate(result.inserted_ids):
+                inserted[start + offset] = inserted_id
+        except BulkWriteError as e:
+            batch_failed = {error['index']: error for error in e.details.get('writeErrors', [])}
+            for offset, document in enumerate(batch):
+                if offset in batch_failed:
+                    failed[start + offset] = batch_failed[offset]
+                else:
+                    # insert_many sets _id on every document before sending the batch
+                    inserted[start + offset] = document['_id']
+    return inserted, failed
+
+def insert_audit_logs(db, user, entries, ip_address=None):
+    """
+    Write many audit entries at once. Each entry is a dict with action,
+    record_type, record_id, details and optional changes.
+    """
+    if not entries:
+        return
+
+    now = datetime.utcnow()
+    documents = [{
+        'user_id': str(user['_id']),
+        'user_name': user.get('full_name'),
+        'user_role': user.get('role'),
+        'action': entry['action'],
+        'record_type': entry['record_type'],
+        'record_id': str(entry['record_id']),
+        'details': entry.get('details'),
+        'changes': entry.get('changes', {}),
+        'timestamp': now,
+        'ip_address': ip_address
+    } for entry in entries]
+
+    db.audit_logs.insert_many(documents, ordered=False)
+
+def import_records(db, collection, record_type, rows, current_user, build_document, describe,
+                   ip_address=None, batch_size=1000, workers=4, dry_run=False, session=None, audit_db=None):
+    """
+    Validate, number, insert and audit a batch of uploaded rows.
+    `build_document(data, certificate_number, quality_score, warnings)` turns a
+    valid row into a record; `describe(data)` names it in the audit log.
+    Inserts run in `session` when given, and audit entries go to `audit_db`
+    (default `db`). Returns a per-row report.
+    """
+    results = validate_rows(db, record_type, rows, workers)
+
+    valid = [r for r in results if r[2]]
+    errors = [{
+        'row': row_number,
+        'errors': row_errors,
+        'warnings': row_warnings
+    } for row_number, _, is_valid, row_errors, row_warnings, _ in results if not is_valid]
+
+    report = {
+        'total': len(rows),
+        'valid': len(valid),
+        'inserted': 0,
+        'failed': len(errors),
+        'dry_run': dry_run,
+        'records': [],
+        'errors': errors
+    }
+
+    if dry_run or not valid:
+        return report
+
+    certificate_numbers = allocate_certificate_numbers(
+        db,
+        record_type,
+        current_user.get('region', 'AD'),
+        current_user.get('woreda', '01'),
+        len(valid)
+    )
+
+    batch_id = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    buildable = []
+    documents = []
+    for (row_number, data, _, _, warnings, quality_score), certificate_number in zip(valid, certificate_numbers):
+        try:
+            document = build_document(data, certificate_number, quality_score, warnings)
+        except (KeyError, ValueError, TypeError) as e:
+            errors.append({'row': row_number, 'errors': [f'Could not build record: {e}'], 'warnings': warnings})
+            continue
+        document['import_batch'] = batch_id
+        documents.append(document)
+        buildable.append((row_number, data, warnings))
+
+    inserted, failed = insert_in_batches(collection, documents, batch_size, session)
+
+    # Renumber and retry the rows whose certificate number was already taken
+    for _ in range(CERTIFICATE_ATTEMPTS - 1):
+        clashes = [index for index, error in failed.items() if is_certificate_clash(error)]
+        if not clashes:
+            break
+        certificate_numbers = allocate_certificate_numbers(
+            db,
+            record_type,
+            current_user.get('region', 'AD'),
+            current_user.get('woreda', '01'),
+            len(clashes)
+        )
+        for index, certificate_number in zip(clashes, certificate_numbers):
+            documents[index]['certificate_number'] = certificate_number
+        retried, retry_failed = insert_in_batches(collection, [documents[index] for index in clashes], batch_size, session)
+        for offset, index in enumerate(clashes):
+            del failed[index]
+            if offset in retried:
+                inserted[index] = retried[offset]
+            else:
+                failed[index] = retry_failed[offset]
+
+    audit_entries = []
+    for index, (row_number, data, warnings) in enumerate(buildable):
+        if index in inserted:
+            report['records'].append({
+                'row': row_number,
+                'id': str(inserted[index]),
+                'certificate_number': documents[index]['certificate_number'],
+                'warnings': warnings
+            })
+            audit_entries.append({
+                'action': 'create',
+                'record_type': record_type,
+                'record_id': inserted[index],
+                'details': f"Imported {record_type} record for {describe(data)} (batch {batch_id})"
+            })
+        else:
+            errors.append({'row': row_number, 'errors': [failed.get(index, {}).get('errmsg', 'Insert failed')], 'warnings': warnings})
+
+    insert_audit_logs(audit_db or db, current_user, audit_entries, ip_address)
+
+    report['inserted'] = len(inserted)
+    report['failed'] = len(errors)
+    report['batch_id'] = batch_id
+    errors.sort(key=lambda e: e['row'])
+    return report
+
+def parse_record_ids(ids):
+    """Convert a list of id strings to ObjectIds, rejecting malformed ones"""
+    if not isinstance(ids, list):
+        raise ValueError('ids must be a list')
+    invalid = [str(i) for i in ids if not ObjectId.is_valid(str(i))]
+    if invalid:
+        raise ValueError(f"Invalid record ids: {', '.join(invalid[:10])}")
+    # Keep request order but drop duplicates
+    return list(dict.fromkeys(ObjectId(str(i)) for i in ids))
+
+def status_update_fields(new_status, current_user_id, now, rejection_reason=None):
+    """The $set document for a status change, matching the single-record status routes"""
+    update_data = {'status': new_status, 'updated_at': now}
+    if new_status == 'approved':
+        update_data['approved_by'] = current_user_id
+        update_data['approved_at'] = now
+    if new_status == 'rejected':
+        update_data['rejection_reason'] = rejection_reason or ''
+        update_data['rejected_by'] = current_user_id
+        update_data['rejected_at'] = now
+    return update_data
+
+def bulk_update_status(db, collection, record_type, current_user, current_user_id, data,
+                       build_filters, ip_address=None, max_records=5000, session=None, audit_db=None):
+    """
+    Move many records to a new status in one request.
+
+    `data` holds `status`, and either `ids` (list of record ids) or `filter`
+    (the same search/region/status/date parameters as the listing endpoint).
+    `rejection_reason` applies to every record; `reasons` maps record ids to
+    individual rejection reasons. `build_filters(args)` returns the listing
+    query for the current user, so records outside the user's scope are never
+    touched. Records already in the target status are skipped. Reads and
+    writes run in `session` when given; audit entries go to `audit_db` (default `db`).
+    """
+    new_status = data.get('status')
+    if new_status not in RECORD_STATUSES:
+        raise ValueError('Invalid status')
+
+    if new_status == 'approved' and current_user['role'] not in ['admin', 'vms_officer']:
+        raise PermissionError('Only admin or VMS officer can approve records')
+
+    if data.get('ids') is not None:
+        requested_ids = parse_record_ids(data['ids'])
+        if not requested_ids:
+            raise ValueError('No record ids given')
+        if len(requested_ids) > max_records:
+            raise ValueError(f'At most {max_records} records can be updated per request')
+        scope = build_filters({})
+        target_query = {'_id': {'$in': requested_ids}}
+        if scope:
+            target_query = {'$and': [scope, target_query]}
+    elif isinstance(data.get('filter'), dict):
+        requested_ids = None
+        target_query = build_filters({k: str(v) for k, v in data['filter'].items() if v is not None})
+    else:
+        raise ValueError('Provide either ids or filter')
+
+    target_query = {'$and': [target_query, {'status': {'$ne': new_status}}]} if target_query else {'status': {'$ne': new_status}}
+
+    # Resolve the targets once, by _id only, so the write and the audit trail cover the same records
+    target_ids = [r['_id'] for r in collection.find(target_query, {'_id': 1}, session=session).limit(max_records + 1)]
+    if len(target_ids) > max_records:
+        raise ValueError(f'Filter matches more than {max_records} records; narrow it down or pass ids')
+
+    reasons = data.get('reasons') or {}
+    if not isinstance(reasons, dict):
+        raise ValueError('reasons must map record ids to rejection reasons')
+
+    now = datetime.utcnow()
+    modified = 0
+    if target_ids:
+        if new_status == 'rejected' and reasons:
+            # Per-record reasons: one unordered bulk_write instead of one update_one per record
+            operations = [UpdateOne(
+                {'_id': record_id, 'status': {'$ne': new_status}},
+                {'$set': status_update_fields(
+                    new_status, current_user_id, now,
+                    reasons.get(str(record_id), data.get('rejection_reason'))
+                )}
+            ) for record_id in target_ids]
+            modified = collection.bulk_write(operations, ordered=False, session=session).modified_count
+        else:
+            modified = collection.update_many(
+                {'_id': {'$in': target_ids}, 'status': {'$ne': new_status}},
+                {'$set': status_update_fields(new_status, current_user_id, now, data.get('rejection_reason'))},
+                session=session
+            ).modified_count
+
+    # Records stamped with this exact updated_at are the ones this request changed
+    updated_ids = [r['_id'] for r in collection.find(
+        {'_id': {'$in': target_ids}, 'status': new_status, 'updated_at': now},
+        {'_id': 1},
+        session=session
+    )] if modified else []
+
+    action = 'approve' if new_status == 'approved' else 'reject' if new_status == 'rejected' else 'status_change'
+    audit_entries = []
+    for record_id in updated_ids:
+        details = f"Changed status to {new_status} (bulk)"
+        reason = reasons.get(str(record_id), data.get('rejection_reason')) if new_status == 'rejected' else None
+        if reason:
+            details += f" - Reason: {reason}"
+        audit_entries.append({
+            'action': action,
+            'record_type': record_type,
+            'record_id': record_id,
+            'details': details,
+            'changes': {'status': new_status}
+        })
+    insert_audit_logs(audit_db or db, current_user, audit_entries, ip_address)
+
+    updated = {str(i) for i in updated_ids}
+    report = {
+        'status': new_status,
+        'matched': len(target_ids),
+        'updated': len(updated_ids),
+        'updated_ids': sorted(updated),
+        'updated_at': now.isoformat()
+    }
+    if requested_ids is not None:
+        # Ids that were not found, are outside the user's scope or already had the status
+        report['skipped_ids'] = [str(i) for i in requested_ids if str(i) not in updated]
+    return report
@@ -0,0 +1,125 @@
+"""
+Response compression.
+
+Listing and detail payloads are large next to the links woreda offices work
+over, so an after-request hook compresses a response body when:
+- the client accepts br or gzip (Accept-Encoding, q-values honoured; br is
+  preferred and needs the brotli package)
+- it is JSON or text and at least COMPRESSION_MIN_SIZE bytes
+- it isn't streamed (exports compress their own stream, see app/exports.py),
+  already encoded, or an empty/304 response
+It is paid on every response, so the levels (COMPRESSION_GZIP_LEVEL,
+COMPRESSION_BROTLI_QUALITY) are moderate. ETags are weak (app/http_cache.py),
+so one tag covers every encoding of a body.
+
+Payloads served from a cache - dashboard snapshots - are compressed once, at
+the stored levels (COMPRESSION_STORED_GZIP_LEVEL,
+COMPRESSION_STORED_BROTLI_QUALITY), and kept with every encoding already
+applied in the response cache (QUERY_CACHE_BACKEND storage,
+RESPONSE_CACHE_MAX_BYTES, entries kept RESPONSE_CACHE_TTL seconds). A hit
+picks the variant the client accepts; the hook leaves it alone.
+"""
+import gzip
+
+from flask import current_app, jsonify, request
+
+from .json_provider import dumps_bytes
+from .query_cache import QueryCache, create_backend
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+
+def available_encodings():
+    """Encodings this process can produce, preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def negotiate_encoding(encodings):
+    """The best of `encodings` the client accepts, or 'identity'"""
+    return request.accept_encodings.best_match(encodings, default='identity')
+
+def compression_level(config, encoding, stored=False):
+    if encoding == 'br':
+        key = 'COMPRESSION_STORED_BROTLI_QUALITY' if stored else 'COMPRESSION_BROTLI_QUALITY'
+        return config.get(key, 11 if stored else 5)
+    key = 'COMPRESSION_STORED_GZIP_LEVEL' if stored else 'COMPRESSION_GZIP_LEVEL'
+    return config.get(key, 9 if stored else 6)
+
+def compress(body, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    # A fixed mtime keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+def compress_response(response):
+    """After-request hook: compress the body if the client, type and size allow"""
+    if (response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or not 200 <= response.status_code < 300 or response.status_code == 204):
+        return response
+
+    # The body depends on Accept-Encoding even when this one goes out uncompressed
+    response.vary.add('Accept-Encoding')
+    config = current_app.config
+    body = response.get_data()
+    if len(body) < config.get('COMPRESSION_MIN_SIZE', 1024):
+        return response
+
+    encoding = negotiate_encoding(available_encodings())
+    if encoding == 'identity':
+        return response
+
+    response.set_data(compress(body, encoding, compression_level(config, encoding)))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def encode_variants(body, config):
+    """{encoding: body} for the identity body and every encoding available, at the stored levels"""
+    variants = {'identity': body}
+    if len(body) >= config.get('COMPRESSION_MIN_SIZE', 1024):
+        for encoding in available_encodings():
+            variants[encoding] = compress(body, encoding, compression_level(config, encoding, stored=True))
+    return variants
+
+def variants_response(variants):
+    # Only what the stored entry holds: a shared cache may have been filled by a process without brotli
+    encoding = negotiate_encoding([e for e in ('br', 'gzip') if e in variants])
+    response = current_app.response_class(variants[encoding], mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def precompressed_response(key, load):
+    """JSON response for the payload load() returns, stored precompressed under key"""
+    cache = current_app.response_cache
+    if cache is None:
+        return jsonify(load())
+
+    variants = cache.get(key)
+    if variants is None:
+        variants = encode_variants(dumps_bytes(load()), current_app.config)
+        cache.set(key, variants)
+    return variants_response(variants)
+
+async def precompressed_response_async(key, load):
+    """precompressed_response for a coroutine load() (async serving mode)"""
+    cache = current_app.response_cache
+    if cache is None:
+        return jsonify(await load())
+
+    variants = cache.get(key)
+    if variants is None:
+        variants = encode_variants(dumps_bytes(await load()), current_app.config)
+        cache.set(key, variants)
+    return variants_response(variants)
+
+def init_compression(app):
+    backend = create_backend(app.config, prefix='evems:response:',
+                             max_bytes=app.config.get('RESPONSE_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    app.response_cache = QueryCache(backend, ttl=app.config.get('RESPONSE_CACHE_TTL', 30)) if backend else None
+    app.after_request(compress_response)
@@ -0,0 +1,97 @@
+"""
+Dashboard statistics.
+
+Each number on the dashboards is one count_documents query. The queries are
+built here as (key, collection, filter) triples so the Flask routes and the
+async serving mode (app/aio.py) count exactly the same things; the async mode
+runs them concurrently.
+"""
+import asyncio
+import hashlib
+from datetime import datetime
+
+from .registry import REGISTRY
+from .scope import get_scope, creator_values
+
+USERS_COLLECTION = 'users'
+
+# Records waiting for an approver
+PENDING_STATUS = 'submitted'
+
+def start_of_today():
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _plural(record_type):
+    return f'{record_type.name.title()}s'
+
+def officer_stat_queries(current_user, current_user_id):
+    """Counts for the officer, clerk and statistician dashboards, within the user's scope"""
+    registered_by = {'registered_by': {'$in': list(creator_values(current_user_id))}}
+    today = start_of_today()
+
+    queries = []
+    for record_type in REGISTRY.values():
+        plural = _plural(record_type)
+        scope = get_scope(record_type, current_user, current_user_id)
+        queries += [
+            (f'total{plural}', record_type.collection, scope.filter),
+            (f'my{plural}', record_type.collection, registered_by),
+            (f'pending{plural}', record_type.collection, scope.apply({'status': PENDING_STATUS})),
+            (f'approvedToday{plural}', record_type.collection, scope.apply({
+                'status': 'approved', 'approved_at': {'$gte': today}
+            }))
+        ]
+    return queries
+
+def admin_stat_queries():
+    """Counts for the admin dashboard: users and every record"""
+    today = start_of_today()
+    queries = [
+        ('totalUsers', 'users', {}),
+        # Users created before is_active existed count as active
+        ('activeUsers', 'users', {'is_active': {'$ne': False}}),
+        ('activeToday', 'users', {'last_login': {'$gte': today}})
+    ]
+    for record_type in REGISTRY.values():
+        plural = _plural(record_type)
+        queries += [
+            (f'total{plural}', record_type.collection, {}),
+            (f'pending{plural}', record_type.collection, {'status': PENDING_STATUS})
+        ]
+    return queries
+
+# Dashboard total -> prefix of the per-record-type counts it adds up
+OFFICER_TOTALS = {
+    'totalRecords': 'total',
+    'myRecords': 'my',
+    'pendingApproval': 'pending',
+    'approvedToday': 'approvedToday'
+}
+ADMIN_TOTALS = {'totalRecords': 'total', 'pendingApprovals': 'pending'}
+
+def record_collections():
+    return [record_type.collection for record_type in REGISTRY.values()]
+
+def admin_collections():
+    """Collections the admin dashboard counts; the user routes bump the users version too"""
+    return record_collections() + [USERS_COLLECTION]
+
+def snapshot_key(kind, queries, versions):
+    digest = hashlib.sha1(repr((queries, sorted(versions.items()))).encode('utf-8')).hexdigest()
+    return f'dashboard:{kind}:{digest}'
+
+def summarize_stats(counts, totals):
+    """The per-record-type counts plus the totals the dashboard shows"""
+    stats = dict(counts)
+    for key, prefix in totals.items():
+        stats[key] = sum(counts.get(f'{prefix}{_plural(record_type)}', 0) for record_type in REGISTRY.values())
+    return stats
+
+def count_stats(db, queries):
+    """Run the count queries one after another (the async mode gathers them instead)"""
+    return {key: db[collection].count_documents(query) for key, collection, query in queries}
+
+async def count_stats_async(db, queries):
+    """Run the count queries concurrently on a Motor database"""
+    counts = await asyncio.gather(*(db[collection].count_documents(query) for _, collection, query in queries))
+    return {key: count for (key, _, _), count in zip(queries, counts)}
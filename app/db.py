@@ -0,0 +1,337 @@
+"""
+MongoDB client lifecycle.
+
+One MongoClient per process, created lazily with the pool settings from
+Config. A client must not be shared across fork(), so the connection checks the
+process id on every use and a pre-fork server's workers (or the report workers)
+each build their own on first use - nothing connects in the parent before the
+fork.
+
+Operation classes get their own read preference / write concern on top of the
+same pool:
+- 'default':   record and user reads/writes, primary, the URI's write concern
+- 'listing':   paginated listings, search and exports, MONGODB_LISTING_READ_PREFERENCE
+- 'detail':    single-record reads whose caller passed allow_stale=1, same preference
+- 'analytics': report and statistics workers, MONGODB_ANALYTICS_READ_PREFERENCE
+- 'audit':     audit log writes, MONGODB_AUDIT_WRITE_CONCERN (w=1 by default)
+Replica reads are bounded by MONGODB_MAX_STALENESS_SECONDS.
+
+Read-your-own-writes: write routes run in a causally consistent session and
+return its operation time in the X-Operation-Time header. A client that sends
+it back as X-After-Operation-Time gets replica reads in a session that waits
+for that point, so a listing right after a create or approval includes it.
+
+Pool activity is tracked by a CMAP listener and served by
+GET /api/diagnostics/db-pool; command timings go to app/metrics.py and
+app/slow_queries.py.
+"""
+import os
+import threading
+import time
+
+from bson.timestamp import Timestamp
+from flask import current_app, g, request
+from pymongo import MongoClient
+from pymongo.monitoring import ConnectionPoolListener
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+from pymongo.write_concern import WriteConcern
+
+from .metrics import COMMAND_LISTENER
+from .slow_queries import SLOW_QUERY_LOG
+
+READ_PREFERENCES = {
+    'primary': Primary,
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest
+}
+
+def client_options(config):
+    """MongoClient keyword arguments from a Flask config or a plain dict of Config values"""
+    options = {
+        'maxPoolSize': config.get('MONGODB_MAX_POOL_SIZE', 100),
+        'minPoolSize': config.get('MONGODB_MIN_POOL_SIZE', 0),
+        'maxIdleTimeMS': config.get('MONGODB_MAX_IDLE_TIME_MS', 300000),
+        'waitQueueTimeoutMS': config.get('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 10000),
+        'serverSelectionTimeoutMS': config.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 10000),
+        'appname': config.get('MONGODB_APP_NAME', 'evems')
+    }
+    return {key: value for key, value in options.items() if value is not None}
+
+def command_listeners(config):
+    """Command monitoring for a new client: request metrics and the slow-query log, each when enabled"""
+    listeners = []
+    if config.get('METRICS_ENABLED'):
+        listeners.append(COMMAND_LISTENER)
+    if config.get('SLOW_QUERY_THRESHOLD_MS'):
+        listeners.append(SLOW_QUERY_LOG)
+    return listeners
+
+# Operation class -> config key of its read preference
+REPLICA_READ_OPERATIONS = {
+    'listing': 'MONGODB_LISTING_READ_PREFERENCE',
+    'detail': 'MONGODB_LISTING_READ_PREFERENCE',
+    'analytics': 'MONGODB_ANALYTICS_READ_PREFERENCE'
+}
+
+OPERATION_TIME_HEADER = 'X-Operation-Time'
+AFTER_OPERATION_TIME_HEADER = 'X-After-Operation-Time'
+
+def read_preference(mode, max_staleness=-1):
+    if mode not in READ_PREFERENCES:
+        raise ValueError(f'Unknown read preference: {mode}')
+    if mode == 'primary':
+        return Primary()
+    # -1 means no bound; otherwise MongoDB requires at least 90 seconds
+    if max_staleness is not None and int(max_staleness) > 0:
+        return READ_PREFERENCES[mode](max_staleness=max(90, int(max_staleness)))
+    return READ_PREFERENCES[mode]()
+
+def operation_options(config, operation):
+    """Database options (read preference / write concern) for an operation class"""
+    if operation in REPLICA_READ_OPERATIONS:
+        mode = config.get(REPLICA_READ_OPERATIONS[operation], 'secondaryPreferred')
+        return {'read_preference': read_preference(mode, config.get('MONGODB_MAX_STALENESS_SECONDS', 90))}
+    if operation == 'audit':
+        w = config.get('MONGODB_AUDIT_WRITE_CONCERN', 1)
+        return {'write_concern': WriteConcern(w=int(w) if str(w).isdigit() else w)}
+    return {}
+
+class PoolStats(ConnectionPoolListener):
+    """Per-server connection pool counters, fed by the driver's CMAP events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}
+        self._checkout_started = threading.local()
+
+    @staticmethod
+    def _key(address):
+        return f'{address[0]}:{address[1]}' if isinstance(address, tuple) else str(address)
+
+    def _pool(self, address):
+        key = self._key(address)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = {
+                'open': 0,
+                'in_use': 0,
+                'checkouts': 0,
+                'checkout_failures': {},
+                'cleared': 0,
+                'wait_seconds': 0.0,
+                'max_wait_seconds': 0.0
+            }
+        return pool
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address)['cleared'] += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop(self._key(event.address), None)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._pool(event.address)['open'] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._pool(event.address)['open'] -= 1
+
+    def connection_check_out_started(self, event):
+        self._checkout_started.at = time.monotonic()
+
+    def _waited(self):
+        started = getattr(self._checkout_started, 'at', None)
+        self._checkout_started.at = None
+        return time.monotonic() - started if started is not None else 0.0
+
+    def connection_check_out_failed(self, event):
+        waited = self._waited()
+        with self._lock:
+            pool = self._pool(event.address)
+            failures = pool['checkout_failures']
+            failures[str(event.reason)] = failures.get(str(event.reason), 0) + 1
+            pool['max_wait_seconds'] = max(pool['max_wait_seconds'], waited)
+
+    def connection_checked_out(self, event):
+        waited = self._waited()
+        with self._lock:
+            pool = self._pool(event.address)
+            pool['in_use'] += 1
+            pool['checkouts'] += 1
+            pool['wait_seconds'] += waited
+            pool['max_wait_seconds'] = max(pool['max_wait_seconds'], waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._pool(event.address)['in_use'] -= 1
+
+    def snapshot(self):
+        with self._lock:
+            servers = {}
+            for address, pool in self._pools.items():
+                checkouts = pool['checkouts'] or 1
+                servers[address] = {
+                    'open': pool['open'],
+                    'in_use': pool['in_use'],
+                    'idle': pool['open'] - pool['in_use'],
+                    'checkouts': pool['checkouts'],
+                    'checkout_failures': dict(pool['checkout_failures']),
+                    'cleared': pool['cleared'],
+                    'avg_wait_ms': round(1000 * pool['wait_seconds'] / checkouts, 3),
+                    'max_wait_ms': round(1000 * pool['max_wait_seconds'], 3)
+                }
+            return servers
+
+class MongoConnection:
+    """Owns the process's MongoClient and the per-operation database handles"""
+
+    def __init__(self, uri, config):
+        self.uri = uri
+        self.config = config
+        self.options = client_options(config)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._client = None
+        self._databases = {}
+        self.pool_stats = None
+
+    @property
+    def client(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Fresh client (and counters) in each process; the parent's isn't closed from here
+                    self.pool_stats = PoolStats()
+                    self._client = MongoClient(
+                        self.uri, connect=False,
+                        event_listeners=[self.pool_stats] + command_listeners(self.config),
+                        **self.options
+                    )
+                    self._databases = {}
+                    self._pid = os.getpid()
+        return self._client
+
+    def get_database(self, operation='default'):
+        """The real pymongo Database for an operation class in this process"""
+        client = self.client
+        database = self._databases.get(operation)
+        if database is None:
+            database = client.get_database(**operation_options(self.config, operation))
+            self._databases[operation] = database
+        return database
+
+    def database(self, operation='default'):
+        """A fork-safe handle that resolves to this process's Database on every use"""
+        return DatabaseHandle(self, operation)
+
+    def stats(self):
+        # Make sure this process has its client (and counters)
+        self.client
+        return {
+            'pid': self._pid,
+            'options': self.options,
+            'servers': self.pool_stats.snapshot()
+        }
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+            self._databases = {}
+
+class DatabaseHandle:
+    """Stands in for a pymongo Database (db.users, db['birth_records'], db.command, ...)"""
+
+    def __init__(self, connection, operation='default'):
+        self._connection = connection
+        self._operation = operation
+
+    def __getattr__(self, name):
+        return getattr(self._connection.get_database(self._operation), name)
+
+    def __getitem__(self, name):
+        return self._connection.get_database(self._operation)[name]
+
+def parse_operation_time(value):
+    """'<seconds>.<increment>' as sent in X-After-Operation-Time, or None"""
+    try:
+        seconds, increment = str(value).split('.', 1)
+        return Timestamp(int(seconds), int(increment))
+    except (TypeError, ValueError):
+        return None
+
+def format_operation_time(timestamp):
+    return f'{timestamp.time}.{timestamp.inc}'
+
+def request_session():
+    """The current request's causally consistent session, started on first use"""
+    session = g.get('mongo_session')
+    if session is None:
+        session = current_app.mongo.client.start_session(causal_consistency=True)
+        after = parse_operation_time(request.headers.get(AFTER_OPERATION_TIME_HEADER))
+        if after:
+            session.advance_operation_time(after)
+        g.mongo_session = session
+    return session
+
+def write_session():
+    """Session for a write whose result later reads (in this or a following request) must see"""
+    g.mongo_wrote = True
+    return request_session()
+
+def read_session():
+    """
+    Session for replica reads: causal when this request has written or the client
+    sent the operation time of an earlier write, otherwise None (plain reads).
+    """
+    if g.get('mongo_wrote') or request.headers.get(AFTER_OPERATION_TIME_HEADER):
+        return request_session()
+    return None
+
+def allows_stale_reads():
+    """Whether the caller opted into possibly stale single-record reads (?allow_stale=1)"""
+    return request.args.get('allow_stale') in ['1', 'true']
+
+def init_db(app):
+    app.mongo = MongoConnection(app.config['MONGODB_URI'], app.config)
+    app.db = app.mongo.database()
+
+    @app.after_request
+    def add_operation_time(response):
+        session = g.get('mongo_session')
+        if session is not None and g.get('mongo_wrote') and session.operation_time:
+            response.headers[OPERATION_TIME_HEADER] = format_operation_time(session.operation_time)
+        return response
+
+    @app.teardown_request
+    def end_request_session(exc):
+        session = g.pop('mongo_session', None)
+        if session is not None:
+            session.end_session()
+
+def get_db(operation='default'):
+    """Database handle for an operation class in the current app"""
+    if operation == 'default':
+        return current_app.db
+    return current_app.mongo.database(operation)
+
+def create_client(config):
+    """A standalone client with the configured pool settings (worker processes, scripts)"""
+    return MongoClient(config['MONGODB_URI'], **client_options(config))
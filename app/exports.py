@@ -0,0 +1,157 @@
+"""
+Streaming exports of record collections.
+
+Rows are pulled from a MongoDB cursor in batches and written straight into the
+response as CSV, NDJSON or a JSON array (optionally gzip-compressed), so memory
+use stays flat no matter how large the export is and the first bytes go out
+immediately.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, date
+
+from bson import ObjectId
+from flask import Response, current_app, request, stream_with_context
+
+from .json_provider import dumps_bytes, iter_json_array
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'json': ('application/json', 'json')
+}
+
+# Flush the output buffer to the client roughly every 64 KB
+CHUNK_SIZE = 64 * 1024
+
+def format_value(value):
+    """Convert a MongoDB value into something CSV/JSON can represent"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, list):
+        return [format_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: format_value(v) for k, v in value.items()}
+    return value
+
+def parse_columns(requested, allowed, default):
+    """Validate a comma-separated column list against the allowed export columns"""
+    if not requested:
+        return list(default)
+
+    columns = [c.strip() for c in requested.split(',') if c.strip()]
+    unknown = [c for c in columns if c not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+    return columns
+
+def build_projection(columns, id_field):
+    projection = {column: 1 for column in columns if column != id_field}
+    if id_field not in columns:
+        projection['_id'] = 0
+    return projection
+
+def iter_rows(cursor, columns, id_field):
+    for record in cursor:
+        yield [format_value(record.get('_id') if column == id_field else record.get(column)) for column in columns]
+
+def iter_csv(cursor, columns, id_field):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # The header goes out before the first batch is fetched
+    writer.writerow(columns)
+    yield buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+
+    for row in iter_rows(cursor, columns, id_field):
+        writer.writerow([json.dumps(v) if isinstance(v, (list, dict)) else v for v in row])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def iter_documents(cursor, columns, id_field):
+    # Raw values: the JSON encoder handles ObjectIds and dates itself
+    for record in cursor:
+        yield {column: record.get('_id') if column == id_field else record.get(column) for column in columns}
+
+def iter_ndjson(cursor, columns, id_field):
+    # Nothing to send before the first row, so start the response with an empty chunk
+    yield b''
+
+    parts = []
+    size = 0
+    for document in iter_documents(cursor, columns, id_field):
+        line = dumps_bytes(document) + b'\n'
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield b''.join(parts)
+            parts = []
+            size = 0
+
+    if parts:
+        yield b''.join(parts)
+
+def gzip_stream(chunks, level=6):
+    """Gzip-compress a byte stream, flushing the first chunk so the client sees bytes right away"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    first = True
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if first:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+def accepts_gzip():
+    # q-values honoured: 'gzip;q=0' refuses it
+    return request.accept_encodings['gzip'] > 0
+
+def export_response(collection, filters, id_field, allowed_columns, default_columns, filename):
+    """
+    Build a streaming export response from the request's `format`, `columns`
+    and `gzip` query parameters. Raises ValueError for invalid parameters.
+    """
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Invalid export format: {fmt}")
+
+    columns = parse_columns(request.args.get('columns', ''), allowed_columns, default_columns)
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+
+    cursor = collection.find(filters, build_projection(columns, id_field)).sort('_id', 1).batch_size(batch_size)
+
+    if fmt == 'csv':
+        chunks = iter_csv(cursor, columns, id_field)
+    elif fmt == 'ndjson':
+        chunks = iter_ndjson(cursor, columns, id_field)
+    else:
+        chunks = iter_json_array(iter_documents(cursor, columns, id_field), CHUNK_SIZE)
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    headers = {
+        'Content-Disposition': f'attachment; filename={filename}_{datetime.utcnow().strftime("%Y%m%d")}.{extension}',
+        'Cache-Control': 'no-store',
+        # Tell reverse proxies not to buffer the stream
+        'X-Accel-Buffering': 'no',
+        'Vary': 'Accept-Encoding'
+    }
+
+    use_gzip = request.args.get('gzip', '1') != '0' and accepts_gzip()
+    if use_gzip:
+        chunks = gzip_stream(chunks, current_app.config.get('EXPORT_GZIP_LEVEL', 6))
+        headers['Content-Encoding'] = 'gzip'
+
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
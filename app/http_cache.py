@@ -0,0 +1,61 @@
+"""
+HTTP caching for record reads.
+
+Record details carry an ETag derived from the record's `updated_at`; listings
+carry one derived from the collection's version counter (app/versions.py),
+the query and the page. A conditional GET (If-None-Match) is answered with 304
+after an indexed probe - the record's `updated_at`, or the version document -
+without running the page query, the count or the serializer.
+
+Listing replicas may lag each other, so a listing ETag also expires every
+LISTING_ETAG_TTL seconds; a page labelled with a version its replica hadn't
+caught up to is refetched within that window rather than kept until the next
+write.
+
+Cache-Control is set per endpoint class (CACHE_CONTROL). Record data and
+dashboards stay private to the browser and are revalidated on every use,
+exports are never stored, and public certificate checks may be cached anywhere
+for a minute.
+"""
+import hashlib
+import time
+
+from flask import make_response, request
+
+CACHE_CONTROL = {
+    'listing': 'private, no-cache',
+    'detail': 'private, no-cache',
+    # Counts must reflect a change the user just made, so always re-asked
+    'dashboard': 'private, no-cache',
+    'export': 'private, no-store'
+}
+
+def make_etag(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:24]
+
+def listing_etag(collection_name, version, filters, page, per_page, ttl):
+    # The filters already hold the caller's scope, so users with different scopes never share a tag
+    return make_etag(collection_name, version, repr(filters), page, per_page, int(time.time() // max(1, ttl)))
+
+def record_etag(collection_name, record):
+    """ETag of a single record, or None for records without timestamps"""
+    changed_at = record.get('updated_at') or record.get('created_at')
+    if not changed_at:
+        return None
+    return make_etag(collection_name, record['_id'], changed_at.isoformat())
+
+def is_not_modified(etag):
+    """Whether the request's If-None-Match already names this ETag"""
+    return etag is not None and request.if_none_match.contains_weak(etag)
+
+def cache_headers(response, policy, etag=None):
+    """Set Cache-Control for an endpoint class, and the (weak, since bodies may be compressed) ETag"""
+    response.headers['Cache-Control'] = CACHE_CONTROL[policy]
+    if CACHE_CONTROL[policy].startswith('private'):
+        response.vary.add('Authorization')
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
+
+def not_modified(policy, etag):
+    return cache_headers(make_response('', 304), policy, etag)
@@ -0,0 +1,484 @@
+"""
+Background job queue for long-running report generation.
+
+Jobs live in the `report_jobs` collection. The API only enqueues them; worker
+processes started with `run_report_workers.py` claim, run and finish them, so a
+regional annual report never blocks a Flask request thread.
+
+Every request gets a job of its own, owned by the requester (and tied to their
+report). When identical work is already done or under way, that job shares it
+instead of repeating it (`shares_job_id`): a copy of a completed job points at
+the same artifacts, and a job following an active one mirrors its progress
+and takes over the outcome. A follower whose job was cancelled by its own
+requester is queued to run by itself.
+"""
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from .db import create_client, operation_options
+from .models import RECORD_MODELS
+from .versions import collection_versions
+
+ACTIVE_STATUSES = ['queued', 'running']
+FINISHED_STATUSES = ['completed', 'failed']
+
+# Fields a sharing job takes over from the job doing the work
+SHARED_FIELDS = ['status', 'progress', 'message', 'artifacts', 'summary', 'error', 'started_at', 'completed_at']
+ARTIFACT_FORMATS = ['csv', 'pdf']
+
+# Job kind -> handler(db, job, progress, config) returning (artifacts, summary)
+JOB_HANDLERS = {}
+
+class JobCancelled(Exception):
+    """Raised inside a handler when the job was cancelled while running"""
+
+def job_handler(kind):
+    """Register a function as the handler for a job kind"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+class ReportJobQueue:
+    def __init__(self, db, lease_seconds=300):
+        self.collection = db.report_jobs
+        self.lease_seconds = lease_seconds
+
+    @staticmethod
+    def cache_key(kind, params):
+        """Stable key for a job's output, so identical requests share artifacts"""
+        payload = json.dumps({'kind': kind, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def enqueue(self, kind, params, user_id, report_id=None, reuse_artifacts=True, data_version=None):
+        """
+        Queue a job for user_id and return (job, cached).
+        When a completed job with the same parameters, made from the same
+        data_version of its input, still has its artifacts on disk (and
+        reuse_artifacts is set), the new job is a completed copy pointing at
+        them; when an identical job is already queued or running, the new job
+        follows it instead of duplicating the work.
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f'Unknown job kind: {kind}')
+
+        key = self.cache_key(kind, params)
+        job = self._new_job(kind, params, key, user_id, report_id)
+        job['data_version'] = data_version
+
+        if reuse_artifacts:
+            cached = self.collection.find_one(
+                {'cache_key': key, 'data_version': data_version, 'status': 'completed', 'shares_job_id': None},
+                sort=[('completed_at', -1)]
+            )
+            if cached and all(os.path.exists(path) for path in cached.get('artifacts', {}).values()):
+                job.update({field: cached.get(field) for field in SHARED_FIELDS})
+                job['shares_job_id'] = cached['_id']
+                job['_id'] = self.collection.insert_one(job).inserted_id
+                return job, True
+
+        active = self.collection.find_one({'cache_key': key, 'status': {'$in': ACTIVE_STATUSES}, 'shares_job_id': None})
+        if active:
+            job['shares_job_id'] = active['_id']
+
+        job['_id'] = self.collection.insert_one(job).inserted_id
+        return self._follow(job, active) if active else job, False
+
+    def _new_job(self, kind, params, key, user_id, report_id):
+        now = datetime.utcnow()
+        return {
+            'kind': kind,
+            'params': params,
+            'cache_key': key,
+            'report_id': ObjectId(report_id) if report_id else None,
+            'requested_by': user_id,
+            'status': 'queued',
+            'progress': 0,
+            'message': 'Waiting for a worker',
+            'cancel_requested': False,
+            'attempts': 0,
+            'artifacts': {},
+            'summary': None,
+            'error': None,
+            'shares_job_id': None,
+            'created_at': now,
+            'updated_at': now
+        }
+
+    def get(self, job_id):
+        """Find job by ID; a job sharing another's work shows that job's progress"""
+        job = self.collection.find_one({'_id': ObjectId(job_id)})
+        if job and job.get('shares_job_id') and job['status'] in ACTIVE_STATUSES:
+            job = self._follow(job, self.collection.find_one({'_id': job['shares_job_id']}))
+        return job
+
+    def _follow(self, job, leader):
+        """A following job as of its leader's state, storing the outcome once the leader finished"""
+        if leader and leader['status'] in ACTIVE_STATUSES:
+            return {**job, **{field: leader.get(field) for field in SHARED_FIELDS}}
+
+        if leader and leader['status'] in FINISHED_STATUSES:
+            update = {field: leader.get(field) for field in SHARED_FIELDS}
+        else:
+            # The leader was cancelled by its own requester (or is gone): run this job itself
+            update = {'status': 'queued', 'shares_job_id': None, 'message': 'Waiting for a worker'}
+        update['updated_at'] = datetime.utcnow()
+        followed = self.collection.find_one_and_update(
+            {'_id': job['_id'], 'shares_job_id': job['shares_job_id'], 'status': {'$in': ACTIVE_STATUSES}},
+            {'$set': update},
+            return_document=ReturnDocument.AFTER
+        )
+        return followed or self.collection.find_one({'_id': job['_id']})
+
+    def claim(self, worker_id):
+        """Atomically take the oldest queued job, or a running job whose worker died"""
+        now = datetime.utcnow()
+        # A job cancelled while running whose worker then died has nobody left to mark it;
+        # finish it here so it doesn't stay running and its followers run by themselves
+        self.collection.update_many(
+            {'status': 'running', 'cancel_requested': True, 'lease_expires_at': {'$lt': now}},
+            {'$set': {'status': 'cancelled', 'message': 'Cancelled', 'updated_at': now}}
+        )
+        return self.collection.find_one_and_update(
+            {
+                '$or': [
+                    {'status': 'queued'},
+                    {'status': 'running', 'lease_expires_at': {'$lt': now}}
+                ],
+                'cancel_requested': False,
+                # Followers wait on their leader instead of running
+                'shares_job_id': None
+            },
+            {
+                '$set': {
+                    'status': 'running',
+                    'worker_id': worker_id,
+                    'started_at': now,
+                    'updated_at': now,
+                    'lease_expires_at': now + timedelta(seconds=self.lease_seconds)
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('created_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def report_progress(self, job_id, worker_id, progress, message=None):
+        """
+        Record progress and renew the lease; raises JobCancelled if a cancel
+        was requested or another worker took the job over after the lease expired.
+        """
+        now = datetime.utcnow()
+        update = {
+            'progress': max(0, min(100, int(progress))),
+            'updated_at': now,
+            'lease_expires_at': now + timedelta(seconds=self.lease_seconds)
+        }
+        if message:
+            update['message'] = message
+
+        job = self.collection.find_one_and_update(
+            {'_id': job_id, 'status': 'running', 'worker_id': worker_id},
+            {'$set': update},
+            projection={'cancel_requested': 1}
+        )
+        if job is None or job.get('cancel_requested'):
+            raise JobCancelled()
+
+    # The outcome only counts while the worker still holds the job: not after a
+    # cancel, nor once another worker claimed it on an expired lease.
+    # Each returns whether the job was updated.
+
+    def complete(self, job_id, worker_id, artifacts, summary=None):
+        now = datetime.utcnow()
+        return self.collection.update_one(
+            {'_id': job_id, 'status': 'running', 'worker_id': worker_id, 'cancel_requested': False},
+            {'$set': {
+                'status': 'completed',
+                'progress': 100,
+                'message': 'Completed',
+                'artifacts': artifacts,
+                'summary': summary,
+                'completed_at': now,
+                'updated_at': now
+            }}
+        ).matched_count > 0
+
+    def fail(self, job_id, worker_id, error):
+        return self.collection.update_one(
+            {'_id': job_id, 'status': 'running', 'worker_id': worker_id},
+            {'$set': {'status': 'failed', 'error': error, 'message': 'Failed', 'updated_at': datetime.utcnow()}}
+        ).matched_count > 0
+
+    def mark_cancelled(self, job_id, worker_id):
+        return self.collection.update_one(
+            {'_id': job_id, 'status': 'running', 'worker_id': worker_id},
+            {'$set': {'status': 'cancelled', 'message': 'Cancelled', 'updated_at': datetime.utcnow()}}
+        ).matched_count > 0
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. Queued jobs, and jobs following another, are cancelled
+        immediately (the followed job goes on for its own requester); running
+        jobs are flagged and stop at their next progress report.
+        """
+        now = datetime.utcnow()
+        job = self.collection.find_one_and_update(
+            {'_id': ObjectId(job_id), '$or': [
+                {'status': 'queued'},
+                {'status': {'$in': ACTIVE_STATUSES}, 'shares_job_id': {'$ne': None}}
+            ]},
+            {'$set': {'status': 'cancelled', 'cancel_requested': True, 'message': 'Cancelled', 'updated_at': now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job:
+            return job
+
+        return self.collection.find_one_and_update(
+            {'_id': ObjectId(job_id), 'status': 'running'},
+            {'$set': {'cancel_requested': True, 'message': 'Cancelling', 'updated_at': now}},
+            return_document=ReturnDocument.AFTER
+        )
+
+def serialize_job(job):
+    """Convert a job document into the JSON shape returned by the API"""
+    return {
+        'job_id': str(job['_id']),
+        'kind': job['kind'],
+        'report_id': str(job['report_id']) if job.get('report_id') else None,
+        'status': job['status'],
+        'progress': job.get('progress', 0),
+        'message': job.get('message'),
+        'params': job.get('params'),
+        'formats': sorted(job.get('artifacts', {}).keys()),
+        'summary': job.get('summary'),
+        'error': job.get('error'),
+        'created_at': job['created_at'].isoformat() if job.get('created_at') else None,
+        'started_at': job['started_at'].isoformat() if job.get('started_at') else None,
+        'completed_at': job['completed_at'].isoformat() if job.get('completed_at') else None
+    }
+
+def report_data_version(db, params):
+    """Write versions of the collections a report reads; artifacts made from older data aren't reused"""
+    record_types = params.get('record_types') or list(RECORD_MODELS.keys())
+    versions = collection_versions(db, [RECORD_MODELS[record_type].COLLECTION for record_type in record_types])
+    return ','.join(f'{name}:{version}' for name, version in sorted(versions.items()))
+
+def _write_atomically(path, write):
+    """Write to a temporary file and rename it so readers never see partial artifacts"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _write_report_csv(path, rows):
+    def write(tmp_path):
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['record_type', 'region', 'month', 'status', 'count'])
+            for row in rows:
+                writer.writerow([row['record_type'], row['region'], row['month'], row['status'], row['count']])
+    _write_atomically(path, write)
+
+def _write_report_pdf(path, params, totals, rows):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#078930')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('FONTSIZE', (0, 0), (-1, -1), 8)
+    ])
+
+    story = [
+        Paragraph(params.get('title') or 'Vital Events Report', styles['Title']),
+        Paragraph(
+            f"Region: {params.get('region') or 'All Regions'} &nbsp; "
+            f"Period: {params.get('start_date') or '-'} to {params.get('end_date') or '-'}",
+            styles['Normal']
+        ),
+        Spacer(1, 12),
+        Table([['Record type', 'Total']] + [[k.title(), v] for k, v in totals.items()], style=table_style),
+        Spacer(1, 12)
+    ]
+
+    detail = [['Record type', 'Region', 'Month', 'Status', 'Count']]
+    detail += [[r['record_type'], r['region'], r['month'], r['status'], r['count']] for r in rows]
+    story.append(Table(detail, repeatRows=1, style=table_style))
+
+    _write_atomically(path, lambda tmp_path: SimpleDocTemplate(tmp_path, pagesize=A4).build(story))
+
+@job_handler('report')
+def generate_report(db, job, progress, config):
+    """Aggregate record counts by region, month and status for the requested period"""
+    params = job['params']
+    record_types = params.get('record_types') or list(RECORD_MODELS.keys())
+    region = params.get('region')
+
+    # The aggregations only read, so they may run on a secondary (MONGODB_ANALYTICS_READ_PREFERENCE)
+    records_db = db.client.get_database(db.name, **operation_options(config, 'analytics'))
+
+    rows = []
+    totals = {}
+    for index, record_type in enumerate(record_types):
+        model = RECORD_MODELS[record_type]
+        match = {}
+        date_filter = {}
+        if params.get('start_date'):
+            date_filter['$gte'] = params['start_date']
+        if params.get('end_date'):
+            date_filter['$lte'] = params['end_date']
+        if date_filter:
+            match[model.DATE_FIELD] = date_filter
+        if region and region != 'All Regions':
+            match[model.REGION_FIELD] = region
+
+        pipeline = [
+            {'$match': match},
+            {'$group': {
+                '_id': {
+                    'region': f'${model.REGION_FIELD}',
+                    'month': {'$substrBytes': [{'$ifNull': [f'${model.DATE_FIELD}', '']}, 0, 7]},
+                    'status': {'$ifNull': ['$status', 'draft']}
+                },
+                'count': {'$sum': 1}
+            }},
+            {'$sort': {'_id.region': 1, '_id.month': 1, '_id.status': 1}}
+        ]
+
+        total = 0
+        for group in records_db[model.COLLECTION].aggregate(pipeline, allowDiskUse=True):
+            rows.append({
+                'record_type': record_type,
+                'region': group['_id'].get('region') or 'Unknown',
+                'month': group['_id'].get('month') or 'Unknown',
+                'status': group['_id'].get('status'),
+                'count': group['count']
+            })
+            total += group['count']
+        totals[record_type] = total
+
+        progress(80 * (index + 1) / len(record_types), f'Aggregated {record_type} records')
+
+    # Absolute paths: the API process serving downloads may run from another directory
+    folder = os.path.abspath(config['REPORT_ARTIFACT_FOLDER'])
+    os.makedirs(folder, exist_ok=True)
+
+    artifacts = {}
+    for fmt in params.get('formats') or ARTIFACT_FORMATS:
+        path = os.path.join(folder, f"{job['cache_key']}.{fmt}")
+        if fmt == 'csv':
+            _write_report_csv(path, rows)
+        elif fmt == 'pdf':
+            _write_report_pdf(path, params, totals, rows)
+        artifacts[fmt] = path
+        progress(90, f'Wrote {fmt.upper()} artifact')
+
+    return artifacts, {'totals': totals, 'rows': len(rows)}
+
+@job_handler('parquet_export')
+def run_parquet_export(db, job, progress, config):
+    """Incrementally export record collections to partitioned Parquet files"""
+    from .parquet_export import export_parquet
+
+    root = os.path.abspath(config['PARQUET_EXPORT_FOLDER'])
+    summary = export_parquet(
+        db,
+        root,
+        record_types=job['params'].get('record_types'),
+        full=job['params'].get('full', False),
+        row_group_size=config['PARQUET_ROW_GROUP_SIZE'],
+        progress=progress
+    )
+    return {}, {'root': root, 'partitions_written': summary}
+
+def run_job(queue, db, job, config):
+    """Run a claimed job through its handler and record the outcome"""
+    worker_id = job['worker_id']
+    handler = JOB_HANDLERS.get(job['kind'])
+    if handler is None:
+        queue.fail(job['_id'], worker_id, f"Unknown job kind: {job['kind']}")
+        return
+
+    # A job cancelled or taken over meanwhile keeps the state set by whoever holds it now
+    try:
+        artifacts, summary = handler(
+            db, job, lambda pct, message=None: queue.report_progress(job['_id'], worker_id, pct, message), config
+        )
+        if not queue.complete(job['_id'], worker_id, artifacts, summary):
+            queue.mark_cancelled(job['_id'], worker_id)
+    except JobCancelled:
+        queue.mark_cancelled(job['_id'], worker_id)
+    except Exception as e:
+        queue.fail(job['_id'], worker_id, str(e))
+
+def worker_main(config, worker_index, stop_event):
+    """Worker process loop: claim jobs until asked to stop"""
+    # Ignore Ctrl+C in children; the parent sets stop_event and joins them
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Each process opens its own client (with the configured pool settings); MongoClient is not fork-safe
+    client = create_client(config)
+    db = client.get_database()
+    queue = ReportJobQueue(db, lease_seconds=config['REPORT_JOB_LEASE_SECONDS'])
+    worker_id = f'{socket.gethostname()}:{os.getpid()}:{worker_index}'
+
+    try:
+        while not stop_event.is_set():
+            job = queue.claim(worker_id)
+            if job is None:
+                stop_event.wait(config['REPORT_JOB_POLL_INTERVAL'])
+                continue
+            run_job(queue, db, job, config)
+    finally:
+        client.close()
+
+def start_worker_pool(config, processes=None):
+    """Start the worker processes and return (processes, stop_event)"""
+    processes = processes or config['REPORT_WORKERS']
+    stop_event = multiprocessing.Event()
+    workers = []
+    for index in range(processes):
+        worker = multiprocessing.Process(
+            target=worker_main,
+            args=(config, index, stop_event),
+            name=f'report-worker-{index}',
+            daemon=True
+        )
+        worker.start()
+        workers.append(worker)
+    return workers, stop_event
+
+def run_worker_pool(config, processes=None):
+    """Run the worker pool in the foreground until SIGINT/SIGTERM"""
+    workers, stop_event = start_worker_pool(config, processes)
+
+    def shutdown(signum, frame):
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    while not stop_event.is_set() and any(w.is_alive() for w in workers):
+        time.sleep(1)
+
+    stop_event.set()
+    for worker in workers:
+        worker.join(timeout=config['REPORT_JOB_LEASE_SECONDS'])
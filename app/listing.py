@@ -0,0 +1,102 @@
+"""
+Paginated listing queries.
+
+A listing needs a page of records and the total number of matches. How the
+two are fetched is the listing's count strategy:
+- 'sequential': find(...).skip().limit() then count_documents - two round trips
+  one after the other
+- 'concurrent': the same two queries in flight at once (a small thread pool
+  for pymongo, asyncio.gather under Motor), so latency is the slower of the two
+- 'facet':      one aggregation whose $facet returns the page and the count
+  together - one round trip, but the server walks every match to count it
+  while the page query alone could stop after skip + limit
+
+RecordType.count_strategy picks one per record type, falling back to
+LISTING_COUNT_STRATEGY. benchmarks/listing_count.py compares them on real data.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+COUNT_STRATEGIES = ['sequential', 'concurrent', 'facet']
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _count_executor(workers):
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='listing-count')
+    return _executor
+
+def facet_pipeline(filters, projection, sort, skip, limit):
+    """$match and $sort (both can use indexes), then the page and the count from one pass"""
+    page = [{'$skip': skip}, {'$limit': limit}]
+    if projection:
+        page.append({'$project': projection})
+    return [
+        {'$match': filters},
+        {'$sort': dict(sort)},
+        {'$facet': {'records': page, 'total': [{'$count': 'count'}]}}
+    ]
+
+def _facet_result(results):
+    result = results[0] if results else {}
+    total = result.get('total') or [{'count': 0}]
+    return result.get('records', []), total[0]['count']
+
+def fetch_page(collection, filters, projection, sort, skip, limit, strategy='concurrent', session=None, workers=8):
+    """Return (records, total) for one listing page with a pymongo collection"""
+    if strategy not in COUNT_STRATEGIES:
+        raise ValueError(f'Unknown count strategy: {strategy}')
+
+    if strategy == 'facet':
+        return _facet_result(list(collection.aggregate(
+            facet_pipeline(filters, projection, sort, skip, limit), session=session
+        )))
+
+    def page():
+        return list(collection.find(filters, projection, session=session).sort(sort).skip(skip).limit(limit))
+
+    def count():
+        return collection.count_documents(filters, session=session)
+
+    # A session may only run one operation at a time
+    if strategy == 'sequential' or session is not None:
+        return page(), count()
+
+    # In the request's context, so its MongoDB time is attributed to it (app/metrics.py)
+    total = _count_executor(workers).submit(contextvars.copy_context().run, count)
+    records = page()
+    return records, total.result()
+
+async def fetch_page_async(collection, filters, projection, sort, skip, limit, strategy='concurrent', sessions=(None, None)):
+    """
+    fetch_page for a Motor collection. `sessions` are (page session, count
+    session): concurrent queries can't share one.
+    """
+    if strategy not in COUNT_STRATEGIES:
+        raise ValueError(f'Unknown count strategy: {strategy}')
+
+    page_session, count_session = sessions
+
+    if strategy == 'facet':
+        results = await collection.aggregate(
+            facet_pipeline(filters, projection, sort, skip, limit), session=page_session
+        ).to_list(1)
+        return _facet_result(results)
+
+    def page():
+        return collection.find(filters, projection, session=page_session).sort(sort).skip(skip).limit(limit).to_list(limit)
+
+    def count():
+        return collection.count_documents(filters, session=count_session)
+
+    if strategy == 'sequential':
+        return await page(), await count()
+
+    records, total = await asyncio.gather(page(), count())
+    return records, total
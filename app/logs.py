@@ -0,0 +1,269 @@
+"""
+Structured, non-blocking logging.
+
+Every logger under `app` (module loggers, Flask's app.logger, the access log)
+hands its records to a QueueHandler; a background QueueListener formats and
+writes them, so a request thread never waits on stdout. When the listener
+falls behind, records are dropped (and counted) instead of blocking. Each
+line is a JSON object (LOG_FORMAT='json') or a plain line for development
+(LOG_FORMAT='text').
+
+On the way into the queue, in the thread that logged it, a record gets:
+- the request's correlation id: X-Request-ID when the client (or a proxy)
+  sends a usable one, otherwise a fresh id; it is echoed in the response's
+  X-Request-ID header and follows the request into threads that copy its
+  context (the listing count pool)
+- PII redaction: fields passed with `extra=` whose names look like personal
+  data on vital records (names, phone numbers, ID numbers, addresses, dates
+  of birth, ...) are replaced with '[redacted]', at any depth, and e-mail
+  addresses and phone numbers in the message text (and, when formatted, in
+  tracebacks) are masked
+- sampling: DEBUG and INFO records of the loggers in LOG_SAMPLE_RATES
+  ('app.access=0.1' keeps one in ten) are dropped at random before any
+  formatting; WARNING and above are always kept
+
+The access log (`app.access`) has one record per request: INFO normally,
+WARNING for requests slower than LOG_SLOW_REQUEST_MS, ERROR for 5xx.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from flask import current_app, g, request
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+QUEUE_SIZE = 10000
+
+access_logger = logging.getLogger('app.access')
+
+_request_id = ContextVar('evems_request_id', default=None)
+
+# Field names carrying personal data on records, users and forms
+PII_FIELD = re.compile(
+    r'(name|phone|email|address|id_number|national_id|passport|date_of_birth|time_of_birth'
+    r'|password|token|photo|signature)$'
+)
+EMAIL = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+PHONE = re.compile(r'(?<!\d)(?:\+?251|0)[79]\d{8}(?!\d)')
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+REDACTED = '[redacted]'
+
+# Attributes every LogRecord has; anything else came in through extra=
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+def redact(value):
+    """A copy of a value with personal-data fields replaced, at any depth"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if item is not None and isinstance(key, str) and PII_FIELD.search(key.lower()) else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+def redact_text(text):
+    return PHONE.sub(REDACTED, EMAIL.sub(REDACTED, text))
+
+def extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in STANDARD_ATTRIBUTES}
+
+class RequestContextFilter(logging.Filter):
+    """Attach the correlation id of the request (if any) the record was logged in"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+class RedactionFilter(logging.Filter):
+    def filter(self, record):
+        # Merge the (redacted) arguments first, so the text can be masked as a whole
+        if isinstance(record.args, dict):
+            record.args = redact(record.args)
+        elif record.args:
+            record.args = tuple(redact(arg) for arg in record.args)
+        try:
+            message = record.getMessage()
+        except Exception:
+            # Arguments that don't fit the format: keep the record rather than raise in the caller
+            message = str(record.msg)
+        record.msg = redact_text(message)
+        record.args = None
+        for key, value in extra_fields(record).items():
+            if PII_FIELD.search(key.lower()) and value is not None:
+                setattr(record, key, REDACTED)
+            elif isinstance(value, (dict, list, tuple)):
+                setattr(record, key, redact(value))
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of the DEBUG/INFO records of some loggers"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.name)
+        return rate is None or random.random() < rate
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class RedactingFormatter(logging.Formatter):
+    """Mask e-mails and phone numbers in tracebacks too (DuplicateKeyError messages quote the key)"""
+
+    def formatException(self, ei):
+        return redact_text(super().formatException(ei))
+
+    def formatStack(self, stack_info):
+        return redact_text(super().formatStack(stack_info))
+
+class JsonFormatter(RedactingFormatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None)
+        }
+        entry.update(extra_fields(record))
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class TextFormatter(RedactingFormatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = extra_fields(record)
+        return f'{line} {json.dumps(fields, default=str, ensure_ascii=False)}' if fields else line
+
+def parse_sample_rates(value):
+    """'app.access=0.1,app.slow_queries=0.5' -> {'app.access': 0.1, 'app.slow_queries': 0.5}"""
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, rate = item.split('=', 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+class LogPipeline:
+    """The process's log queue and the listener thread draining it"""
+
+    def __init__(self, config):
+        formatter = JsonFormatter() if config.get('LOG_FORMAT', 'json') == 'json' else TextFormatter()
+        self.output = logging.StreamHandler(sys.stdout)
+        self.output.setFormatter(formatter)
+        self.handler = DroppingQueueHandler(queue.Queue(maxsize=config.get('LOG_QUEUE_SIZE', QUEUE_SIZE)))
+        self.handler.addFilter(SamplingFilter(parse_sample_rates(config.get('LOG_SAMPLE_RATES'))))
+        self.handler.addFilter(RequestContextFilter())
+        self.handler.addFilter(RedactionFilter())
+        self.listener = None
+        self._pid = None
+
+    def start(self):
+        self.listener = logging.handlers.QueueListener(self.handler.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+        self._pid = os.getpid()
+
+    def restart_after_fork(self):
+        # The listener thread didn't survive the fork; the queue's locks may be in any state
+        self.handler.queue = queue.Queue(maxsize=self.handler.queue.maxsize)
+        self.start()
+
+    def stop(self):
+        if self.listener is not None and self._pid == os.getpid():
+            # Flushes what is still queued
+            self.listener.stop()
+            self.listener = None
+
+_pipeline = None
+
+def _restart_after_fork():
+    if _pipeline is not None:
+        _pipeline.restart_after_fork()
+
+def _stop():
+    if _pipeline is not None:
+        _pipeline.stop()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(_stop)
+
+def configure_logging(config):
+    """Route the `app` loggers through a new LogPipeline (replacing an earlier one); returns it"""
+    global _pipeline
+    _stop()
+    _pipeline = LogPipeline(config)
+    logger = logging.getLogger('app')
+    logger.handlers = [_pipeline.handler]
+    logger.setLevel(config.get('LOG_LEVEL', 'INFO'))
+    logger.propagate = False
+    _pipeline.start()
+    return _pipeline
+
+def start_request():
+    incoming = request.headers.get(REQUEST_ID_HEADER, '')
+    g.request_id = incoming if VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+    g.log_started = time.perf_counter()
+    _request_id.set(g.request_id)
+
+def log_request(response):
+    started = g.get('log_started')
+    if started is None:
+        return response
+    response.headers[REQUEST_ID_HEADER] = g.request_id
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if response.status_code >= 500:
+        level = logging.ERROR
+    elif elapsed_ms >= current_app.config.get('LOG_SLOW_REQUEST_MS', 1000):
+        level = logging.WARNING
+    else:
+        level = logging.INFO
+    if access_logger.isEnabledFor(level):
+        access_logger.log(level, '%s %s %s', request.method, request.path, response.status_code, extra={
+            'method': request.method,
+            'route': request.url_rule.rule if request.url_rule is not None else None,
+            'status': response.status_code,
+            'duration_ms': round(elapsed_ms, 1),
+            'bytes': None if response.is_streamed else response.content_length
+        })
+    return response
+
+def finish_request(exc=None):
+    _request_id.set(None)
+
+def init_logging(app):
+    app.log_pipeline = configure_logging(app.config)
+    app.before_request(start_request)
+    app.after_request(log_request)
+    app.teardown_request(finish_request)
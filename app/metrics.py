@@ -0,0 +1,218 @@
+"""
+Request and MongoDB metrics in the Prometheus text format.
+
+With METRICS_ENABLED, request hooks record for every request:
+- evems_http_requests_total{method,route,status}
+- evems_http_request_duration_seconds{method,route} (histogram)
+- evems_http_requests_in_flight
+- evems_http_request_size_bytes / evems_http_response_size_bytes{method,route}
+  (histograms; the response size is the encoded one, streamed bodies aren't sized)
+and a pymongo CommandListener records every MongoDB command:
+- evems_mongodb_commands_total{command,outcome}
+- evems_mongodb_command_duration_seconds{command} (histogram)
+Command time is also attributed to the request that ran it -
+evems_http_request_mongodb_seconds and evems_http_request_mongodb_commands
+per route, and a `Server-Timing: app;dur=..., db;dur=...` response header -
+through a context variable, which the listing count threads (app/listing.py)
+and Motor's executor inherit.
+
+`route` is the URL rule (/api/births/<string:record_id>), never the raw
+path, so the number of series stays bounded. GET /metrics serves everything,
+behind METRICS_TOKEN (and not at all without one). Values are per process, like
+GET /api/diagnostics/db-pool.
+
+METRICS_ENABLED is off by default; then no hook or listener is installed, so
+requests and commands pay nothing, and /metrics answers 404.
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import g, request
+from pymongo.monitoring import CommandListener
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COMMAND_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COMMAND_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labels, labels), value) for labels, value in self._values.items()]
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (non-cumulative, last is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        samples = []
+        names = self.labels + ('le',)
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', _format_labels(names, labels + (bound,)), cumulative))
+            samples.append((f'{self.name}_sum', _format_labels(self.labels, labels), total))
+            samples.append((f'{self.name}_count', _format_labels(self.labels, labels), cumulative))
+        return samples
+
+class Metrics:
+    """Every metric this process exports"""
+
+    def __init__(self):
+        self.requests = Counter('evems_http_requests_total', 'HTTP requests', ('method', 'route', 'status'))
+        self.duration = Histogram('evems_http_request_duration_seconds', 'Time to produce the response', ('method', 'route'))
+        self.in_flight = Gauge('evems_http_requests_in_flight', 'Requests being served')
+        self.in_flight.inc(amount=0)
+        self.request_size = Histogram('evems_http_request_size_bytes', 'Request body size', ('method', 'route'), SIZE_BUCKETS)
+        self.response_size = Histogram('evems_http_response_size_bytes', 'Response body size as sent', ('method', 'route'), SIZE_BUCKETS)
+        self.request_db_time = Histogram('evems_http_request_mongodb_seconds', 'MongoDB command time per request', ('method', 'route'))
+        self.request_db_commands = Histogram('evems_http_request_mongodb_commands', 'MongoDB commands per request', ('method', 'route'), COMMAND_COUNT_BUCKETS)
+        self.commands = Counter('evems_mongodb_commands_total', 'MongoDB commands', ('command', 'outcome'))
+        self.command_duration = Histogram('evems_mongodb_command_duration_seconds', 'MongoDB command time', ('command',), COMMAND_BUCKETS)
+
+    def all(self):
+        return [value for value in vars(self).values() if hasattr(value, 'samples')]
+
+    def render(self):
+        lines = []
+        for metric in self.all():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {value}')
+        return '\n'.join(lines) + '\n'
+
+METRICS = Metrics()
+
+class RequestCommands:
+    """MongoDB commands run on behalf of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        # The listing count thread reports into the same request
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+
+_request_commands = ContextVar('evems_request_commands', default=None)
+
+class CommandMetrics(CommandListener):
+    def started(self, event):
+        pass
+
+    def _finished(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        METRICS.commands.inc((event.command_name, outcome))
+        METRICS.command_duration.observe((event.command_name,), seconds)
+        current = _request_commands.get()
+        if current is not None:
+            current.add(seconds)
+
+    def succeeded(self, event):
+        self._finished(event, 'succeeded')
+
+    def failed(self, event):
+        self._finished(event, 'failed')
+
+COMMAND_LISTENER = CommandMetrics()
+
+def route_label():
+    # Unmatched paths share one label, so scanners can't add series
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_commands = RequestCommands()
+    _request_commands.set(g.metrics_commands)
+    METRICS.in_flight.inc()
+
+def record_response(response):
+    started = g.get('metrics_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    labels = (request.method, route_label())
+    commands = g.metrics_commands
+
+    METRICS.requests.inc(labels + (str(response.status_code),))
+    METRICS.duration.observe(labels, elapsed)
+    METRICS.request_db_time.observe(labels, commands.seconds)
+    METRICS.request_db_commands.observe(labels, commands.count)
+    if request.content_length:
+        METRICS.request_size.observe(labels, request.content_length)
+    if not response.is_streamed and response.content_length is not None:
+        METRICS.response_size.observe(labels, response.content_length)
+
+    response.headers['Server-Timing'] = f'app;dur={elapsed * 1000:.1f}, db;dur={commands.seconds * 1000:.1f}'
+    return response
+
+def finish_request(exc=None):
+    if g.pop('metrics_started', None) is not None:
+        METRICS.in_flight.dec()
+        _request_commands.set(None)
+
+def init_metrics(app):
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    app.before_request(start_request)
+    app.after_request(record_response)
+    app.teardown_request(finish_request)
@@ -1,6 +1,6 @@
 from datetime import datetime
-import bcrypt
 from bson import ObjectId
+from .passwords import hash_password
 
 class User:
     @staticmethod
@@ -17,7 +17,7 @@ class User:
             return None, 'Badge number already exists'
         
         # Hash password
-        password_hash = bcrypt.hashpw(user_data['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        password_hash = hash_password(user_data['password'])
         
         user_doc = {
             'email': user_data['email'],
@@ -67,6 +67,11 @@ class User:
         return list(db.users.find({}))
 
 class BirthRecord:
+    COLLECTION = 'birth_records'
+    REGION_FIELD = 'birth_region'
+    DATE_FIELD = 'date_of_birth'
+    CATEGORICAL_FIELDS = ['child_gender', 'birth_region', 'status', 'place_of_birth_type']
+    
     @staticmethod
     def create_record(db, record_data):
         """Create a new birth record"""
@@ -118,6 +123,11 @@ class BirthRecord:
         return result.modified_count > 0
 
 class DeathRecord:
+    COLLECTION = 'death_records'
+    REGION_FIELD = 'death_region'
+    DATE_FIELD = 'date_of_death'
+    CATEGORICAL_FIELDS = ['deceased_gender', 'death_region', 'status', 'place_of_death_type', 'cause_of_death_type', 'age_type']
+    
     @staticmethod
     def create_record(db, record_data):
         """Create a new death record"""
@@ -147,6 +157,11 @@ class DeathRecord:
         return records, total
 
 class MarriageRecord:
+    COLLECTION = 'marriage_records'
+    REGION_FIELD = 'marriage_region'
+    DATE_FIELD = 'marriage_date'
+    CATEGORICAL_FIELDS = ['marriage_region', 'status', 'marriage_type']
+    
     @staticmethod
     def create_record(db, record_data):
         """Create a new marriage record"""
@@ -176,6 +191,11 @@ class MarriageRecord:
         return records, total
 
 class DivorceRecord:
+    COLLECTION = 'divorce_records'
+    REGION_FIELD = 'divorce_region'
+    DATE_FIELD = 'divorce_date'
+    CATEGORICAL_FIELDS = ['divorce_region', 'status', 'spouse1_gender', 'spouse2_gender']
+    
     @staticmethod
     def create_record(db, record_data):
         """Create a new divorce record"""
@@ -202,4 +222,12 @@ class DivorceRecord:
         records = list(cursor)
         total = db.divorce_records.count_documents(filters)
         
-        return records, total
\ No newline at end of file
+        return records, total
+
+# Record type name -> model, used by reports and exports that work across all collections
+RECORD_MODELS = {
+    'birth': BirthRecord,
+    'death': DeathRecord,
+    'marriage': MarriageRecord,
+    'divorce': DivorceRecord
+}
@@ -0,0 +1,275 @@
+"""
+Columnar Parquet export of the record collections for analytics.
+
+Output is hive-partitioned as
+    <root>/record_type=<type>/region=<region>/eth_year=<year>/part-0.parquet
+with categorical fields dictionary-encoded. Exports are incremental: only the
+partitions containing records whose `updated_at` is past the last export
+watermark are rewritten, and each rewritten partition is rebuilt from the
+database. A deleted record, or one moved to another region or year, leaves
+nothing with a new `updated_at` in the partition it was in, so the record
+routes note that partition in `export_changes` (note_vacated_partition) and
+the next run rewrites it too, or removes it once it is empty.
+
+Partitions are streamed from the database in row groups, so memory stays
+bounded by PARQUET_ROW_GROUP_SIZE documents, and each file is replaced
+atomically. A full rebuild is written to a staging directory and swapped in
+once complete.
+"""
+import calendar
+import os
+import re
+import shutil
+from datetime import datetime, date
+
+from bson import ObjectId
+
+from .models import RECORD_MODELS
+
+UNKNOWN = 'unknown'
+EXPORT_CHANGES_COLLECTION = 'export_changes'
+ISO_DATE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})')
+
+def ethiopian_new_year(gregorian_year):
+    """YYYY-MM-DD of Meskerem 1 in a Gregorian year: 11 September, or 12 before a Gregorian leap year"""
+    return f'{gregorian_year}-09-{12 if calendar.isleap(gregorian_year + 1) else 11}'
+
+def ethiopian_year(date_value):
+    """Ethiopian year of a YYYY-MM-DD date; it starts on Meskerem 1, in September"""
+    match = ISO_DATE.match(date_value) if isinstance(date_value, str) else None
+    if not match:
+        return UNKNOWN
+    gregorian_year = int(match.group(1))
+    return str(gregorian_year - (7 if match.group(0) >= ethiopian_new_year(gregorian_year) else 8))
+
+def partition_value(value):
+    """Make a value safe to use as a partition directory name"""
+    if value in (None, ''):
+        return UNKNOWN
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', str(value))
+
+def partition_filter(model, region, eth_year):
+    """Query selecting every record that belongs in one (region, eth_year) partition"""
+    query = {}
+    if region == UNKNOWN:
+        query[model.REGION_FIELD] = {'$in': [None, '']}
+    else:
+        query[model.REGION_FIELD] = region
+
+    if eth_year == UNKNOWN:
+        query['$or'] = [
+            {model.DATE_FIELD: {'$in': [None, '']}},
+            {model.DATE_FIELD: {'$not': {'$regex': ISO_DATE.pattern}}}
+        ]
+    else:
+        # From its Meskerem 1 up to the next one
+        query[model.DATE_FIELD] = {
+            '$gte': ethiopian_new_year(int(eth_year) + 7),
+            '$lt': ethiopian_new_year(int(eth_year) + 8),
+            '$regex': ISO_DATE.pattern
+        }
+    return query
+
+def _to_cell(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return str(value)
+    return value
+
+def partition_schema(records, categorical_fields):
+    """
+    Arrow schema for a partition's documents, with one type per column.
+    Columns holding more than one Python type are stored as strings, since
+    hand-keyed fields such as weight_kg arrive as either numbers or text;
+    low-cardinality string fields are dictionary-encoded so analysts load
+    them as categoricals. Returns (schema, names of the string-cast columns).
+    """
+    import pyarrow as pa
+
+    # column -> {Python type: a sample value}, in first-seen column order
+    samples = {}
+    for record in records:
+        for key, value in record.items():
+            value = _to_cell(value)
+            types = samples.setdefault(key, {})
+            if value is not None and type(value) not in types:
+                types[type(value)] = value
+
+    fields = []
+    for column, types in samples.items():
+        if len(types) > 1:
+            arrow_type = pa.string()
+        elif types:
+            arrow_type = pa.array(list(types.values())).type
+        else:
+            arrow_type = pa.null()
+        if column in categorical_fields and arrow_type == pa.string():
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields), {column for column, types in samples.items() if len(types) > 1}
+
+def normalize_rows(records, columns, string_columns):
+    """Flatten documents into rows of the partition's columns"""
+    rows = []
+    for record in records:
+        row = {}
+        for column in columns:
+            value = _to_cell(record.get(column))
+            row[column] = str(value) if column in string_columns and value is not None else value
+        rows.append(row)
+    return rows
+
+def batched(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def write_partition(path, find, categorical_fields, row_group_size):
+    """
+    Write the documents find() returns to one Parquet file, streaming
+    row_group_size documents at a time: a first pass settles the schema, a
+    second writes the row groups. Returns the number of rows (no file for none).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema, string_columns = partition_schema(find(), categorical_fields)
+    if not schema.names:
+        return 0
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    rows = 0
+    try:
+        with pq.ParquetWriter(tmp_path, schema, compression='snappy') as writer:
+            for batch in batched(find(), row_group_size):
+                writer.write_table(
+                    pa.Table.from_pylist(normalize_rows(batch, schema.names, string_columns), schema=schema),
+                    row_group_size=row_group_size
+                )
+                rows += len(batch)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
+
+def record_partition(region, date_value):
+    return region or UNKNOWN, ethiopian_year(date_value)
+
+def note_vacated_partition(db, collection_name, region, date_value, session=None):
+    """Remember a partition a record left (deleted, or moved to another region or year)"""
+    partition_region, eth_year = record_partition(region, date_value)
+    db[EXPORT_CHANGES_COLLECTION].insert_one({
+        'collection': collection_name,
+        'region': partition_region,
+        'eth_year': eth_year,
+        'at': datetime.utcnow()
+    }, session=session)
+
+def vacated_partitions(db, model):
+    """(partitions, change ids) noted for a collection since they were last exported"""
+    partitions = set()
+    change_ids = []
+    for change in db[EXPORT_CHANGES_COLLECTION].find({'collection': model.COLLECTION}):
+        partitions.add((change['region'], change['eth_year']))
+        change_ids.append(change['_id'])
+    return partitions, change_ids
+
+def changed_partitions(db, model, watermark, high_water):
+    """Distinct (region, eth_year) partitions with records updated in (watermark, high_water]"""
+    if watermark is None:
+        query = {}
+    else:
+        query = {'updated_at': {'$gt': watermark, '$lte': high_water}}
+
+    partitions = set()
+    cursor = db[model.COLLECTION].find(query, {model.REGION_FIELD: 1, model.DATE_FIELD: 1, '_id': 0}).batch_size(5000)
+    for record in cursor:
+        partitions.add(record_partition(record.get(model.REGION_FIELD), record.get(model.DATE_FIELD)))
+    return partitions
+
+def export_record_type(db, record_type, root, full=False, row_group_size=50000):
+    """Export one record type; returns the number of partitions rewritten"""
+    model = RECORD_MODELS[record_type]
+    watermark_id = f'parquet:{record_type}'
+
+    state = db.export_watermarks.find_one({'_id': watermark_id}) or {}
+    watermark = None if full else state.get('watermark')
+
+    # Records updated after this instant are picked up by the next run
+    high_water = datetime.utcnow()
+    # Read before the records, so a change noted meanwhile waits for the next run
+    vacated, change_ids = vacated_partitions(db, model)
+    partitions = changed_partitions(db, model, watermark, high_water)
+    if watermark is not None:
+        partitions |= vacated
+
+    type_root = os.path.join(root, f'record_type={record_type}')
+    # A full rebuild is written next to the live tree and swapped in at the end, so readers
+    # never see it half-built and a failed run leaves the previous export in place. Readers
+    # skip directories starting with '.'
+    out_root = os.path.join(root, f'.record_type={record_type}.{os.getpid()}.staging') if watermark is None else type_root
+    if out_root != type_root and os.path.isdir(out_root):
+        shutil.rmtree(out_root)
+
+    try:
+        for region, eth_year in sorted(partitions):
+            query = partition_filter(model, region, eth_year)
+            folder = os.path.join(out_root, f'region={partition_value(region)}', f'eth_year={eth_year}')
+            written = write_partition(
+                os.path.join(folder, 'part-0.parquet'),
+                lambda: db[model.COLLECTION].find(query).sort('_id', 1).batch_size(row_group_size),
+                model.CATEGORICAL_FIELDS,
+                row_group_size
+            )
+            if not written and os.path.isdir(folder):
+                # Its last records were deleted or moved away
+                shutil.rmtree(folder)
+
+        if out_root != type_root:
+            # The full rebuild also drops partitions whose records were all deleted
+            previous = f'{out_root}.previous'
+            if os.path.isdir(type_root):
+                os.replace(type_root, previous)
+            os.replace(out_root, type_root)
+            shutil.rmtree(previous, ignore_errors=True)
+    finally:
+        if out_root != type_root and os.path.isdir(out_root):
+            shutil.rmtree(out_root)
+
+    if change_ids:
+        db[EXPORT_CHANGES_COLLECTION].delete_many({'_id': {'$in': change_ids}})
+
+    db.export_watermarks.update_one(
+        {'_id': watermark_id},
+        {'$set': {
+            'watermark': high_water,
+            'exported_at': datetime.utcnow(),
+            'partitions_written': len(partitions),
+            'full': watermark is None
+        }},
+        upsert=True
+    )
+    return len(partitions)
+
+def export_parquet(db, root, record_types=None, full=False, row_group_size=50000, progress=None):
+    """
+    Export the given record types (all by default) under `root`.
+    `progress(percent, message)` is called after each record type.
+    """
+    record_types = record_types or list(RECORD_MODELS.keys())
+    summary = {}
+    for index, record_type in enumerate(record_types):
+        summary[record_type] = export_record_type(db, record_type, root, full=full, row_group_size=row_group_size)
+        if progress:
+            progress(100 * (index + 1) / len(record_types), f'Exported {record_type} partitions')
+    return summary
@@ -0,0 +1,147 @@
+"""
+Password hashing off the request threads.
+
+bcrypt is deliberately slow (~250 ms at the default cost) but releases the GIL,
+so hashing and verification run on a small dedicated thread pool. The pool is
+bounded: when more than `max_workers + max_queue` operations are in flight new
+ones are rejected straight away with PasswordHasherBusy (served as 503) instead
+of piling up behind a login storm and starving record traffic.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+from flask import current_app, has_app_context
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated or an operation waits too long"""
+
+class PasswordHasher:
+    def __init__(self, rounds=12, max_workers=4, max_queue=32, timeout=10):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    def _get_executor(self):
+        # Thread pools don't survive fork, so each worker process builds its own
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='bcrypt')
+            self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise PasswordHasherBusy('Too many authentication requests in progress, please retry shortly')
+            self._pending += 1
+            executor = self._get_executor()
+
+        submitted_at = time.monotonic()
+
+        def task():
+            started_at = time.monotonic()
+            with self._lock:
+                self._running += 1
+                self._wait_seconds += started_at - submitted_at
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._completed += 1
+                    self._run_seconds += time.monotonic() - started_at
+
+        try:
+            future = executor.submit(task)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                with self._lock:
+                    self._pending -= 1
+            with self._lock:
+                self._timed_out += 1
+            raise PasswordHasherBusy('Authentication timed out, please retry shortly')
+
+    def hash_password(self, password):
+        return self._run(
+            lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+        )
+
+    def check_password(self, password, password_hash):
+        return self._run(
+            lambda: bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        )
+
+    def needs_rehash(self, password_hash):
+        """True when the hash was made with a different work factor than the configured one"""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self):
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                'rounds': self.rounds,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._pending,
+                'running': self._running,
+                'queued': self._pending - self._running,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'avg_wait_ms': round(1000 * self._wait_seconds / completed, 2),
+                'avg_run_ms': round(1000 * self._run_seconds / completed, 2)
+            }
+
+_default_hasher = None
+
+def init_password_hasher(app):
+    app.password_hasher = PasswordHasher(
+        rounds=app.config.get('BCRYPT_ROUNDS', 12),
+        max_workers=app.config.get('BCRYPT_WORKERS', 4),
+        max_queue=app.config.get('BCRYPT_MAX_QUEUE', 32),
+        timeout=app.config.get('BCRYPT_TIMEOUT', 10)
+    )
+
+def get_password_hasher():
+    """The app's hasher, or a process-wide one configured from Config outside a request (scripts)"""
+    global _default_hasher
+    if has_app_context() and hasattr(current_app, 'password_hasher'):
+        return current_app.password_hasher
+    if _default_hasher is None:
+        from config import Config
+        _default_hasher = PasswordHasher(rounds=Config.BCRYPT_ROUNDS, max_workers=Config.BCRYPT_WORKERS)
+    return _default_hasher
+
+def hash_password(password):
+    return get_password_hasher().hash_password(password)
+
+def check_password(password, password_hash):
+    return get_password_hasher().check_password(password, password_hash)
+
+def needs_rehash(password_hash):
+    return get_password_hasher().needs_rehash(password_hash)
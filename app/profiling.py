@@ -0,0 +1,252 @@
+"""
+Opt-in request profiling (PROFILING_ENABLED).
+
+A request is profiled when:
+- it carries `X-Profile: <PROFILING_TOKEN>` (and optionally
+  `X-Profile-Mode: sample|cprofile`); the response names the file in
+  X-Profile-Id
+- or it falls in the rolling sample: a fraction of requests per route, set
+  by PROFILING_SAMPLE_RATE or at runtime by an admin through
+  PUT /api/diagnostics/profiling (stored in MongoDB, so every process picks
+  it up within PROFILING_REFRESH_SECONDS, and switched off again after the
+  given number of minutes)
+
+Modes:
+- 'sample':   a per-process thread records the request thread's stack every
+  PROFILING_INTERVAL_MS and writes collapsed stacks (`a;b;c 12`), the input
+  of flamegraph.pl, speedscope and similar
+- 'cprofile': cProfile on the request thread, written as a pstats file
+  (snakeviz, flameprof)
+Files go to PROFILING_FOLDER, named after the time, route and request id;
+only the newest PROFILING_MAX_FILES are kept. Both modes see the request's
+own thread only (work in the listing count pool isn't included), and in the
+async serving mode a profile can include other requests sharing the loop.
+
+With PROFILING_ENABLED off no hook is installed.
+"""
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app, g, request
+
+from .db import get_db
+from .metrics import route_label
+
+PROFILING_SETTINGS_COLLECTION = 'profiling_settings'
+PROFILE_MODES = ['sample', 'cprofile']
+PROFILE_HEADER = 'X-Profile'
+PROFILE_MODE_HEADER = 'X-Profile-Mode'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    # ';' separates frames in the collapsed format
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+
+def collapse(frame):
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+class StackSampler:
+    """Samples the stacks of the threads being profiled, from one thread per process"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def start(self, thread_id):
+        self._ensure_started()
+        counts = Counter()
+        with self._lock:
+            self._targets[thread_id] = counts
+        self._wake.set()
+        return counts
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _ensure_started(self):
+        # Threads don't survive fork, so each worker process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._targets = {}
+                threading.Thread(target=self._run, name='profile-sampler', daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                targets = list(self._targets.items())
+                if not targets:
+                    self._wake.clear()
+                    continue
+            frames = sys._current_frames()
+            for thread_id, counts in targets:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    counts[collapse(frame)] += 1
+
+class ProfilingSettings:
+    """The admin's runtime sampling settings, re-read from MongoDB every refresh_seconds"""
+
+    def __init__(self, config):
+        self.default_rate = config.get('PROFILING_SAMPLE_RATE', 0.0)
+        self.default_mode = config.get('PROFILING_MODE', 'sample')
+        self.refresh_seconds = config.get('PROFILING_REFRESH_SECONDS', 10)
+        self._settings = {}
+        self._loaded_at = 0
+
+    def current(self):
+        now = time.monotonic()
+        if now - self._loaded_at >= self.refresh_seconds:
+            self._loaded_at = now
+            try:
+                settings = get_db()[PROFILING_SETTINGS_COLLECTION].find_one({'_id': 'current'}) or {}
+            except Exception:
+                settings = self._settings
+            if settings.get('expires_at') and settings['expires_at'] <= datetime.utcnow():
+                settings = {}
+            self._settings = settings
+        return self._settings
+
+    def sample(self, route):
+        """The mode to profile this request with, or None"""
+        settings = self.current()
+        rate = settings.get('routes', {}).get(route, settings.get('sample_rate', self.default_rate))
+        if rate and random.random() < rate:
+            return settings.get('mode') or self.default_mode
+        return None
+
+def save_settings(db, sample_rate, routes, mode, minutes):
+    """Store runtime sampling settings for every process; returns them"""
+    if mode not in PROFILE_MODES:
+        raise ValueError(f'mode must be one of {PROFILE_MODES}')
+    for rate in [sample_rate, *routes.values()]:
+        if not 0 <= rate <= 1:
+            raise ValueError('Sample rates must be between 0 and 1')
+    settings = {
+        'sample_rate': sample_rate,
+        'routes': routes,
+        'mode': mode,
+        'expires_at': datetime.utcnow() + timedelta(minutes=minutes)
+    }
+    db[PROFILING_SETTINGS_COLLECTION].replace_one({'_id': 'current'}, settings, upsert=True)
+    return settings
+
+def clear_settings(db):
+    db[PROFILING_SETTINGS_COLLECTION].delete_one({'_id': 'current'})
+
+def requested_mode(config):
+    """The mode asked for by the X-Profile header, if it carries the profiling token"""
+    token = config.get('PROFILING_TOKEN')
+    # Constant-time, on bytes since header values may hold non-ASCII characters
+    if not token or not hmac.compare_digest(request.headers.get(PROFILE_HEADER, '').encode('utf-8'), token.encode('utf-8')):
+        return None
+    mode = request.headers.get(PROFILE_MODE_HEADER) or config.get('PROFILING_MODE', 'sample')
+    return mode if mode in PROFILE_MODES else None
+
+def start_profile():
+    app = current_app
+    route = route_label()
+    mode = requested_mode(app.config) or app.profiling_settings.sample(route)
+    if mode is None:
+        return
+
+    g.profile = {'mode': mode, 'route': route, 'started': time.perf_counter()}
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (a debugger, say) already owns this thread
+            g.pop('profile')
+            return
+        g.profile['profiler'] = profiler
+    else:
+        g.profile['counts'] = app.stack_sampler.start(threading.get_ident())
+
+def profile_name(profile, extension):
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', profile['route']).strip('_') or 'root'
+    elapsed_ms = round((time.perf_counter() - profile['started']) * 1000)
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    return f"{stamp}-{request.method}-{slug}-{g.get('request_id', os.getpid())}-{elapsed_ms}ms.{extension}"
+
+def write_profile(profile):
+    folder = current_app.config.get('PROFILING_FOLDER', './profiles')
+    os.makedirs(folder, exist_ok=True)
+    if profile['mode'] == 'cprofile':
+        profile['profiler'].disable()
+        name = profile_name(profile, 'prof')
+        profile['profiler'].dump_stats(os.path.join(folder, name))
+    else:
+        counts = current_app.stack_sampler.stop(threading.get_ident())
+        name = profile_name(profile, 'collapsed')
+        with open(os.path.join(folder, name), 'w', encoding='utf-8') as f:
+            for stack, count in counts.most_common():
+                f.write(f'{stack} {count}\n')
+    prune(folder, current_app.config.get('PROFILING_MAX_FILES', 500))
+    return name
+
+def prune(folder, max_files):
+    names = sorted(name for name in os.listdir(folder) if name.endswith(('.prof', '.collapsed')))
+    for name in names[:max(0, len(names) - max_files)]:
+        try:
+            os.remove(os.path.join(folder, name))
+        except OSError:
+            pass
+
+def finish_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    try:
+        response.headers[PROFILE_ID_HEADER] = write_profile(profile)
+    except Exception as e:
+        current_app.logger.warning('Writing profile failed: %s', e)
+    return response
+
+def abandon_profile(exc=None):
+    # The request failed before its response; stop sampling its thread
+    profile = g.pop('profile', None)
+    if profile is None:
+        return
+    if profile['mode'] == 'cprofile':
+        profile['profiler'].disable()
+    else:
+        current_app.stack_sampler.stop(threading.get_ident())
+
+def init_profiling(app):
+    app.profiling_settings = None
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+    app.profiling_settings = ProfilingSettings(app.config)
+    app.stack_sampler = StackSampler(app.config.get('PROFILING_INTERVAL_MS', 5) / 1000)
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+    app.teardown_request(abandon_profile)
@@ -0,0 +1,172 @@
+"""
+Shared cache of listing query results.
+
+Officers of one region run the same listing queries over and over (their
+region's first page of submitted records, say). A page result - the records
+and the total - is cached under the normalized filter, sort and page, plus the
+version of the data it was read from (app/versions.py):
+- a query confined to one region (its scope or its `region` filter pins it)
+  uses that region's version, so writes elsewhere don't evict it
+- any other query uses the collection's version
+A write bumps the version, so later reads build a different key and never see
+the old entry; it simply ages out. Entries also expire after QUERY_CACHE_TTL
+seconds, which bounds how stale a read can be even if a write was missed (a
+change made directly in the database, say).
+
+Backends (QUERY_CACHE_BACKEND):
+- 'memory': per-process LRU bounded by the total size of the cached values
+  (QUERY_CACHE_MAX_BYTES)
+- 'redis':  a cache service shared by every process on the node or cluster
+  (QUERY_CACHE_REDIS_URL); needs the redis package
+- 'none':   disabled
+Values are pickled (records hold ObjectIds and datetimes).
+"""
+import hashlib
+import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from .versions import region_version
+
+class MemoryBackend:
+    """Per-process LRU of byte strings, evicting the oldest entries past max_bytes"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.time() + ttl, value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.size, 'max_bytes': self.max_bytes}
+
+class RedisBackend:
+    """Entries in Redis (or anything speaking its protocol), shared between processes and nodes"""
+
+    def __init__(self, url, prefix='evems:query:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("QUERY_CACHE_BACKEND='redis' needs the redis package (pip install redis)")
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def stats(self):
+        return {'backend': 'redis'}
+
+class QueryCache:
+    def __init__(self, backend, ttl=30):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, collection_name, data_version, filters, sort, skip, limit, projection):
+        normalized = json.dumps([filters, sort, skip, limit, projection], sort_keys=True, default=str)
+        digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+        return f'{collection_name}:{data_version}:{digest}'
+
+    def get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            # A cache outage only costs the database round trip
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(value)
+
+    def set(self, key, result):
+        try:
+            self.backend.set(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), self.ttl)
+        except Exception:
+            pass
+
+    def fetch(self, key, fetch):
+        """Cached result for the key, or fetch() stored under it"""
+        result = self.get(key)
+        if result is None:
+            result = fetch()
+            self.set(key, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 3) if lookups else None,
+            'ttl': self.ttl,
+            **self.backend.stats()
+        }
+
+def data_version(versions, region):
+    """Version token for a query: its region's when confined to one, else the collection's"""
+    if region:
+        return f'r{region_version(versions, region)}@{region}'
+    return f"v{versions.get('version', 0)}"
+
+def create_backend(config, prefix='evems:query:', max_bytes=None):
+    """The QUERY_CACHE_BACKEND backend, or None when caching is off"""
+    backend_name = config.get('QUERY_CACHE_BACKEND', 'memory')
+    if backend_name == 'redis':
+        return RedisBackend(config['QUERY_CACHE_REDIS_URL'], prefix=prefix)
+    if backend_name == 'memory':
+        return MemoryBackend(max_bytes or config.get('QUERY_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    return None
+
+def init_query_cache(app):
+    backend = create_backend(app.config)
+    app.query_cache = QueryCache(backend, ttl=app.config.get('QUERY_CACHE_TTL', 30)) if backend else None
@@ -0,0 +1,145 @@
+"""
+Sliding-window rate limiting for login attempts.
+
+Each key (e.g. `ip:10.0.0.5` or `email:clerk@example.com`) keeps the
+timestamps of its recent attempts; a request is rejected while the number of
+attempts inside the window is at the limit, and told how long until the oldest
+one falls out. Checking and recording an attempt is a single step. Two backends are available: `memory` for a single process and
+`mongo`, a TTL collection shared by every node.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+class MemoryBackend:
+    """Per-process attempt log; fine for a single node"""
+
+    # Sweep idle keys every so many writes so the dict can't grow without bound
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._attempts = {}
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _prune(self, key, now):
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return None
+        cutoff = now - self._windows[key]
+        while attempts and attempts[0] <= cutoff:
+            attempts.popleft()
+        if not attempts:
+            del self._attempts[key]
+            del self._windows[key]
+            return None
+        return attempts
+
+    def acquire(self, rules):
+        """Check every (key, limit, window) rule and record the attempt under one lock"""
+        now = time.time()
+        with self._lock:
+            wait = 0
+            for key, limit, window in rules:
+                recent = [t for t in self._prune(key, now) or () if t > now - window]
+                if len(recent) >= limit:
+                    wait = max(wait, int(recent[0] + window - now) + 1)
+            if wait:
+                return wait, []
+            for key, limit, window in rules:
+                self._attempts.setdefault(key, deque()).append(now)
+                self._windows[key] = max(window, self._windows.get(key, 0))
+            self._writes += 1
+            if self._writes % self.SWEEP_EVERY == 0:
+                for stale_key in list(self._attempts):
+                    self._prune(stale_key, now)
+            return 0, [(key, now) for key, limit, window in rules]
+
+    def release(self, attempts):
+        with self._lock:
+            for key, at in attempts:
+                try:
+                    self._attempts.get(key, deque()).remove(at)
+                except ValueError:
+                    pass
+
+    def clear(self, key):
+        with self._lock:
+            self._attempts.pop(key, None)
+            self._windows.pop(key, None)
+
+class MongoBackend:
+    """
+    Attempt log in a MongoDB collection shared by all nodes. Documents expire
+    through a TTL index on `expires_at` (see indexes.ensure_indexes).
+    """
+
+    def __init__(self, db, collection_name='login_attempts'):
+        # Keep the (fork-safe) database handle and look the collection up per call
+        self.db = db
+        self.collection_name = collection_name
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    def acquire(self, rules):
+        """
+        Insert the attempt first, then count: concurrent requests from other
+        nodes see each other's inserts, so at most `limit` of them get through.
+        Attempts over the limit are deleted again so they don't extend the wait.
+        """
+        now = datetime.utcnow()
+        ids = self.collection.insert_many([{
+            'key': key,
+            'at': now,
+            'expires_at': now + timedelta(seconds=window)
+        } for key, limit, window in rules]).inserted_ids
+        wait = 0
+        for key, limit, window in rules:
+            since = now - timedelta(seconds=window)
+            query = {'key': key, 'at': {'$gt': since}}
+            if self.collection.count_documents(query) > limit:
+                oldest = self.collection.find_one(query, {'at': 1}, sort=[('at', 1)])
+                wait = max(wait, int((oldest['at'] - since).total_seconds()) + 1 if oldest else 1)
+        if wait:
+            self.release(ids)
+            return wait, []
+        return 0, ids
+
+    def release(self, attempts):
+        if attempts:
+            self.collection.delete_many({'_id': {'$in': list(attempts)}})
+
+    def clear(self, key):
+        self.collection.delete_many({'key': key})
+
+class RateLimiter:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def acquire(self, rules):
+        """
+        Check (key, limit, window) rules and, if every one allows it, record an
+        attempt under each key in the same step, so concurrent requests can't
+        all pass the check before any of them is counted.
+        Returns (seconds to wait, attempts); the wait is 0 when the attempt is
+        allowed, and the attempts can be handed back to release().
+        """
+        return self.backend.acquire(rules)
+
+    def release(self, attempts):
+        """Forget attempts that turned out not to count (e.g. the server was too busy)"""
+        self.backend.release(attempts)
+
+    def reset(self, key):
+        self.backend.clear(key)
+
+def init_login_limiter(app):
+    if app.config.get('LOGIN_RATE_LIMIT_BACKEND', 'memory') == 'mongo':
+        backend = MongoBackend(app.db)
+    else:
+        backend = MemoryBackend()
+    app.login_limiter = RateLimiter(backend)
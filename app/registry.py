@@ -0,0 +1,479 @@
+"""
+Declarative definitions of the four vital-event record types.
+
+Each RecordType describes what differs between births, deaths, marriages and
+divorces - the fields a new record is built from, the search and filter
+fields, derived values, what may be updated, exported and listed, and a few
+response-shape differences the frontend depends on. The routes themselves are
+generated from these definitions by routes.records.build_blueprint, so every
+record type shares one implementation of listing, scoping, numbering and
+auditing.
+"""
+import re
+from datetime import datetime
+
+from bson import ObjectId
+
+from .scope import get_scope
+from .models import BirthRecord, DeathRecord, MarriageRecord, DivorceRecord
+
+ETHIOPIAN_MONTHS = [
+    'መስከረም', 'ጥቅምት', 'ኅዳር', 'ታኅሣሥ', 'ጥር', 'የካቲት',
+    'መጋቢት', 'ሚያዝያ', 'ግንቦት', 'ሰኔ', 'ሐምሌ', 'ነሐሴ', 'ጳጉሜ'
+]
+
+def convert_to_ethiopian_date(gregorian_date):
+    """Simplified Gregorian -> Ethiopian date label (year - 8, month name, day)"""
+    try:
+        eth_year = gregorian_date.year - 8
+        eth_month = gregorian_date.month
+        if 1 <= eth_month <= 13:
+            month_name = ETHIOPIAN_MONTHS[eth_month - 1]
+        else:
+            month_name = 'Unknown'
+        return f"{eth_year} {month_name} {gregorian_date.day}"
+    except Exception:
+        return ""
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD string, or return None"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+def years_between(start, end):
+    """Whole years from one YYYY-MM-DD date to another, or None if either is missing or invalid"""
+    start_date = parse_date(start)
+    end_date = parse_date(end)
+    if not start_date or not end_date:
+        return None
+    years = end_date.year - start_date.year
+    if (end_date.month, end_date.day) < (start_date.month, start_date.day):
+        years -= 1
+    return years
+
+class Field:
+    """
+    One input field of a new record. A required field must be present in the
+    request; otherwise the value falls back to `default`, or to the registering
+    user's own location when `user_default` names one (e.g. 'region').
+    """
+
+    def __init__(self, name, required=False, default=None, user_default=None):
+        self.name = name
+        self.required = required
+        self.default = default
+        self.user_default = user_default
+
+    def value(self, data, current_user):
+        if self.required:
+            return data[self.name]
+        if self.user_default:
+            return data.get(self.name, current_user.get(self.user_default))
+        return data.get(self.name, self.default)
+
+class DerivedField:
+    """A stored value computed as whole years between two date fields (ages, durations)"""
+
+    def __init__(self, name, start, end):
+        self.name = name
+        self.start = start
+        self.end = end
+
+    def compute(self, data, existing=None):
+        existing = existing or {}
+        return years_between(
+            data.get(self.start) or existing.get(self.start),
+            data.get(self.end) or existing.get(self.end)
+        )
+
+    def depends_on(self, data):
+        return self.start in data or self.end in data
+
+def fields(*names, **options):
+    return [Field(name, **options) for name in names]
+
+def location_fields(prefix):
+    """<prefix>_region/_zone/_woreda/_kebele, defaulting to the registering user's location"""
+    return [Field(f'{prefix}_{level}', user_default=level) for level in ['region', 'zone', 'woreda', 'kebele']]
+
+class RecordType:
+    """
+    Everything the generic record routes need to know about one record type.
+
+    `scope` selects the listing rules compiled by app.scope: 'creator_or_region'
+    or 'region_and_woreda'.
+    Response styles: 'envelope' wraps payloads as {'success', 'message', 'data'};
+    'flat' returns them at the top level.
+    `count_strategy` chooses how listings fetch their page and total (see
+    app.listing); None uses LISTING_COUNT_STRATEGY.
+    """
+
+    def __init__(self, name, model, url_prefix, fields, search_fields, updatable_fields,
+                 listing_fields, export_defaults, describe_fields, describe_separator=' ',
+                 gender_field=None, ethiopian_date_field=None, derived_fields=None,
+                 scope='region_and_woreda', registered_by_object_id=False,
+                 response_style='flat', max_per_page=100, creator_can_delete=False,
+                 count_strategy=None):
+        self.name = name
+        self.label = name.capitalize()
+        self.blueprint_name = url_prefix.rsplit('/', 1)[-1]
+        self.url_prefix = url_prefix
+        self.collection = model.COLLECTION
+        self.region_field = model.REGION_FIELD
+        self.date_field = model.DATE_FIELD
+        self.id_field = f'{name}_id'
+        self.list_key = f'{name}_records'
+        self.fields = fields
+        self.search_fields = search_fields
+        self.updatable_fields = updatable_fields
+        # (response key, stored field) pairs; a bare name is used for both
+        self.listing_fields = [(f, f) if isinstance(f, str) else f for f in listing_fields]
+        self.describe_fields = describe_fields
+        self.describe_separator = describe_separator
+        self.gender_field = gender_field
+        self.ethiopian_date_field = ethiopian_date_field
+        self.derived_fields = derived_fields or []
+        self.scope = scope
+        self.registered_by_object_id = registered_by_object_id
+        self.response_style = response_style
+        self.max_per_page = max_per_page
+        self.creator_can_delete = creator_can_delete
+        self.count_strategy = count_strategy
+        self.woreda_field = self.region_field.replace('_region', '_woreda')
+
+        # Export every stored field: the updatable ones, then derived and create-only ones
+        stored_only = [self.ethiopian_date_field] + [f.name for f in self.derived_fields] + [f.name for f in fields]
+        self.export_columns = [self.id_field, 'certificate_number'] + updatable_fields + [
+            column for column in dict.fromkeys(stored_only) if column and column not in updatable_fields
+        ] + [
+            'status', 'registered_by', 'approved_by', 'approved_at', 'rejection_reason',
+            'rejected_by', 'rejected_at', 'data_quality_score', 'created_at', 'updated_at'
+        ]
+        self.export_defaults = export_defaults
+
+        # Listing pages only read what the serializer uses
+        self.listing_projection = {source: 1 for _, source in self.listing_fields}
+        self.listing_projection.update({'registered_by': 1, 'status': 1, 'created_at': 1})
+        self.describe_projection = {field: 1 for field in describe_fields}
+
+    # --- Documents ---------------------------------------------------------
+
+    def build_document(self, data, current_user, current_user_id, certificate_number, quality_score, warnings):
+        """Build a new record from validated request data"""
+        now = datetime.utcnow()
+        document = {'certificate_number': certificate_number}
+        for field in self.fields:
+            document[field.name] = field.value(data, current_user)
+        for derived in self.derived_fields:
+            document[derived.name] = derived.compute(data)
+
+        document.update({
+            'registered_by': ObjectId(current_user_id) if self.registered_by_object_id else current_user_id,
+            'status': 'draft',
+            'created_at': now,
+            'updated_at': now,
+            'data_quality_score': quality_score,
+            'validation_warnings': warnings if warnings else []
+        })
+
+        ethiopian_date = self.ethiopian_date(data.get(self.date_field))
+        if ethiopian_date is not None:
+            document[self.ethiopian_date_field] = ethiopian_date
+        return document
+
+    def ethiopian_date(self, value):
+        if not self.ethiopian_date_field:
+            return None
+        parsed = parse_date(value)
+        return convert_to_ethiopian_date(parsed.date()) if parsed else None
+
+    def derived_updates(self, data, record, update_data):
+        """Derived values to store when an update touches the dates they come from"""
+        updates = {}
+        for derived in self.derived_fields:
+            if derived.depends_on(data):
+                value = derived.compute(data, record)
+                if value is not None:
+                    updates[derived.name] = value
+        if self.date_field in update_data:
+            ethiopian_date = self.ethiopian_date(update_data[self.date_field])
+            if ethiopian_date is not None:
+                updates[self.ethiopian_date_field] = ethiopian_date
+        return updates
+
+    def describe(self, record):
+        """Human-readable name of a record for audit log entries"""
+        name = self.describe_separator.join(str(record.get(field) or '') for field in self.describe_fields)
+        return name.strip(' &') or 'Unknown'
+
+    def serialize_listing(self, record, registrar):
+        item = {self.id_field: str(record['_id'])}
+        for key, source in self.listing_fields:
+            item[key] = record.get(source)
+        item['status'] = record.get('status', 'draft')
+        item['registration_date'] = record['created_at'].isoformat() if record.get('created_at') else None
+        item['registered_by_name'] = registrar['full_name'] if registrar else None
+        return item
+
+    # --- Scoping and filters -----------------------------------------------
+
+    def is_creator(self, record, current_user_id):
+        # registered_by is an ObjectId for births and a string for the others
+        return str(record.get('registered_by')) == str(current_user_id)
+
+    def build_filters(self, current_user, current_user_id, args):
+        """Build the record query from the user's role scope and the request filters"""
+        all_filters = []
+
+        # Compiled once per user and shaped to the region/registrar indexes
+        scope = get_scope(self, current_user, current_user_id)
+        if not scope.unrestricted:
+            all_filters.append(scope.filter)
+
+        # Substring search; the term is escaped so it can't inject regex operators
+        search_query = args.get('search', '').strip()
+        if search_query:
+            search_regex = {'$regex': re.escape(search_query), '$options': 'i'}
+            all_filters.append({'$or': [{field: search_regex} for field in self.search_fields]})
+
+        gender = args.get('gender', '').strip()
+        if gender and self.gender_field:
+            all_filters.append({self.gender_field: gender})
+
+        region = args.get('region', '').strip()
+        if region:
+            all_filters.append({self.region_field: region})
+
+        status = args.get('status', '').strip()
+        if status:
+            all_filters.append({'status': status})
+
+        date_filter = {}
+        if args.get('date_from', '').strip():
+            date_filter['$gte'] = args.get('date_from').strip()
+        if args.get('date_to', '').strip():
+            date_filter['$lte'] = args.get('date_to').strip()
+        if date_filter:
+            all_filters.append({self.date_field: date_filter})
+
+        if len(all_filters) > 1:
+            return {'$and': all_filters}
+        if len(all_filters) == 1:
+            return all_filters[0]
+        return {}
+
+BIRTH = RecordType(
+    'birth', BirthRecord, '/api/births',
+    fields=[
+        *fields('child_first_name', 'child_father_name', required=True),
+        Field('child_grandfather_name'),
+        Field('child_gender', required=True),
+        Field('date_of_birth', required=True),
+        *fields('time_of_birth', 'weight_kg'),
+        Field('place_of_birth_type', default='hospital'),
+        Field('place_of_birth_name'),
+        *location_fields('birth'),
+        Field('father_full_name', required=True),
+        Field('father_nationality', default='Ethiopian'),
+        *fields('father_ethnicity', 'father_religion', 'father_date_of_birth', 'father_occupation',
+                'father_id_number', 'father_phone'),
+        Field('mother_full_name', required=True),
+        Field('mother_nationality', default='Ethiopian'),
+        *fields('mother_ethnicity', 'mother_religion', 'mother_date_of_birth', 'mother_occupation',
+                'mother_id_number', 'mother_phone', 'child_photo', 'father_photo', 'mother_photo')
+    ],
+    search_fields=['certificate_number', 'child_first_name', 'child_father_name', 'child_grandfather_name',
+                   'father_full_name', 'mother_full_name'],
+    updatable_fields=[
+        'child_first_name', 'child_father_name', 'child_grandfather_name', 'child_gender',
+        'date_of_birth', 'time_of_birth', 'weight_kg', 'place_of_birth_type', 'place_of_birth_name',
+        'birth_region', 'birth_zone', 'birth_woreda', 'birth_kebele', 'father_full_name',
+        'father_nationality', 'father_ethnicity', 'father_religion', 'father_date_of_birth',
+        'father_occupation', 'father_id_number', 'father_phone', 'mother_full_name',
+        'mother_nationality', 'mother_ethnicity', 'mother_religion', 'mother_date_of_birth',
+        'mother_occupation', 'mother_id_number', 'mother_phone', 'informant_name',
+        'informant_relationship', 'informant_phone', 'notes',
+        'child_photo', 'father_photo', 'mother_photo'
+    ],
+    listing_fields=[
+        'certificate_number', 'child_first_name', 'child_father_name', 'child_grandfather_name',
+        'child_gender', 'date_of_birth', ('place_of_birth', 'place_of_birth_name'), 'birth_region',
+        'birth_city', 'birth_zone', 'birth_woreda', 'birth_kebele', 'father_full_name',
+        'mother_full_name'
+    ],
+    export_defaults=[
+        'birth_id', 'certificate_number', 'child_first_name', 'child_father_name',
+        'child_grandfather_name', 'child_gender', 'date_of_birth', 'place_of_birth_name',
+        'birth_region', 'birth_zone', 'birth_woreda', 'birth_kebele', 'father_full_name',
+        'mother_full_name', 'status', 'created_at'
+    ],
+    describe_fields=['child_first_name', 'child_father_name'],
+    gender_field='child_gender',
+    ethiopian_date_field='ethiopian_date_of_birth',
+    scope='creator_or_region',
+    registered_by_object_id=True,
+    response_style='envelope',
+    max_per_page=50
+)
+
+DEATH = RecordType(
+    'death', DeathRecord, '/api/deaths',
+    fields=[
+        *fields('deceased_first_name', 'deceased_father_name', required=True),
+        Field('deceased_grandfather_name'),
+        Field('deceased_gender', required=True),
+        Field('date_of_birth'),
+        Field('date_of_death', required=True),
+        Field('time_of_death'),
+        Field('age_type', default='years'),
+        Field('place_of_death_type', default='hospital'),
+        Field('place_of_death_name'),
+        *location_fields('death'),
+        *fields('death_city', 'death_specific_location', 'cause_of_death'),
+        Field('cause_of_death_type', default='natural'),
+        Field('underlying_causes'),
+        Field('nationality', default='Ethiopian'),
+        *fields('ethnicity', 'religion', 'marital_status', 'occupation', 'education',
+                'usual_region', 'usual_zone', 'usual_woreda', 'usual_kebele', 'usual_city',
+                'usual_house_number', 'certifying_doctor', 'doctor_qualification'),
+        Field('death_cause_verified', default=False),
+        *fields('medical_certificate_number', 'health_facility_name', 'informant_name',
+                'informant_relationship', 'informant_id_number', 'informant_phone', 'informant_address',
+                'burial_date', 'burial_place', 'burial_region', 'burial_zone', 'burial_woreda',
+                'undertaker_name')
+    ],
+    search_fields=['certificate_number', 'deceased_first_name', 'deceased_father_name', 'deceased_grandfather_name'],
+    updatable_fields=[
+        'deceased_first_name', 'deceased_father_name', 'deceased_grandfather_name', 'deceased_gender',
+        'date_of_birth', 'date_of_death', 'time_of_death', 'age_at_death', 'age_type',
+        'place_of_death_type', 'place_of_death_name', 'death_region', 'death_zone', 'death_woreda',
+        'death_kebele', 'death_city', 'death_specific_location', 'cause_of_death', 'cause_of_death_type',
+        'underlying_causes', 'nationality', 'ethnicity', 'religion', 'marital_status', 'occupation',
+        'education', 'usual_region', 'usual_zone', 'usual_woreda', 'usual_kebele', 'usual_city',
+        'usual_house_number', 'certifying_doctor', 'doctor_qualification', 'death_cause_verified',
+        'medical_certificate_number', 'health_facility_name', 'informant_name', 'informant_relationship',
+        'informant_id_number', 'informant_phone', 'informant_address', 'burial_date', 'burial_place',
+        'burial_region', 'burial_zone', 'burial_woreda', 'undertaker_name', 'deceased_photo'
+    ],
+    listing_fields=[
+        'certificate_number', 'deceased_first_name', 'deceased_father_name', 'deceased_gender',
+        'date_of_death', 'age_at_death', ('place_of_death', 'place_of_death_name'), 'death_region',
+        'death_woreda', 'cause_of_death'
+    ],
+    export_defaults=[
+        'death_id', 'certificate_number', 'deceased_first_name', 'deceased_father_name',
+        'deceased_gender', 'date_of_death', 'age_at_death', 'place_of_death_name', 'death_region',
+        'death_woreda', 'cause_of_death', 'status', 'created_at'
+    ],
+    describe_fields=['deceased_first_name', 'deceased_father_name'],
+    gender_field='deceased_gender',
+    ethiopian_date_field='ethiopian_date_of_death',
+    derived_fields=[DerivedField('age_at_death', 'date_of_birth', 'date_of_death')]
+)
+
+def spouse_fields(prefix, marriage=False):
+    """The per-spouse block shared by marriage and divorce records"""
+    if marriage:
+        return [
+            Field(f'{prefix}_full_name', required=True),
+            *fields(f'{prefix}_father_name', f'{prefix}_grandfather_name'),
+            Field(f'{prefix}_nationality', default='Ethiopian'),
+            *fields(f'{prefix}_ethnicity', f'{prefix}_religion', f'{prefix}_date_of_birth'),
+            Field(f'{prefix}_previous_marital_status', default='single'),
+            *fields(f'{prefix}_occupation', f'{prefix}_education'),
+            Field(f'{prefix}_id_number', required=True),
+            *fields(f'{prefix}_phone', f'{prefix}_region', f'{prefix}_zone', f'{prefix}_woreda',
+                    f'{prefix}_kebele', f'{prefix}_city', f'{prefix}_house_number')
+        ]
+    return [
+        Field(f'{prefix}_full_name', required=True),
+        *fields(f'{prefix}_gender', f'{prefix}_date_of_birth', f'{prefix}_nationality', f'{prefix}_ethnicity',
+                f'{prefix}_religion', f'{prefix}_occupation', f'{prefix}_id_number', f'{prefix}_phone')
+    ]
+
+MARRIAGE = RecordType(
+    'marriage', MarriageRecord, '/api/marriages',
+    fields=[
+        Field('marriage_date', required=True),
+        Field('marriage_place'),
+        Field('marriage_type', default='civil'),
+        *location_fields('marriage'),
+        *spouse_fields('spouse1', marriage=True),
+        *spouse_fields('spouse2', marriage=True),
+        *fields('witness1_name', 'witness1_id_number', 'witness1_address',
+                'witness2_name', 'witness2_id_number', 'witness2_address',
+                'officiant_name', 'officiant_title', 'officiant_registration_number')
+    ],
+    search_fields=['certificate_number', 'spouse1_full_name', 'spouse2_full_name', 'husband_full_name', 'wife_full_name'],
+    updatable_fields=[
+        'marriage_date', 'marriage_place', 'marriage_type', 'marriage_region', 'marriage_zone',
+        'marriage_woreda', 'marriage_kebele', 'spouse1_full_name', 'spouse1_father_name',
+        'spouse1_grandfather_name', 'spouse1_nationality', 'spouse1_ethnicity', 'spouse1_religion',
+        'spouse1_date_of_birth', 'spouse1_previous_marital_status', 'spouse1_occupation',
+        'spouse1_education', 'spouse1_id_number', 'spouse1_phone', 'spouse1_region', 'spouse1_zone',
+        'spouse1_woreda', 'spouse1_kebele', 'spouse1_city', 'spouse1_house_number', 'spouse2_full_name',
+        'spouse2_father_name', 'spouse2_grandfather_name', 'spouse2_nationality', 'spouse2_ethnicity',
+        'spouse2_religion', 'spouse2_date_of_birth', 'spouse2_previous_marital_status',
+        'spouse2_occupation', 'spouse2_education', 'spouse2_id_number', 'spouse2_phone',
+        'spouse2_region', 'spouse2_zone', 'spouse2_woreda', 'spouse2_kebele', 'spouse2_city',
+        'spouse2_house_number', 'witness1_name', 'witness1_id_number', 'witness1_address',
+        'witness2_name', 'witness2_id_number', 'witness2_address', 'officiant_name', 'officiant_title',
+        'officiant_registration_number', 'groom_photo', 'bride_photo'
+    ],
+    listing_fields=[
+        'certificate_number', 'spouse1_full_name', 'spouse2_full_name', 'marriage_date',
+        'marriage_place', 'marriage_region', 'marriage_woreda'
+    ],
+    export_defaults=[
+        'marriage_id', 'certificate_number', 'spouse1_full_name', 'spouse2_full_name', 'marriage_date',
+        'marriage_place', 'marriage_region', 'marriage_woreda', 'status', 'created_at'
+    ],
+    describe_fields=['spouse1_full_name', 'spouse2_full_name'],
+    describe_separator=' & ',
+    ethiopian_date_field='ethiopian_marriage_date',
+    derived_fields=[
+        DerivedField('spouse1_age_at_marriage', 'spouse1_date_of_birth', 'marriage_date'),
+        DerivedField('spouse2_age_at_marriage', 'spouse2_date_of_birth', 'marriage_date')
+    ]
+)
+
+DIVORCE = RecordType(
+    'divorce', DivorceRecord, '/api/divorces',
+    fields=[
+        Field('divorce_date', required=True),
+        *fields('divorce_reason', 'case_number', 'court_name'),
+        *spouse_fields('spouse1'),
+        *spouse_fields('spouse2'),
+        *fields('marriage_date', 'witness1_name', 'witness1_phone', 'witness2_name', 'witness2_phone',
+                'husband_photo', 'wife_photo', 'notes'),
+        *location_fields('divorce')
+    ],
+    search_fields=['certificate_number', 'spouse1_full_name', 'spouse2_full_name', 'husband_full_name', 'wife_full_name'],
+    updatable_fields=[
+        'divorce_date', 'divorce_reason', 'case_number', 'court_name',
+        'spouse1_full_name', 'spouse1_gender', 'spouse1_date_of_birth', 'spouse1_nationality',
+        'spouse1_ethnicity', 'spouse1_religion', 'spouse1_occupation', 'spouse1_id_number', 'spouse1_phone',
+        'spouse2_full_name', 'spouse2_gender', 'spouse2_date_of_birth', 'spouse2_nationality',
+        'spouse2_ethnicity', 'spouse2_religion', 'spouse2_occupation', 'spouse2_id_number', 'spouse2_phone',
+        'marriage_date', 'witness1_name', 'witness1_phone', 'witness2_name', 'witness2_phone',
+        'husband_photo', 'wife_photo', 'notes'
+    ],
+    listing_fields=[
+        'certificate_number', 'spouse1_full_name', 'spouse2_full_name', 'divorce_date',
+        'court_name', 'divorce_region', 'divorce_woreda'
+    ],
+    export_defaults=[
+        'divorce_id', 'certificate_number', 'spouse1_full_name', 'spouse2_full_name', 'divorce_date',
+        'court_name', 'divorce_region', 'divorce_woreda', 'status', 'created_at'
+    ],
+    describe_fields=['spouse1_full_name', 'spouse2_full_name'],
+    describe_separator=' & ',
+    ethiopian_date_field='ethiopian_divorce_date',
+    derived_fields=[DerivedField('marriage_duration_years', 'marriage_date', 'divorce_date')],
+    creator_can_delete=True
+)
+
+# Record type name -> definition
+REGISTRY = {record_type.name: record_type for record_type in [BIRTH, DEATH, MARRIAGE, DIVORCE]}
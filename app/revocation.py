@@ -0,0 +1,198 @@
+"""
+Access/refresh token revocation.
+
+Revoked token ids (jti) live in the `revoked_tokens` collection until the token
+would have expired anyway (TTL index), and user-wide revocations - used when an
+account is deactivated - live in `revoked_users`. Each process mirrors both in
+memory: the jtis in a Bloom filter and the user cut-offs in a dict, refreshed
+by a background thread every REVOCATION_SYNC_INTERVAL seconds. Checking a token
+is therefore a couple of hash probes; only a Bloom hit (a revoked token, or a
+rare false positive) costs a database lookup.
+
+A user-wide revocation covers the tokens issued up to it. `iat` has whole
+seconds only, so tokens also carry `issued_at` (issue_claims) with
+milliseconds; otherwise a token issued right after the revocation, in the
+same second, would stay revoked for its whole lifetime.
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+ISSUED_AT_CLAIM = 'issued_at'
+
+def issue_claims():
+    """Claims every new token carries for revocation checks"""
+    return {ISSUED_AT_CLAIM: round(time.time(), 3)}
+
+class BloomFilter:
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class RevocationStore:
+    def __init__(self, db, sync_interval=5, capacity=100000, rebuild_interval=3600):
+        self.db = db
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._bloom = BloomFilter(capacity)
+        self._user_cutoffs = {}
+        self._synced_at = None
+        self._rebuilt_at = 0
+        self._pid = None
+        self._thread = None
+
+    def revoke(self, jti, expires_at, user_id=None, reason=None):
+        """Revoke one token; `expires_at` is the token's own expiry (a datetime)"""
+        now = datetime.utcnow()
+        self.db.revoked_tokens.update_one(
+            {'_id': jti},
+            {'$setOnInsert': {
+                'user_id': str(user_id) if user_id else None,
+                'reason': reason,
+                'revoked_at': now,
+                'expires_at': expires_at
+            }},
+            upsert=True
+        )
+        with self._lock:
+            self._bloom.add(jti)
+
+    def revoke_user(self, user_id, lifetime, reason=None):
+        """
+        Revoke every token issued to a user up to now. `lifetime` is the longest
+        token lifetime (a timedelta); after that no affected token can still be valid.
+        """
+        # Milliseconds, as MongoDB stores it, so every process compares against the same cut-off
+        now = datetime.utcnow()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        self.db.revoked_users.update_one(
+            {'_id': str(user_id)},
+            {'$set': {
+                'revoked_at': now,
+                'reason': reason,
+                'expires_at': now + lifetime
+            }},
+            upsert=True
+        )
+        with self._lock:
+            self._user_cutoffs[str(user_id)] = self._timestamp(now)
+
+    def is_revoked(self, jwt_payload):
+        self._ensure_started()
+
+        cutoff = self._user_cutoffs.get(str(jwt_payload.get('sub')))
+        issued_at = jwt_payload.get(ISSUED_AT_CLAIM, jwt_payload.get('iat', 0))
+        if cutoff is not None and issued_at <= cutoff:
+            return True
+
+        jti = jwt_payload.get('jti')
+        if not jti or jti not in self._bloom:
+            return False
+        # Bloom hit: confirm, since the filter can report false positives
+        return self.db.revoked_tokens.find_one({'_id': jti}, {'_id': 1}) is not None
+
+    @staticmethod
+    def _timestamp(value):
+        return (value - datetime(1970, 1, 1)).total_seconds()
+
+    def sync(self):
+        """Pull revocations made by other processes since the last sync"""
+        now = datetime.utcnow()
+        if time.time() - self._rebuilt_at > self.rebuild_interval or self._synced_at is None:
+            self._rebuild(now)
+            return
+
+        # Small overlap so writes racing the previous sync are not missed
+        since = self._synced_at - timedelta(seconds=self.sync_interval)
+        new_jtis = [d['_id'] for d in self.db.revoked_tokens.find({'revoked_at': {'$gt': since}}, {'_id': 1})]
+        new_users = list(self.db.revoked_users.find({'revoked_at': {'$gt': since}}, {'revoked_at': 1}))
+        with self._lock:
+            for jti in new_jtis:
+                self._bloom.add(jti)
+            for user in new_users:
+                self._user_cutoffs[user['_id']] = self._timestamp(user['revoked_at'])
+            if self._bloom.count > self._bloom.capacity:
+                # Rebuild with more room on the next pass rather than let the error rate climb
+                self._rebuilt_at = 0
+        self._synced_at = now
+
+    def _rebuild(self, now):
+        """Reload everything still unexpired; also drops expired entries from memory"""
+        live = {'expires_at': {'$gt': now}}
+        jtis = [d['_id'] for d in self.db.revoked_tokens.find(live, {'_id': 1})]
+        cutoffs = {d['_id']: self._timestamp(d['revoked_at']) for d in self.db.revoked_users.find(live, {'revoked_at': 1})}
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)))
+        for jti in jtis:
+            bloom.add(jti)
+
+        with self._lock:
+            self._bloom = bloom
+            self._user_cutoffs = cutoffs
+        self._synced_at = now
+        self._rebuilt_at = time.time()
+
+    def _ensure_started(self):
+        # Threads don't survive fork, so each worker process starts its own sync loop
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Load the current revocations before answering the first check
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning('Token revocation sync failed: %s', e)
+            self._thread = threading.Thread(target=self._run, name='revocation-sync', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning('Token revocation sync failed: %s', e)
+
+def init_revocation(app, jwt):
+    app.revocation = RevocationStore(
+        app.db,
+        sync_interval=app.config.get('REVOCATION_SYNC_INTERVAL', 5),
+        capacity=app.config.get('REVOCATION_BLOOM_CAPACITY', 100000)
+    )
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return app.revocation.is_revoked(jwt_payload)
+
+def token_lifetime(app):
+    """Longest lifetime of any token this app issues"""
+    return max(app.config['JWT_ACCESS_TOKEN_EXPIRES'], app.config['JWT_REFRESH_TOKEN_EXPIRES'])
@@ -0,0 +1,21 @@
+"""
+Audit trail of record changes (the audit_logs collection).
+
+The record routes call create_audit_log after each create, update, status
+change and delete; bulk imports and transitions write their entries in
+batches through app.bulk.insert_audit_logs, in the same shape.
+"""
+from flask import g, has_request_context, request
+
+from ..bulk import insert_audit_logs
+
+def create_audit_log(db, user_id, action, record_type, record_id, details, changes=None):
+    """Record one change by the calling user (named from the request's resolved user, if any)"""
+    user = g.get('current_user') if has_request_context() else None
+    insert_audit_logs(db, user or {'_id': user_id}, [{
+        'action': action,
+        'record_type': record_type,
+        'record_id': record_id,
+        'details': details,
+        'changes': changes or {}
+    }], request.remote_addr if has_request_context() else None)
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-import bcrypt
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token, jwt_required, get_jwt, get_jwt_identity
 from datetime import datetime
 from bson import ObjectId
+from ..user_context import get_current_user as get_request_user, load_user, remember_user
+from ..versions import bump_version
+from ..dashboard import USERS_COLLECTION, start_of_today
+from ..revocation import issue_claims
+from ..passwords import check_password, hash_password, needs_rehash, get_password_hasher, PasswordHasherBusy
 
 bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -10,9 +14,31 @@ def find_user_by_email(db, email):
     """Find user by email"""
     return db.users.find_one({'email': email})
 
-def find_user_by_id(db, user_id):
-    """Find user by ID"""
-    return db.users.find_one({'_id': ObjectId(user_id)})
+def create_user_access_token(user):
+    """Short-lived access token carrying the user's role and location scope"""
+    return create_access_token(
+        identity=str(user['_id']),
+        additional_claims={
+            'role': user['role'],
+            'email': user['email'],
+            'full_name': user['full_name'],
+            # Location scope, so protected routes can skip the users lookup
+            'region': user.get('region'),
+            'zone': user.get('zone'),
+            'woreda': user.get('woreda'),
+            'kebele': user.get('kebele'),
+            **issue_claims()
+        }
+    )
+
+def revoke_token(payload, reason):
+    """Revoke a decoded token until its own expiry"""
+    current_app.revocation.revoke(
+        payload['jti'],
+        datetime.utcfromtimestamp(payload['exp']),
+        user_id=payload.get('sub'),
+        reason=reason
+    )
 
 def update_last_login(db, user_id):
     """Update user's last login time"""
@@ -23,36 +49,62 @@ def update_last_login(db, user_id):
 
 @bp.route('/login', methods=['POST'])
 def login():
+    attempts = []
     try:
         data = request.get_json()
         if not data or not data.get('email') or not data.get('password'):
             return jsonify({'error': 'Email and password required'}), 400
         
+        # Throttle by client IP and by account before any database or bcrypt work.
+        # Each attempt takes a slot under both keys up front, so concurrent guesses
+        # are counted before any of them is checked; a successful login clears
+        # the account's slots again.
+        limiter = current_app.login_limiter
+        ip_key = f'ip:{request.remote_addr}'
+        email_key = f"email:{data['email'].strip().lower()}"
+        retry_after, attempts = limiter.acquire([
+            (ip_key, current_app.config.get('LOGIN_MAX_ATTEMPTS_PER_IP', 30), current_app.config.get('LOGIN_IP_WINDOW', 60)),
+            (email_key, current_app.config.get('LOGIN_MAX_FAILURES_PER_EMAIL', 5), current_app.config.get('LOGIN_EMAIL_WINDOW', 900))
+        ])
+        if retry_after:
+            return jsonify({
+                'error': 'Too many login attempts, please try again later',
+                'retry_after': retry_after
+            }), 429, {'Retry-After': str(retry_after)}
+        
         # Use current_app to get database
         db = current_app.db
         
         user = find_user_by_email(db, data['email'])
         
-        if user and bcrypt.checkpw(data['password'].encode('utf-8'), user['password_hash'].encode('utf-8')):
+        if user and check_password(data['password'], user['password_hash']):
             if not user.get('is_active', True):
                 return jsonify({'error': 'Account is deactivated'}), 403
             
-            # Update last login
+            limiter.reset(email_key)
+            
+            # Transparently upgrade hashes made with a different work factor
+            if needs_rehash(user['password_hash']):
+                db.users.update_one(
+                    {'_id': user['_id']},
+                    {'$set': {'password_hash': hash_password(data['password'])}}
+                )
+            
+            # Update last login; the first login of the day changes the admin dashboard's activeToday
             update_last_login(db, user['_id'])
+            if not user.get('last_login') or user['last_login'] < start_of_today():
+                bump_version(db, USERS_COLLECTION)
+            user['last_login'] = datetime.utcnow()
+            remember_user(user)
             
-            # Create access token
-            access_token = create_access_token(
-                identity=str(user['_id']),
-                additional_claims={
-                    'role': user['role'],
-                    'email': user['email'],
-                    'full_name': user['full_name']
-                }
-            )
+            # Short-lived access token, plus a refresh token to renew it
+            access_token = create_user_access_token(user)
+            refresh_token = create_refresh_token(identity=str(user['_id']), additional_claims=issue_claims())
             
             return jsonify({
                 'message': 'Login successful',
                 'access_token': access_token,
+                'refresh_token': refresh_token,
                 'user': {
                     'user_id': str(user['_id']),
                     'email': user['email'],
@@ -69,6 +121,53 @@ def login():
         else:
             return jsonify({'error': 'Invalid email or password'}), 401
             
+    except PasswordHasherBusy as e:
+        # The password was never checked, so the attempt doesn't count
+        current_app.login_limiter.release(attempts)
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """Issue a new access token for a valid, unrevoked refresh token"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        db = current_app.db
+        
+        user = load_user(db, current_user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 401
+        
+        if not user.get('is_active', True):
+            return jsonify({'error': 'Account is deactivated'}), 401
+        
+        return jsonify({'access_token': create_user_access_token(user)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    """Revoke the presented token, and the refresh token if one is sent in the body"""
+    try:
+        revoke_token(get_jwt(), 'logout')
+        
+        data = request.get_json(silent=True) or {}
+        if data.get('refresh_token'):
+            try:
+                refresh_payload = decode_token(data['refresh_token'])
+            except Exception:
+                refresh_payload = None
+            # Only revoke refresh tokens that belong to the caller
+            if refresh_payload and refresh_payload.get('sub') == get_jwt_identity():
+                revoke_token(refresh_payload, 'logout')
+        
+        return jsonify({'message': 'Logged out successfully'}), 200
+        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -81,15 +180,16 @@ def change_password():
         
         db = current_app.db
         
-        user = find_user_by_id(db, current_user_id)
+        # Read directly: cached profiles never hold the password hash
+        user = db.users.find_one({'_id': ObjectId(current_user_id)})
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        if not bcrypt.checkpw(data.get('current_password', '').encode('utf-8'), user['password_hash'].encode('utf-8')):
+        if not check_password(data.get('current_password', ''), user['password_hash']):
             return jsonify({'error': 'Current password is incorrect'}), 400
         
         # Update password
-        new_password_hash = bcrypt.hashpw(data['new_password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        new_password_hash = hash_password(data['new_password'])
         db.users.update_one(
             {'_id': ObjectId(current_user_id)},
             {'$set': {'password_hash': new_password_hash, 'updated_at': datetime.utcnow()}}
@@ -97,6 +197,8 @@ def change_password():
         
         return jsonify({'message': 'Password updated successfully'}), 200
         
+    except PasswordHasherBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -108,7 +210,7 @@ def get_current_user():
         
         db = current_app.db
         
-        user = find_user_by_id(db, current_user_id)
+        user = load_user(db, current_user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -134,3 +236,17 @@ def get_current_user():
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@bp.route('/hasher-stats', methods=['GET'])
+@jwt_required()
+def get_hasher_stats():
+    """Queue depth and latency of the password hashing pool (admin only)"""
+    try:
+        current_user = get_request_user()
+        if not current_user or current_user['role'] != 'admin':
+            return jsonify({'error': 'Permission denied'}), 403
+        
+        return jsonify({'hasher': get_password_hasher().stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,52 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..user_context import get_current_user
+from ..db import get_db
+from ..http_cache import cache_headers
+from ..compression import precompressed_response
+from ..versions import collection_versions
+from ..dashboard import officer_stat_queries, admin_stat_queries, summarize_stats, count_stats, record_collections, admin_collections, snapshot_key, OFFICER_TOTALS, ADMIN_TOTALS
+
+bp = Blueprint('dashboard', __name__, url_prefix='/api/users')
+
+@bp.route('/stats', methods=['GET'])
+@jwt_required()
+def get_admin_stats():
+    """User and record counts for the admin dashboard (admin only)"""
+    try:
+        current_user = get_current_user()
+        if not current_user or current_user['role'] != 'admin':
+            return jsonify({'error': 'Permission denied'}), 403
+
+        # Dashboard counts tolerate replica lag (MONGODB_LISTING_READ_PREFERENCE)
+        db = get_db('listing')
+        queries = admin_stat_queries()
+        response = precompressed_response(
+            snapshot_key('admin', queries, collection_versions(db, admin_collections())),
+            lambda: summarize_stats(count_stats(db, queries), ADMIN_TOTALS)
+        )
+        return cache_headers(response, 'dashboard'), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/officer-stats', methods=['GET'])
+@jwt_required()
+def get_officer_stats():
+    """Record counts within the caller's scope, plus the caller's own registrations"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({'error': 'User not found'}), 404
+
+        db = get_db('listing')
+        queries = officer_stat_queries(current_user, current_user_id)
+        response = precompressed_response(
+            snapshot_key('officer', queries, collection_versions(db, record_collections())),
+            lambda: summarize_stats(count_stats(db, queries), OFFICER_TOTALS)
+        )
+        return cache_headers(response, 'dashboard'), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,101 @@
+from flask import Blueprint, jsonify, current_app, request
+from flask_jwt_extended import jwt_required
+from ..user_context import get_current_user
+from ..db import get_db
+from ..profiling import save_settings, clear_settings, PROFILING_SETTINGS_COLLECTION
+
+bp = Blueprint('diagnostics', __name__, url_prefix='/api/diagnostics')
+
+@bp.route('/db-pool', methods=['GET'])
+@jwt_required()
+def get_db_pool_stats():
+    """MongoDB connection pool usage of the process serving the request (admin only)"""
+    try:
+        current_user = get_current_user()
+        if not current_user or current_user['role'] != 'admin':
+            return jsonify({'error': 'Permission denied'}), 403
+        
+        return jsonify({'pool': current_app.mongo.stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/query-cache', methods=['GET'])
+@jwt_required()
+def get_query_cache_stats():
+    """Hit ratio and size of the listing query and response caches in the process serving the request (admin only)"""
+    try:
+        current_user = get_current_user()
+        if not current_user or current_user['role'] != 'admin':
+            return jsonify({'error': 'Permission denied'}), 403
+        
+        query_cache = current_app.query_cache
+        response_cache = current_app.response_cache
+        return jsonify({
+            'query_cache': query_cache.stats() if query_cache else None,
+            'response_cache': response_cache.stats() if response_cache else None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/profiling', methods=['GET'])
+@jwt_required()
+def get_profiling_settings():
+    """Current runtime request sampling for profiling (admin only)"""
+    try:
+        current_user = get_current_user()
+        if not current_user or current_user['role'] != 'admin':
+            return jsonify({'error': 'Permission denied'}), 403
+        
+        if not current_app.profiling_settings:
+            return jsonify({'error': 'Profiling is disabled (PROFILING_ENABLED)'}), 404
+        
+        settings = get_db()[PROFILING_SETTINGS_COLLECTION].find_one({'_id': 'current'}, {'_id': 0})
+        return jsonify({'settings': settings}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/profiling', methods=['PUT'])
+@jwt_required()
+def update_profiling_settings():
+    """Profile a share of requests in every process for a while (admin only):
+    {"sample_rate": 0.01, "routes": {"/api/births/": 0.2}, "mode": "sample", "minutes": 30}"""
+    try:
+        current_user = get_current_user()
+        if not current_user or current_user['role'] != 'admin':
+            return jsonify({'error': 'Permission denied'}), 403
+        
+        if not current_app.profiling_settings:
+            return jsonify({'error': 'Profiling is disabled (PROFILING_ENABLED)'}), 404
+        
+        data = request.get_json() or {}
+        settings = save_settings(
+            get_db(),
+            float(data.get('sample_rate', 0)),
+            {route: float(rate) for route, rate in (data.get('routes') or {}).items()},
+            data.get('mode') or current_app.config.get('PROFILING_MODE', 'sample'),
+            int(data.get('minutes', 30))
+        )
+        return jsonify({'settings': settings}), 200
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/profiling', methods=['DELETE'])
+@jwt_required()
+def stop_profiling():
+    """Turn runtime sampling off again (admin only)"""
+    try:
+        current_user = get_current_user()
+        if not current_user or current_user['role'] != 'admin':
+            return jsonify({'error': 'Permission denied'}), 403
+        
+        clear_settings(get_db())
+        return jsonify({'message': 'Profiling sampling stopped'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
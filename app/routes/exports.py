@@ -0,0 +1,61 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from ..jobs import ReportJobQueue, serialize_job
+from ..models import RECORD_MODELS
+from ..user_context import get_current_user
+
+bp = Blueprint('exports', __name__, url_prefix='/api/exports')
+
+EXPORT_ROLES = ['admin', 'statistician']
+
+@bp.route('/parquet', methods=['POST'])
+@jwt_required()
+def start_parquet_export():
+    """Queue an incremental (or full, with "full": true) Parquet export for the report workers"""
+    try:
+        db = current_app.db
+
+        current_user = get_current_user()
+        if not current_user or current_user['role'] not in EXPORT_ROLES:
+            return jsonify({'error': 'Permission denied'}), 403
+
+        data = request.get_json(silent=True) or {}
+        record_types = data.get('record_types') or list(RECORD_MODELS.keys())
+        invalid_types = [t for t in record_types if t not in RECORD_MODELS]
+        if invalid_types:
+            return jsonify({'error': f"Invalid record types: {', '.join(invalid_types)}"}), 400
+
+        params = {'record_types': sorted(set(record_types)), 'full': bool(data.get('full', False))}
+
+        # Every run must look at the current watermark, so never reuse a finished job
+        job, _ = ReportJobQueue(db).enqueue('parquet_export', params, str(current_user['_id']), reuse_artifacts=False)
+
+        return jsonify({'job': serialize_job(job)}), 202
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/parquet', methods=['GET'])
+@jwt_required()
+def get_parquet_export_status():
+    """Last export watermark per record type"""
+    try:
+        db = current_app.db
+
+        current_user = get_current_user()
+        if not current_user or current_user['role'] not in EXPORT_ROLES:
+            return jsonify({'error': 'Permission denied'}), 403
+
+        watermarks = {}
+        for state in db.export_watermarks.find({'_id': {'$regex': '^parquet:'}}):
+            watermarks[state['_id'].split(':', 1)[1]] = {
+                'watermark': state['watermark'].isoformat() if state.get('watermark') else None,
+                'exported_at': state['exported_at'].isoformat() if state.get('exported_at') else None,
+                'partitions_written': state.get('partitions_written', 0),
+                'full': state.get('full', False)
+            }
+
+        return jsonify({'watermarks': watermarks}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
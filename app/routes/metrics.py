@@ -0,0 +1,25 @@
+import hmac
+
+from flask import Blueprint, jsonify, current_app, request
+from ..metrics import METRICS, CONTENT_TYPE
+
+bp = Blueprint('metrics', __name__)
+
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request and MongoDB metrics of the process serving the request, for Prometheus"""
+    try:
+        if not current_app.config.get('METRICS_ENABLED'):
+            return jsonify({'error': 'Metrics are disabled'}), 404
+
+        # Scrapers can't log in; a shared bearer token guards the endpoint instead
+        token = current_app.config.get('METRICS_TOKEN')
+        if not token:
+            return jsonify({'error': 'Metrics need METRICS_TOKEN to be set'}), 403
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'error': 'Invalid metrics token'}), 401
+
+        return current_app.response_class(METRICS.render(), mimetype=CONTENT_TYPE), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,680 @@
+"""
+Routes shared by every vital-event record type.
+
+build_blueprint(record_type) generates the create, import, list, export,
+detail, update, status, bulk-status and delete endpoints for one RecordType
+from app.registry; births.py, deaths.py, marriages.py and divorces.py just
+call it with their definition.
+"""
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from .audit_logs import create_audit_log
+from ..validators import validate_request_data
+from ..exports import export_response
+from ..user_context import get_current_user, load_user, load_users
+from ..scope import get_scope, find_scoped
+from ..db import get_db, write_session, read_session, allows_stale_reads
+from ..listing import fetch_page
+from ..versions import bump_version, version_document
+from ..parquet_export import note_vacated_partition, record_partition
+from ..query_cache import data_version
+from ..http_cache import listing_etag, record_etag, is_not_modified, cache_headers, not_modified
+from ..bulk import allocate_certificate_numbers, is_certificate_clash, CERTIFICATE_ATTEMPTS, detect_format, parse_rows, import_records, bulk_update_status, RECORD_STATUSES
+
+def clean_empty_values(data):
+    """Treat empty strings and 'null' from forms as missing values"""
+    for key, value in list(data.items()):
+        if value == '' or value == 'null':
+            data[key] = None
+    return data
+
+# Newest registrations first
+LISTING_SORT = [('created_at', -1)]
+
+# What a record's ETag is derived from
+TIMESTAMP_PROJECTION = {'updated_at': 1, 'created_at': 1}
+
+def count_strategy(record_type, config):
+    return record_type.count_strategy or config.get('LISTING_COUNT_STRATEGY', 'concurrent')
+
+def listing_cache_key(query_cache, record_type, versions, scope, args, filters, skip, per_page):
+    """Query cache key of a listing page; a query pinned to one region uses that region's version"""
+    region = args.get('region', '').strip() or scope.pinned(record_type.region_field)
+    return query_cache.key(
+        record_type.collection,
+        data_version(versions, region),
+        filters,
+        LISTING_SORT,
+        skip,
+        per_page,
+        record_type.listing_projection
+    )
+
+def page_params(args, max_per_page):
+    page = max(1, args.get('page', 1, type=int) or 1)
+    per_page = max(1, args.get('per_page', 20, type=int) or 20)
+    if max_per_page:
+        per_page = min(max_per_page, per_page)
+    return page, per_page
+
+def listing_response(record_type, records, registrars, total, page, per_page):
+    """Body of a listing page: an envelope for births, flat for the other record types"""
+    records_data = [
+        record_type.serialize_listing(
+            record,
+            registrars.get(str(record['registered_by'])) if record.get('registered_by') else None
+        )
+        for record in records
+    ]
+    pages = (total + per_page - 1) // per_page
+
+    if record_type.response_style == 'envelope':
+        return {
+            'success': True,
+            'data': {
+                record_type.list_key: records_data,
+                'pagination': {
+                    'total': total,
+                    'pages': pages,
+                    'current_page': page,
+                    'per_page': per_page
+                }
+            }
+        }
+
+    return {
+        record_type.list_key: records_data,
+        'total': total,
+        'pages': pages,
+        'current_page': page
+    }
+
+def detail_response(record_type, record, registrar, approver):
+    """Body of a single record with the registrar/approver names (the JSON provider encodes ObjectIds and dates)"""
+    record_data = {record_type.id_field if key == '_id' else key: value for key, value in record.items()}
+
+    record_data['registered_by_name'] = registrar['full_name'] if registrar else None
+    record_data['approved_by_name'] = approver['full_name'] if approver else None
+    return record_data
+
+def build_blueprint(record_type):
+    """Generate the blueprint serving one record type at its existing URL prefix"""
+    bp = Blueprint(record_type.blueprint_name, __name__, url_prefix=record_type.url_prefix)
+    name = record_type.name
+    label = record_type.label
+    id_field = record_type.id_field
+    envelope = record_type.response_style == 'envelope'
+
+    def collection(operation='default'):
+        return get_db(operation)[record_type.collection]
+
+    def not_found():
+        return jsonify({'error': f'{label} record not found'}), 404
+
+    def collection_changed(regions=None):
+        # Retires cached pages and listing ETags; in the write session so the next read sees it.
+        # `regions` of the records written, None when unknown (bulk writes)
+        bump_version(get_db(), record_type.collection, regions, session=write_session())
+
+    @bp.route('/', methods=['POST'], endpoint=f'create_{name}_record')
+    @jwt_required()
+    def create_record():
+        try:
+            current_user_id = get_jwt_identity()
+            data = clean_empty_values(request.get_json())
+
+            db = current_app.db
+
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'error': 'User not found'}), 404
+
+            # Validate data
+            is_valid, errors, warnings, quality_score = validate_request_data(db, name, data)
+            if not is_valid:
+                return jsonify({
+                    'success': False,
+                    'errors': errors,
+                    'warnings': warnings
+                }), 400
+
+            # Sequential numbers from the shared counter, so single and bulk registrations never collide;
+            # a number that turns out to be taken anyway is replaced by the next one
+            for attempt in range(CERTIFICATE_ATTEMPTS):
+                certificate_number = allocate_certificate_numbers(
+                    db,
+                    name,
+                    current_user.get('region', 'AD'),
+                    current_user.get('woreda', '01'),
+                    1
+                )[0]
+
+                document = record_type.build_document(data, current_user, current_user_id, certificate_number, quality_score, warnings)
+
+                try:
+                    result = collection().insert_one(document, session=write_session())
+                    break
+                except DuplicateKeyError as e:
+                    if not is_certificate_clash(e) or attempt == CERTIFICATE_ATTEMPTS - 1:
+                        raise
+            record_id = str(result.inserted_id)
+            collection_changed([document.get(record_type.region_field)])
+
+            # Create audit log
+            create_audit_log(
+                db=get_db('audit'),
+                user_id=current_user_id,
+                action='create',
+                record_type=name,
+                record_id=record_id,
+                details=f"Created {name} record for {record_type.describe(data)}"
+            )
+
+            return jsonify({
+                'message': f'{label} record created successfully',
+                id_field: record_id,
+                'certificate_number': certificate_number
+            }), 201
+
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @bp.route('/import', methods=['POST'], endpoint=f'import_{name}_records')
+    @jwt_required()
+    def import_records_route():
+        """
+        Register many records from a CSV or NDJSON upload (multipart field
+        `file`, or the raw request body). Rows are validated in parallel and
+        inserted in batches; the response reports the outcome of every row.
+        Pass dry_run=1 to validate without inserting.
+        """
+        try:
+            current_user_id = get_jwt_identity()
+
+            db = current_app.db
+
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'error': 'User not found'}), 404
+
+            if current_user['role'] not in ['admin', 'vms_officer', 'clerk']:
+                return jsonify({'error': 'Permission denied'}), 403
+
+            upload = request.files.get('file')
+            if upload:
+                text = upload.read().decode('utf-8-sig')
+                fmt = detect_format(upload.filename, upload.mimetype, request.args.get('format'))
+            else:
+                text = request.get_data(as_text=True)
+                fmt = detect_format(None, request.content_type, request.args.get('format'))
+
+            if not text.strip():
+                return jsonify({'error': 'No rows to import'}), 400
+
+            rows = parse_rows(text, fmt)
+            max_rows = current_app.config.get('IMPORT_MAX_ROWS', 20000)
+            if len(rows) > max_rows:
+                return jsonify({'error': f'Import is limited to {max_rows} rows per upload'}), 400
+
+            report = import_records(
+                db,
+                collection(),
+                name,
+                rows,
+                current_user,
+                lambda data, certificate_number, quality_score, warnings: record_type.build_document(
+                    data, current_user, current_user_id, certificate_number, quality_score, warnings
+                ),
+                record_type.describe,
+                ip_address=request.remote_addr,
+                batch_size=current_app.config.get('IMPORT_BATCH_SIZE', 1000),
+                workers=current_app.config.get('IMPORT_VALIDATION_WORKERS', 4),
+                dry_run=request.args.get('dry_run') in ['1', 'true'],
+                session=write_session(),
+                audit_db=get_db('audit')
+            )
+
+            if report['inserted']:
+                collection_changed()
+
+            if report['failed'] == 0 or report['dry_run']:
+                status_code = 200
+            elif report['inserted']:
+                status_code = 207
+            else:
+                status_code = 400
+
+            return jsonify({
+                'success': report['failed'] == 0,
+                'data': report
+            }), status_code
+
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @bp.route('/', methods=['GET'], endpoint=f'get_{name}_records')
+    @jwt_required()
+    def get_records():
+        try:
+            current_user_id = get_jwt_identity()
+
+            db = current_app.db
+
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'error': 'User not found'}), 404
+
+            filters = record_type.build_filters(current_user, current_user_id, request.args)
+
+            page, per_page = page_params(request.args, record_type.max_per_page)
+            skip = (page - 1) * per_page
+
+            # Listing reads may be served by secondaries (MONGODB_LISTING_READ_PREFERENCE);
+            # a client that just wrote sends X-After-Operation-Time and reads in a causal session
+            session = read_session()
+            versions = version_document(get_db('listing'), record_type.collection, session=session)
+
+            # Unchanged collection and query: answer from the version counter alone
+            etag = listing_etag(
+                record_type.collection,
+                versions.get('version', 0),
+                filters,
+                page,
+                per_page,
+                current_app.config.get('LISTING_ETAG_TTL', 60)
+            )
+            if is_not_modified(etag):
+                return not_modified('listing', etag)
+
+            def fetch():
+                return fetch_page(
+                    collection('listing'),
+                    filters,
+                    record_type.listing_projection,
+                    LISTING_SORT,
+                    skip,
+                    per_page,
+                    strategy=count_strategy(record_type, current_app.config),
+                    session=session,
+                    workers=current_app.config.get('LISTING_COUNT_THREADS', 8)
+                )
+
+            # Other users with the same scope and filters share the cached page
+            query_cache = current_app.query_cache
+            if query_cache:
+                scope = get_scope(record_type, current_user, current_user_id)
+                key = listing_cache_key(query_cache, record_type, versions, scope, request.args, filters, skip, per_page)
+                records, total = query_cache.fetch(key, fetch)
+            else:
+                records, total = fetch()
+
+            # One users query for every registrar on the page
+            registrars = load_users(db, [record.get('registered_by') for record in records])
+
+            response = jsonify(listing_response(record_type, records, registrars, total, page, per_page))
+            return cache_headers(response, 'listing', etag), 200
+
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @bp.route('/export', methods=['GET'], endpoint=f'export_{name}_records')
+    @jwt_required()
+    def export_records():
+        """Stream every matching record as CSV, NDJSON or a JSON array, with the same role scoping as the listing"""
+        try:
+            current_user_id = get_jwt_identity()
+
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'error': 'User not found'}), 404
+
+            filters = record_type.build_filters(current_user, current_user_id, request.args)
+
+            response = export_response(
+                collection('listing'),
+                filters,
+                id_field,
+                record_type.export_columns,
+                record_type.export_defaults,
+                record_type.list_key
+            )
+            return cache_headers(response, 'export')
+
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @bp.route('/<string:record_id>', methods=['GET'], endpoint=f'get_{name}_record')
+    @jwt_required()
+    def get_record(record_id):
+        try:
+            db = current_app.db
+
+            current_user_id = get_jwt_identity()
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'error': 'User not found'}), 404
+
+            # Callers that accept a possibly stale copy (?allow_stale=1) may read from a secondary
+            stale = allows_stale_reads()
+            records = collection('detail' if stale else 'default')
+            session = read_session() if stale else None
+
+            # Admins and statisticians see everything; others their own records or their region's
+            scope = get_scope(record_type, current_user, current_user_id, access='view')
+
+            if request.if_none_match:
+                # Revalidation: compare against the record's timestamps before reading all of it
+                probe, status_code = find_scoped(records, record_id, scope, TIMESTAMP_PROJECTION, session=session)
+                etag = record_etag(record_type.collection, probe) if status_code == 200 else None
+                if is_not_modified(etag):
+                    return not_modified('detail', etag)
+
+            record, status_code = find_scoped(records, record_id, scope, session=session)
+            if status_code == 404:
+                return not_found()
+            if status_code == 403:
+                return jsonify({'error': 'Permission denied'}), 403
+
+            registrar = load_user(db, record['registered_by']) if record.get('registered_by') else None
+            approver = load_user(db, record['approved_by']) if record.get('approved_by') else None
+
+            response = jsonify(detail_response(record_type, record, registrar, approver))
+            return cache_headers(response, 'detail', record_etag(record_type.collection, record)), 200
+
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @bp.route('/<string:record_id>', methods=['PUT'], endpoint=f'update_{name}_record')
+    @jwt_required()
+    def update_record(record_id):
+        try:
+            current_user_id = get_jwt_identity()
+            data = request.get_json()
+
+            session = write_session()
+            record = collection().find_one({'_id': ObjectId(record_id)}, session=session)
+            if not record:
+                return not_found()
+
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'error': 'User not found'}), 404
+
+            # Allow update if user is the creator, admin, or vms_officer
+            if not record_type.is_creator(record, current_user_id):
+                if current_user['role'] not in ['admin', 'vms_officer']:
+                    return jsonify({'error': 'Permission denied'}), 403
+
+            # Update fields - Track only fields that actually changed
+            update_data = {}
+            changed_fields_details = {}
+
+            for field in record_type.updatable_fields:
+                if field in data:
+                    old_value = record.get(field)
+                    new_value = data[field]
+
+                    if old_value != new_value:
+                        update_data[field] = new_value
+                        changed_fields_details[field] = {
+                            'old': old_value,
+                            'new': new_value
+                        }
+
+            # Ages, durations and the Ethiopian date follow the dates they come from
+            derived = record_type.derived_updates(data, record, update_data)
+
+            # If no fields changed, return early
+            if not update_data and not derived:
+                return jsonify({
+                    'success': False,
+                    'error': 'No changes detected'
+                }), 400
+
+            changed_field_names = list(update_data.keys())
+            update_data.update(derived)
+            update_data['updated_at'] = datetime.utcnow()
+
+            result = collection().update_one(
+                {'_id': ObjectId(record_id)},
+                {'$set': update_data},
+                session=session
+            )
+
+            if result.modified_count == 0:
+                return jsonify({
+                    'success': False,
+                    'error': 'No changes made'
+                }), 400
+
+            # Both regions when the record moved
+            collection_changed([record.get(record_type.region_field), update_data.get(record_type.region_field)])
+            old_partition = record_partition(record.get(record_type.region_field), record.get(record_type.date_field))
+            new_partition = record_partition(
+                update_data.get(record_type.region_field, record.get(record_type.region_field)),
+                update_data.get(record_type.date_field, record.get(record_type.date_field))
+            )
+            if new_partition != old_partition:
+                note_vacated_partition(
+                    get_db(), record_type.collection, record.get(record_type.region_field),
+                    record.get(record_type.date_field), session=session
+                )
+
+            # Create a more readable details message
+            if len(changed_field_names) <= 3:
+                details = f"Updated: {', '.join(changed_field_names)}"
+            else:
+                details = f"Updated {len(changed_field_names)} fields: {', '.join(changed_field_names[:3])}, ..."
+
+            create_audit_log(
+                db=get_db('audit'),
+                user_id=current_user_id,
+                action='update',
+                record_type=name,
+                record_id=record_id,
+                details=details,
+                changes=changed_fields_details
+            )
+
+            if envelope:
+                return jsonify({
+                    'success': True,
+                    'message': f'{label} record updated successfully',
+                    'data': {
+                        id_field: record_id,
+                        'updated_at': update_data['updated_at'].isoformat()
+                    }
+                }), 200
+
+            return jsonify({'message': f'{label} record updated successfully'}), 200
+
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @bp.route('/bulk-status', methods=['POST'], endpoint=f'bulk_update_{name}_record_status')
+    @jwt_required()
+    def bulk_update_record_status():
+        """
+        Approve, reject or otherwise transition many records at once.
+        Body: {"status": "approved", "ids": [...]} or {"status": "approved", "filter": {...}},
+        with an optional rejection_reason or per-record reasons ({id: reason}).
+        """
+        try:
+            current_user_id = get_jwt_identity()
+            db = current_app.db
+
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'error': 'User not found'}), 404
+
+            data = request.get_json() or {}
+
+            report = bulk_update_status(
+                db,
+                collection(),
+                name,
+                current_user,
+                current_user_id,
+                data,
+                lambda args: record_type.build_filters(current_user, current_user_id, args),
+                ip_address=request.remote_addr,
+                max_records=current_app.config.get('BULK_STATUS_MAX_RECORDS', 5000),
+                session=write_session(),
+                audit_db=get_db('audit')
+            )
+
+            if report['updated']:
+                collection_changed()
+
+            message = f"{report['updated']} {name} records updated to {report['status']}"
+            if envelope:
+                return jsonify({'success': True, 'message': message, 'data': report}), 200
+            return jsonify({'message': message, **report}), 200
+
+        except PermissionError as e:
+            return jsonify({'error': str(e)}), 403
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @bp.route('/<string:record_id>/status', methods=['PUT', 'PATCH'], endpoint=f'update_{name}_record_status')
+    @jwt_required()
+    def update_record_status(record_id):
+        try:
+            current_user_id = get_jwt_identity()
+
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'error': 'User not found'}), 404
+
+            data = request.get_json()
+            new_status = data.get('status')
+
+            if new_status not in RECORD_STATUSES:
+                return jsonify({'error': 'Invalid status'}), 400
+
+            update_data = {'status': new_status, 'updated_at': datetime.utcnow()}
+
+            if new_status == 'approved':
+                if current_user['role'] not in ['admin', 'vms_officer']:
+                    return jsonify({'error': 'Only admin or VMS officer can approve records'}), 403
+                update_data['approved_by'] = current_user_id
+                update_data['approved_at'] = datetime.utcnow()
+
+            if new_status == 'rejected':
+                update_data['rejection_reason'] = data.get('rejection_reason', '')
+                update_data['rejected_by'] = current_user_id
+                update_data['rejected_at'] = datetime.utcnow()
+
+            # Returns the region too, for the version bump
+            record = collection().find_one_and_update(
+                {'_id': ObjectId(record_id)},
+                {'$set': update_data},
+                projection={record_type.region_field: 1},
+                session=write_session()
+            )
+
+            if not record:
+                return not_found()
+
+            collection_changed([record.get(record_type.region_field)])
+
+            # Create audit log
+            action = 'approve' if new_status == 'approved' else 'reject' if new_status == 'rejected' else 'status_change'
+            details = f"Changed status to {new_status}"
+            if new_status == 'rejected' and data.get('rejection_reason'):
+                details += f" - Reason: {data.get('rejection_reason')}"
+
+            create_audit_log(
+                db=get_db('audit'),
+                user_id=current_user_id,
+                action=action,
+                record_type=name,
+                record_id=record_id,
+                details=details,
+                changes={'status': new_status}
+            )
+
+            message = f'{label} record status updated to {new_status}'
+            if envelope:
+                return jsonify({
+                    'success': True,
+                    'message': message,
+                    'data': {
+                        'status': new_status,
+                        'updated_at': update_data['updated_at'].isoformat()
+                    }
+                }), 200
+
+            return jsonify({'message': message}), 200
+
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @bp.route('/<string:record_id>', methods=['DELETE'], endpoint=f'delete_{name}_record')
+    @jwt_required()
+    def delete_record(record_id):
+        try:
+            current_user_id = get_jwt_identity()
+
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'error': 'User not found'}), 404
+
+            session = write_session()
+            if record_type.creator_can_delete:
+                # Creators may delete their own records, so read it before deciding
+                record = collection().find_one(
+                    {'_id': ObjectId(record_id)},
+                    {'registered_by': 1, record_type.region_field: 1, record_type.date_field: 1, **record_type.describe_projection},
+                    session=session
+                )
+                if not record:
+                    return not_found()
+                if not record_type.is_creator(record, current_user_id) and current_user['role'] not in ['admin', 'vms_officer']:
+                    return jsonify({'error': 'Permission denied'}), 403
+                if collection().delete_one({'_id': ObjectId(record_id)}, session=session).deleted_count == 0:
+                    return not_found()
+            else:
+                if current_user['role'] != 'admin':
+                    return jsonify({'error': 'Only administrators can delete records'}), 403
+
+                # Delete and get the record details for the audit log in one round trip
+                record = collection().find_one_and_delete(
+                    {'_id': ObjectId(record_id)},
+                    projection={record_type.region_field: 1, record_type.date_field: 1, **record_type.describe_projection},
+                    session=session
+                )
+                if not record:
+                    return not_found()
+
+            collection_changed([record.get(record_type.region_field)])
+            note_vacated_partition(
+                get_db(), record_type.collection, record.get(record_type.region_field),
+                record.get(record_type.date_field), session=session
+            )
+
+            create_audit_log(
+                db=get_db('audit'),
+                user_id=current_user_id,
+                action='delete',
+                record_type=name,
+                record_id=record_id,
+                details=f"Deleted {name} record for {record_type.describe(record)}",
+                changes={'deleted': True}
+            )
+
+            return jsonify({'message': f'{label} record deleted successfully'}), 200
+
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    return bp
@@ -0,0 +1,404 @@
+from flask import Blueprint, request, jsonify, current_app, send_file
+from flask_jwt_extended import jwt_required
+from datetime import datetime
+from bson import ObjectId
+import os
+from ..jobs import ReportJobQueue, serialize_job, report_data_version, ARTIFACT_FORMATS
+from ..models import RECORD_MODELS
+from ..user_context import get_current_user
+
+bp = Blueprint('reports', __name__, url_prefix='/api/reports')
+
+REPORT_ROLES = ['admin', 'statistician']
+
+def get_job_queue(db):
+    return ReportJobQueue(db)
+
+def serialize_report(report):
+    report_data = {}
+    for key, value in report.items():
+        if isinstance(value, ObjectId):
+            report_data[key] = str(value)
+        elif isinstance(value, datetime):
+            report_data[key] = value.isoformat()
+        else:
+            report_data[key] = value
+    return report_data
+
+def can_access_report(current_user, report):
+    return current_user['role'] == 'admin' or report.get('created_by') == current_user['_id']
+
+def build_job_params(data):
+    """Normalize generation parameters so equivalent requests share a cache key"""
+    record_types = data.get('record_types') or list(RECORD_MODELS.keys())
+    if isinstance(record_types, str):
+        record_types = [record_types] if record_types != 'all' else list(RECORD_MODELS.keys())
+    invalid_types = [t for t in record_types if t not in RECORD_MODELS]
+    if invalid_types:
+        raise ValueError(f"Invalid record types: {', '.join(invalid_types)}")
+
+    formats = data.get('formats') or ARTIFACT_FORMATS
+    if isinstance(formats, str):
+        formats = [formats]
+    invalid_formats = [f for f in formats if f not in ARTIFACT_FORMATS]
+    if invalid_formats:
+        raise ValueError(f"Invalid formats: {', '.join(invalid_formats)}")
+
+    region = data.get('region')
+    if region == 'All Regions':
+        region = None
+
+    return {
+        'title': data.get('title'),
+        'record_types': sorted(set(record_types)),
+        'region': region,
+        'start_date': data.get('start_date'),
+        'end_date': data.get('end_date'),
+        'formats': sorted(set(formats))
+    }
+
+@bp.route('/', methods=['GET'])
+@jwt_required()
+def get_reports():
+    try:
+        db = current_app.db
+
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({'error': 'User not found'}), 404
+
+        if current_user['role'] not in REPORT_ROLES:
+            return jsonify({'error': 'Permission denied'}), 403
+
+        # Statisticians see their own reports, admins see everything that was submitted
+        if current_user['role'] == 'admin':
+            filters = {'status': {'$ne': 'draft'}}
+        else:
+            filters = {'created_by': current_user['_id']}
+
+        status = request.args.get('status', '').strip()
+        if status:
+            filters['status'] = status
+
+        reports = db.reports.find(filters, {'content': 0}).sort('created_at', -1).limit(200)
+
+        return jsonify({'reports': [serialize_report(r) for r in reports]}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/', methods=['POST'])
+@jwt_required()
+def create_report():
+    try:
+        db = current_app.db
+
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({'error': 'User not found'}), 404
+
+        if current_user['role'] not in REPORT_ROLES:
+            return jsonify({'error': 'Only statisticians and admins can create reports'}), 403
+
+        data = request.get_json()
+        if not data or not data.get('title'):
+            return jsonify({'error': 'Report title is required'}), 400
+
+        report = {
+            'title': data['title'],
+            'report_type': data.get('report_type', 'custom'),
+            'date_range': data.get('date_range', {}),
+            'content': data.get('content', {}),
+            'sections': data.get('sections', {}),
+            'format': data.get('format', 'pdf'),
+            'summary': data.get('summary'),
+            'notes': data.get('notes'),
+            'priority': data.get('priority', 'normal'),
+            'status': 'draft',
+            'created_by': current_user['_id'],
+            'created_by_name': current_user['full_name'],
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+
+        result = db.reports.insert_one(report)
+        report['_id'] = result.inserted_id
+
+        return jsonify({
+            'message': 'Report created successfully',
+            'report': serialize_report(report)
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<string:report_id>', methods=['GET'])
+@jwt_required()
+def get_report(report_id):
+    try:
+        db = current_app.db
+
+        report = db.reports.find_one({'_id': ObjectId(report_id)})
+        if not report:
+            return jsonify({'error': 'Report not found'}), 404
+
+        current_user = get_current_user()
+        if not current_user or not can_access_report(current_user, report):
+            return jsonify({'error': 'Permission denied'}), 403
+
+        return jsonify({'report': serialize_report(report)}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<string:report_id>', methods=['PUT'])
+@jwt_required()
+def update_report(report_id):
+    try:
+        db = current_app.db
+
+        report = db.reports.find_one({'_id': ObjectId(report_id)})
+        if not report:
+            return jsonify({'error': 'Report not found'}), 404
+
+        current_user = get_current_user()
+        if not current_user or report.get('created_by') != current_user['_id']:
+            return jsonify({'error': 'Permission denied'}), 403
+
+        if report.get('status') != 'draft':
+            return jsonify({'error': 'Only draft reports can be edited'}), 400
+
+        data = request.get_json() or {}
+        updatable_fields = ['title', 'report_type', 'date_range', 'content', 'sections', 'format', 'summary', 'notes', 'priority']
+        update_data = {field: data[field] for field in updatable_fields if field in data}
+        if not update_data:
+            return jsonify({'error': 'No changes detected'}), 400
+
+        update_data['updated_at'] = datetime.utcnow()
+        db.reports.update_one({'_id': report['_id']}, {'$set': update_data})
+
+        return jsonify({'message': 'Report updated successfully'}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<string:report_id>', methods=['DELETE'])
+@jwt_required()
+def delete_report(report_id):
+    try:
+        db = current_app.db
+
+        report = db.reports.find_one({'_id': ObjectId(report_id)}, {'created_by': 1})
+        if not report:
+            return jsonify({'error': 'Report not found'}), 404
+
+        current_user = get_current_user()
+        if not current_user or not can_access_report(current_user, report):
+            return jsonify({'error': 'Permission denied'}), 403
+
+        db.reports.delete_one({'_id': report['_id']})
+
+        return jsonify({'message': 'Report deleted successfully'}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<string:report_id>/submit', methods=['POST'])
+@jwt_required()
+def submit_report(report_id):
+    try:
+        db = current_app.db
+
+        report = db.reports.find_one({'_id': ObjectId(report_id)}, {'created_by': 1, 'status': 1})
+        if not report:
+            return jsonify({'error': 'Report not found'}), 404
+
+        current_user = get_current_user()
+        if not current_user or report.get('created_by') != current_user['_id']:
+            return jsonify({'error': 'Permission denied'}), 403
+
+        if report.get('status') not in ['draft', 'rejected']:
+            return jsonify({'error': f"Report is already {report.get('status')}"}), 400
+
+        now = datetime.utcnow()
+        db.reports.update_one(
+            {'_id': report['_id']},
+            {'$set': {'status': 'submitted', 'submitted_at': now, 'updated_at': now}}
+        )
+
+        return jsonify({'message': 'Report submitted successfully'}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<string:report_id>/review', methods=['POST'])
+@jwt_required()
+def review_report(report_id):
+    try:
+        db = current_app.db
+
+        current_user = get_current_user()
+        if not current_user or current_user['role'] != 'admin':
+            return jsonify({'error': 'Only admin can review reports'}), 403
+
+        data = request.get_json() or {}
+        new_status = data.get('status')
+        if new_status not in ['approved', 'rejected']:
+            return jsonify({'error': 'Invalid status'}), 400
+
+        now = datetime.utcnow()
+        result = db.reports.update_one(
+            {'_id': ObjectId(report_id), 'status': 'submitted'},
+            {'$set': {
+                'status': new_status,
+                'feedback': data.get('feedback'),
+                'reviewed_by': current_user['_id'],
+                'reviewed_by_name': current_user['full_name'],
+                'reviewed_at': now,
+                'updated_at': now
+            }}
+        )
+
+        if result.matched_count == 0:
+            return jsonify({'error': 'Submitted report not found'}), 404
+
+        return jsonify({'message': f'Report {new_status}'}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<string:report_id>/generate', methods=['POST'])
+@jwt_required()
+def generate_report_artifacts(report_id):
+    """Queue artifact generation for a saved report using its date range and region filter"""
+    try:
+        db = current_app.db
+
+        report = db.reports.find_one(
+            {'_id': ObjectId(report_id)},
+            {'title': 1, 'date_range': 1, 'created_by': 1, 'content.filters': 1}
+        )
+        if not report:
+            return jsonify({'error': 'Report not found'}), 404
+
+        current_user = get_current_user()
+        if not current_user or not can_access_report(current_user, report):
+            return jsonify({'error': 'Permission denied'}), 403
+
+        data = request.get_json(silent=True) or {}
+        filters = report.get('content', {}).get('filters') or {}
+        date_range = report.get('date_range') or {}
+        record_type = filters.get('recordType')
+
+        params = build_job_params({
+            'title': report.get('title'),
+            'record_types': data.get('record_types') or (record_type if record_type and record_type != 'all' else None),
+            'region': data.get('region', filters.get('region')),
+            'start_date': date_range.get('start'),
+            'end_date': date_range.get('end'),
+            'formats': data.get('formats')
+        })
+
+        job, cached = get_job_queue(db).enqueue(
+            'report', params, str(current_user['_id']), report_id=report_id,
+            reuse_artifacts=not data.get('regenerate'), data_version=report_data_version(db, params)
+        )
+        db.reports.update_one({'_id': report['_id']}, {'$set': {'last_job_id': job['_id']}})
+
+        return jsonify({'job': serialize_job(job), 'cached': cached}), 200 if cached else 202
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/jobs', methods=['POST'])
+@jwt_required()
+def create_report_job():
+    """Queue an ad-hoc report without saving a report document"""
+    try:
+        db = current_app.db
+
+        current_user = get_current_user()
+        if not current_user or current_user['role'] not in REPORT_ROLES:
+            return jsonify({'error': 'Permission denied'}), 403
+
+        data = request.get_json() or {}
+        params = build_job_params(data)
+        job, cached = get_job_queue(db).enqueue(
+            'report', params, str(current_user['_id']),
+            reuse_artifacts=not data.get('regenerate'), data_version=report_data_version(db, params)
+        )
+
+        return jsonify({'job': serialize_job(job), 'cached': cached}), 200 if cached else 202
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def find_accessible_job(db, job_id):
+    """Return (job, error_response); jobs are visible to the requester and admins"""
+    job = get_job_queue(db).get(job_id)
+    if not job:
+        return None, (jsonify({'error': 'Job not found'}), 404)
+
+    current_user = get_current_user()
+    if not current_user or (current_user['role'] != 'admin' and job.get('requested_by') != str(current_user['_id'])):
+        return None, (jsonify({'error': 'Permission denied'}), 403)
+
+    return job, None
+
+@bp.route('/jobs/<string:job_id>', methods=['GET'])
+@jwt_required()
+def get_report_job(job_id):
+    try:
+        job, error = find_accessible_job(current_app.db, job_id)
+        if error:
+            return error
+
+        return jsonify({'job': serialize_job(job)}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/jobs/<string:job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_report_job(job_id):
+    try:
+        db = current_app.db
+
+        job, error = find_accessible_job(db, job_id)
+        if error:
+            return error
+
+        job = get_job_queue(db).cancel(job_id)
+        if not job:
+            return jsonify({'error': 'Job has already finished'}), 400
+
+        return jsonify({'job': serialize_job(job)}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/jobs/<string:job_id>/download', methods=['GET'])
+@jwt_required()
+def download_report_artifact(job_id):
+    try:
+        job, error = find_accessible_job(current_app.db, job_id)
+        if error:
+            return error
+
+        if job['status'] != 'completed':
+            return jsonify({'error': f"Job is {job['status']}"}), 409
+
+        fmt = request.args.get('format', 'pdf')
+        path = job.get('artifacts', {}).get(fmt)
+        if not path or not os.path.exists(path):
+            return jsonify({'error': f'No {fmt.upper()} artifact for this job'}), 404
+
+        title = (job['params'].get('title') or 'report').replace(' ', '_')
+        return send_file(path, as_attachment=True, download_name=f'{title}.{fmt}')
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
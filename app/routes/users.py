@@ -1,52 +1,134 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from bson import ObjectId
-import bcrypt
+import re
 from datetime import datetime
+from ..user_context import get_current_user, invalidate_user, CLAIM_FIELDS
+from ..passwords import hash_password, PasswordHasherBusy
+from ..revocation import token_lifetime
+from ..versions import bump_version
+from ..dashboard import USERS_COLLECTION
 
 bp = Blueprint('users', __name__, url_prefix='/api/users')
 
-def find_user_by_id(db, user_id):
-    return db.users.find_one({'_id': ObjectId(user_id)})
+USER_ROLES = ['admin', 'vms_officer', 'clerk', 'statistician']
+
+UPDATABLE_USER_FIELDS = [
+    'email', 'full_name', 'role', 'department', 'region', 'zone', 'woreda',
+    'kebele', 'phone', 'badge_number', 'office_name', 'is_active'
+]
+
+# Fields returned by the user directory (never the password hash)
+DIRECTORY_FIELDS = [
+    'email', 'full_name', 'role', 'department', 'region', 'zone', 'woreda', 'kebele',
+    'phone', 'badge_number', 'office_name', 'is_active', 'last_login', 'created_at'
+]
+
+USER_DIRECTORY_LIMIT = 50
+USER_DIRECTORY_MAX_LIMIT = 200
+
+# Values the admin dashboard sends to PATCH /users/<id>/status
+ACTIVE_STATUSES = ['active', 'approved']
+INACTIVE_STATUSES = ['inactive', 'rejected', 'suspended', 'deactivated']
 
 def find_user_by_email(db, email):
     return db.users.find_one({'email': email})
 
+def revoke_user_tokens(user_id, reason):
+    """Invalidate every token already issued to the user, on all nodes within seconds"""
+    current_app.revocation.revoke_user(user_id, token_lifetime(current_app), reason)
+
+def build_user_filters(args):
+    """Directory query from the search/role/region/is_active parameters"""
+    filters = []
+    
+    search = args.get('search', '').strip()
+    if search:
+        escaped = re.escape(search)
+        filters.append({'$or': [
+            # Anchored prefixes can use the email and badge number indexes
+            {'email': {'$regex': f'^{re.escape(search.lower())}'}},
+            {'badge_number': {'$regex': f'^{escaped}'}},
+            # Match the start of any word in the name
+            {'full_name': {'$regex': f'(^|\\s){escaped}', '$options': 'i'}}
+        ]})
+    
+    role = args.get('role', '').strip()
+    if role:
+        filters.append({'role': role})
+    
+    region = args.get('region', '').strip()
+    if region:
+        filters.append({'region': region})
+    
+    is_active = args.get('is_active', '').strip().lower()
+    if is_active in ['true', '1']:
+        # Users created before is_active existed count as active
+        filters.append({'is_active': {'$ne': False}})
+    elif is_active in ['false', '0']:
+        filters.append({'is_active': False})
+    
+    if len(filters) > 1:
+        return {'$and': filters}
+    return filters[0] if filters else {}
+
+def serialize_user(user, fields):
+    user_data = {'user_id': str(user['_id'])}
+    for field in fields:
+        value = user.get(field, True if field == 'is_active' else None)
+        user_data[field] = value.isoformat() if isinstance(value, datetime) else value
+    return user_data
+
 @bp.route('/', methods=['GET'])
 @jwt_required()
 def get_users():
+    """
+    User directory (admin only). Filters: search, role, region, is_active.
+    Paginated by keyset: pass the returned next_cursor as `cursor` for the next
+    page. `fields` limits the returned fields.
+    """
     try:
-        current_user_id = get_jwt_identity()
-        
         db = current_app.db
         
-        current_user = find_user_by_id(db, current_user_id)
+        current_user = get_current_user()
         
         if current_user['role'] != 'admin':
             return jsonify({'error': 'Permission denied'}), 403
         
-        users = list(db.users.find({}))
-        users_data = []
-        
-        for user in users:
-            users_data.append({
-                'user_id': str(user['_id']),
-                'email': user['email'],
-                'full_name': user['full_name'],
-                'role': user['role'],
-                'department': user.get('department'),
-                'region': user.get('region'),
-                'zone': user.get('zone'),
-                'woreda': user.get('woreda'),
-                'kebele': user.get('kebele'),
-                'phone': user.get('phone'),
-                'badge_number': user.get('badge_number'),
-                'is_active': user.get('is_active', True),
-                'last_login': user.get('last_login').isoformat() if user.get('last_login') else None,
-                'created_at': user.get('created_at').isoformat() if user.get('created_at') else None
-            })
-        
-        return jsonify({'users': users_data}), 200
+        fields = DIRECTORY_FIELDS
+        if request.args.get('fields'):
+            fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+            unknown = [f for f in fields if f not in DIRECTORY_FIELDS]
+            if unknown:
+                return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+        
+        limit = min(USER_DIRECTORY_MAX_LIMIT, max(1, request.args.get('limit', USER_DIRECTORY_LIMIT, type=int)))
+        
+        filters = build_user_filters(request.args)
+        
+        # Newest first; the cursor is the last _id of the previous page
+        cursor = request.args.get('cursor')
+        page_filters = filters
+        if cursor:
+            if not ObjectId.is_valid(cursor):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            page_filters = {'$and': [filters, {'_id': {'$lt': ObjectId(cursor)}}]} if filters else {'_id': {'$lt': ObjectId(cursor)}}
+        
+        projection = {field: 1 for field in fields}
+        users = list(db.users.find(page_filters, projection).sort('_id', -1).limit(limit + 1))
+        
+        has_more = len(users) > limit
+        users = users[:limit]
+        
+        response = {
+            'users': [serialize_user(user, fields) for user in users],
+            'next_cursor': str(users[-1]['_id']) if has_more else None
+        }
+        # Count once, on the first page only
+        if not cursor:
+            response['total'] = db.users.count_documents(filters)
+        
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -55,11 +137,9 @@ def get_users():
 @jwt_required()
 def create_user():
     try:
-        current_user_id = get_jwt_identity()
-        
         db = current_app.db
         
-        current_user = find_user_by_id(db, current_user_id)
+        current_user = get_current_user()
         
         if current_user['role'] != 'admin':
             return jsonify({'error': 'Only admin can create users'}), 403
@@ -72,7 +152,7 @@ def create_user():
         if db.users.find_one({'badge_number': data['badge_number']}):
             return jsonify({'error': 'Badge number already exists'}), 400
         
-        password_hash = bcrypt.hashpw(data.get('password', 'password123').encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        password_hash = hash_password(data.get('password', 'password123'))
         
         user_data = {
             'email': data['email'],
@@ -93,11 +173,115 @@ def create_user():
         }
         
         result = db.users.insert_one(user_data)
+        bump_version(db, USERS_COLLECTION)
         
         return jsonify({
             'message': 'User created successfully',
             'user_id': str(result.inserted_id)
         }), 201
         
+    except PasswordHasherBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<string:user_id>', methods=['PUT'])
+@jwt_required()
+def update_user(user_id):
+    try:
+        db = current_app.db
+        
+        current_user = get_current_user()
+        
+        if current_user['role'] != 'admin':
+            return jsonify({'error': 'Only admin can update users'}), 403
+        
+        user = db.users.find_one({'_id': ObjectId(user_id)}, {field: 1 for field in CLAIM_FIELDS + ['badge_number']})
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        data = request.get_json() or {}
+        update_data = {field: data[field] for field in UPDATABLE_USER_FIELDS if field in data}
+        
+        if 'role' in update_data and update_data['role'] not in USER_ROLES:
+            return jsonify({'error': 'Invalid role'}), 400
+        
+        if update_data.get('email') and update_data['email'] != user.get('email'):
+            if find_user_by_email(db, update_data['email']):
+                return jsonify({'error': 'Email already registered'}), 400
+        
+        if update_data.get('badge_number') and update_data['badge_number'] != user.get('badge_number'):
+            if db.users.find_one({'badge_number': update_data['badge_number']}, {'_id': 1}):
+                return jsonify({'error': 'Badge number already exists'}), 400
+        
+        if data.get('password'):
+            update_data['password_hash'] = hash_password(data['password'])
+        
+        update_data['updated_at'] = datetime.utcnow()
+        
+        db.users.update_one({'_id': ObjectId(user_id)}, {'$set': update_data})
+        invalidate_user(user_id)
+        if 'is_active' in update_data:
+            bump_version(db, USERS_COLLECTION)
+        
+        # Tokens carry the role and the region/zone/woreda scope (CLAIM_FIELDS), which other
+        # processes trust until the token is revoked, so deactivation or any change to them ends
+        # existing sessions
+        if update_data.get('is_active') is False:
+            revoke_user_tokens(user_id, 'deactivated')
+        elif any(field in update_data and update_data[field] != user.get(field) for field in CLAIM_FIELDS):
+            revoke_user_tokens(user_id, 'profile_changed')
+        
+        return jsonify({'message': 'User updated successfully'}), 200
+        
+    except PasswordHasherBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<string:user_id>/status', methods=['PATCH'])
+@jwt_required()
+def update_user_status(user_id):
+    try:
+        db = current_app.db
+        
+        current_user = get_current_user()
+        
+        if current_user['role'] != 'admin':
+            return jsonify({'error': 'Only admin can change user status'}), 403
+        
+        data = request.get_json() or {}
+        status = data.get('status')
+        
+        if 'is_active' in data:
+            is_active = bool(data['is_active'])
+        elif status in ACTIVE_STATUSES:
+            is_active = True
+        elif status in INACTIVE_STATUSES:
+            is_active = False
+        else:
+            return jsonify({'error': 'Invalid status'}), 400
+        
+        if str(current_user['_id']) == user_id and not is_active:
+            return jsonify({'error': 'You cannot deactivate your own account'}), 400
+        
+        result = db.users.update_one(
+            {'_id': ObjectId(user_id)},
+            {'$set': {'is_active': is_active, 'updated_at': datetime.utcnow()}}
+        )
+        
+        if result.matched_count == 0:
+            return jsonify({'error': 'User not found'}), 404
+        
+        invalidate_user(user_id)
+        bump_version(db, USERS_COLLECTION)
+        if not is_active:
+            revoke_user_tokens(user_id, 'deactivated')
+        
+        return jsonify({
+            'message': f"User {'activated' if is_active else 'deactivated'} successfully",
+            'is_active': is_active
+        }), 200
+        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,153 @@
+"""
+Role-based access scopes for record queries.
+
+A user's scope over one record type is compiled once into a Scope: a Mongo
+filter fragment for queries and an equivalent predicate for documents already
+in hand. Scopes depend only on the user's id, role and location, so they are
+cached under exactly those values - a role or location change simply compiles
+a new one.
+
+Two kinds of access are compiled:
+- 'list': what listings, exports and bulk updates may touch. Births let clerks
+  see their own records or their region's and officers their region's; the
+  other types limit non-admin, non-statistician users to their region and woreda.
+- 'view': what a single record may be opened by - its registrar, or anyone
+  from the record's region.
+"""
+from functools import lru_cache
+
+from bson import ObjectId
+
+# Roles that see every record regardless of location
+UNSCOPED_ROLES = ('admin', 'statistician')
+
+class Scope:
+    """
+    Equality clauses on record fields, combined with AND (`match='all'`) or OR
+    (`match='any'`). A scope without clauses allows everything. Each clause is
+    (field, allowed values); a record matches it when its value is one of them.
+    """
+
+    def __init__(self, clauses=(), match='all'):
+        self.clauses = tuple((field, tuple(values)) for field, values in clauses)
+        self.match = match
+        self.unrestricted = not self.clauses
+        self.filter = self._compile_filter()
+        # String forms, so ObjectId and string ids stored in the same field compare equal
+        self._allowed = [
+            (field, set(values), {str(v) for v in values if isinstance(v, (str, ObjectId))})
+            for field, values in self.clauses
+        ]
+
+    def _compile_filter(self):
+        conditions = [
+            {field: values[0]} if len(values) == 1 else {field: {'$in': list(values)}}
+            for field, values in self.clauses
+        ]
+        if not conditions:
+            return {}
+        if len(conditions) == 1:
+            return conditions[0]
+        if self.match == 'any':
+            return {'$or': conditions}
+        merged = {}
+        for condition in conditions:
+            merged.update(condition)
+        return merged
+
+    def allows(self, record):
+        """In-memory equivalent of the filter, for documents fetched without it"""
+        if self.unrestricted:
+            return True
+        results = (
+            record.get(field) in allowed or (
+                isinstance(record.get(field), ObjectId) and str(record.get(field)) in allowed_strings
+            )
+            for field, allowed, allowed_strings in self._allowed
+        )
+        return any(results) if self.match == 'any' else all(results)
+
+    def pinned(self, field):
+        """The single value every allowed record has in `field`, or None"""
+        if self.match == 'any' and len(self.clauses) > 1:
+            return None
+        for clause_field, values in self.clauses:
+            if clause_field == field and len(values) == 1:
+                return values[0]
+        return None
+
+    def apply(self, query):
+        """Restrict a query to this scope"""
+        if self.unrestricted:
+            return query
+        if not query:
+            return self.filter
+        return {'$and': [self.filter, query]}
+
+def creator_values(user_id):
+    # registered_by holds an ObjectId for births and a string for the other record types
+    user_id = str(user_id)
+    return (ObjectId(user_id), user_id) if ObjectId.is_valid(user_id) else (user_id,)
+
+@lru_cache(maxsize=4096)
+def compile_scope(record_type, access, user_id, role, region, woreda):
+    """Build the Scope for one user over one record type (cached on every argument)"""
+    if role in UNSCOPED_ROLES:
+        return Scope()
+
+    creator = ('registered_by', creator_values(user_id))
+
+    if access == 'view':
+        return Scope([creator, (record_type.region_field, (region,))], match='any')
+
+    if record_type.scope == 'creator_or_region':
+        if role == 'clerk':
+            clauses = [creator]
+            if region:
+                clauses.append((record_type.region_field, (region,)))
+            return Scope(clauses, match='any')
+        if role == 'vms_officer' and region:
+            return Scope([(record_type.region_field, (region,))])
+        return Scope()
+
+    clauses = []
+    if region:
+        clauses.append((record_type.region_field, (region,)))
+    if woreda:
+        clauses.append((record_type.woreda_field, (woreda,)))
+    return Scope(clauses)
+
+def get_scope(record_type, current_user, current_user_id, access='list'):
+    """The current user's compiled scope over a record type"""
+    return compile_scope(
+        record_type,
+        access,
+        str(current_user_id),
+        current_user.get('role'),
+        current_user.get('region'),
+        current_user.get('woreda')
+    )
+
+def find_scoped(collection, record_id, scope, projection=None, session=None):
+    """
+    Fetch a record by id within a scope in one query. Returns (record, status):
+    status is 200, or 404 when the record doesn't exist, or 403 when it exists
+    outside the scope - the extra existence probe only runs on a miss.
+    """
+    query = {'_id': ObjectId(record_id)}
+    record = collection.find_one(scope.apply(query), projection, session=session)
+    if record:
+        return record, 200
+    if scope.unrestricted or not collection.find_one(query, {'_id': 1}, session=session):
+        return None, 404
+    return None, 403
+
+async def find_scoped_async(collection, record_id, scope, projection=None, session=None):
+    """find_scoped for a Motor collection (async serving mode)"""
+    query = {'_id': ObjectId(record_id)}
+    record = await collection.find_one(scope.apply(query), projection, session=session)
+    if record:
+        return record, 200
+    if scope.unrestricted or not await collection.find_one(query, {'_id': 1}, session=session):
+        return None, 404
+    return None, 403
@@ -0,0 +1,277 @@
+"""
+Slow-query log.
+
+A pymongo CommandListener (on the pymongo and Motor clients alike) times the
+commands that read or filter records. Any that take SLOW_QUERY_THRESHOLD_MS or
+longer are logged and stored in `slow_queries` with:
+- the route that ran it (the URL rule, e.g. /api/births/)
+- its shape: the filter, sort and pipeline with every value replaced by '?',
+  so `{'region': 'Oromia', 'status': 'submitted'}` and
+  `{'region': 'Amhara', 'status': 'approved'}` count as one query
+- duration and documents returned
+The worst offenders - SLOW_QUERY_EXPLAIN_MS or longer - also get an
+explain('executionStats') sample (documents and keys examined, the winning
+plan), at most once per shape every SLOW_QUERY_EXPLAIN_INTERVAL seconds, run
+with the analytics read preference.
+
+Logging and explaining happen on a background thread, never in the command's
+own thread; when that thread falls behind, entries are dropped rather than
+queued without bound. Entries expire after RETENTION_SECONDS.
+
+    python slow_query_report.py --hours 24 --limit 20
+
+ranks the stored shapes by total time (top_shapes()), for tuning the indexes
+in app/indexes.py.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import has_request_context, request
+from pymongo.monitoring import CommandListener
+
+SLOW_QUERIES_COLLECTION = 'slow_queries'
+RETENTION_SECONDS = 7 * 24 * 3600
+MAX_PENDING = 1000
+
+logger = logging.getLogger(__name__)
+
+# Commands carrying a filter worth shaping; explain() only runs the reads
+MONITORED_COMMANDS = {'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify'}
+EXPLAINABLE_COMMANDS = {'find', 'aggregate', 'count', 'distinct'}
+
+# Session, transaction and routing fields explain() doesn't accept
+COMMAND_META_FIELDS = {'lsid', 'txnNumber', 'autocommit', 'startTransaction', 'readConcern', 'writeConcern'}
+
+def value_shape(value):
+    """The structure of a filter with every value replaced by '?'"""
+    if isinstance(value, dict):
+        return {key: value_shape(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, dict) for item in value):
+        # $or / $and branches keep their structure
+        return [value_shape(item) for item in value]
+    return '?'
+
+def pipeline_shape(pipeline):
+    shape = []
+    for stage in pipeline:
+        name, spec = next(iter(stage.items()))
+        if name == '$match':
+            shape.append({name: value_shape(spec)})
+        elif name == '$sort':
+            shape.append({name: dict(spec)})
+        elif name == '$facet':
+            shape.append({name: {key: pipeline_shape(sub) for key, sub in sorted(spec.items())}})
+        else:
+            shape.append({name: '?'})
+    return shape
+
+def command_shape(command_name, command):
+    """Collection and query shape of a monitored command"""
+    collection = command.get(command_name)
+    if command_name == 'find':
+        shape = {'filter': value_shape(command.get('filter', {})), 'sort': dict(command.get('sort') or {})}
+    elif command_name == 'aggregate':
+        shape = {'pipeline': pipeline_shape(command.get('pipeline', []))}
+    elif command_name == 'count':
+        shape = {'filter': value_shape(command.get('query', {}))}
+    elif command_name == 'distinct':
+        shape = {'key': command.get('key'), 'filter': value_shape(command.get('query', {}))}
+    elif command_name == 'findAndModify':
+        shape = {'filter': value_shape(command.get('query', {})), 'sort': dict(command.get('sort') or {})}
+    else:
+        # update / delete: the first statement's filter
+        statements = command.get('updates' if command_name == 'update' else 'deletes') or [{}]
+        shape = {'filter': value_shape(statements[0].get('q', {}))}
+    return collection, shape
+
+def shape_id(command_name, collection, shape):
+    encoded = json.dumps([command_name, collection, shape], sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()[:16]
+
+def docs_returned(command_name, reply):
+    if command_name in ('find', 'aggregate'):
+        return len(reply.get('cursor', {}).get('firstBatch', []))
+    if command_name == 'distinct':
+        return len(reply.get('values', []))
+    if command_name == 'findAndModify':
+        return 1 if reply.get('value') else 0
+    return reply.get('n')
+
+def _find_key(document, key):
+    """First value under `key` anywhere in an explain document (aggregations nest it)"""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        values = document.values()
+    elif isinstance(document, list):
+        values = document
+    else:
+        return None
+    for value in values:
+        found = _find_key(value, key)
+        if found is not None:
+            return found
+    return None
+
+def plan_summary(plan):
+    """'FETCH > IXSCAN region_1_created_at_-1' for a winning plan"""
+    stages = []
+    while isinstance(plan, dict):
+        stage = plan.get('stage', '?')
+        if plan.get('indexName'):
+            stage = f"{stage} {plan['indexName']}"
+        stages.append(stage)
+        plan = plan.get('inputStage') or (plan.get('inputStages') or [None])[0] or plan.get('queryPlan')
+    return ' > '.join(stages)
+
+def explain_summary(explanation):
+    stats = _find_key(explanation, 'executionStats') or {}
+    return {
+        'execution_ms': stats.get('executionTimeMillis'),
+        'docs_examined': stats.get('totalDocsExamined'),
+        'keys_examined': stats.get('totalKeysExamined'),
+        'n_returned': stats.get('nReturned'),
+        'plan': plan_summary(_find_key(explanation, 'winningPlan'))
+    }
+
+class SlowQueryLog(CommandListener):
+    """Command listener recording slow commands; configure() gives it the database to write to"""
+
+    def __init__(self):
+        self.mongo = None
+        self.threshold_ms = 0
+        self.explain_ms = 0
+        self.explain_interval = 3600
+        self._started = {}
+        self._explained = {}
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def configure(self, mongo, config):
+        self.mongo = mongo
+        self.threshold_ms = config.get('SLOW_QUERY_THRESHOLD_MS', 100)
+        self.explain_ms = config.get('SLOW_QUERY_EXPLAIN_MS', 500)
+        self.explain_interval = config.get('SLOW_QUERY_EXPLAIN_INTERVAL', 3600)
+
+    def started(self, event):
+        if event.command_name in MONITORED_COMMANDS:
+            self._started[(event.connection_id, event.request_id)] = event.command
+
+    def succeeded(self, event):
+        self._finished(event, event.reply, False)
+
+    def failed(self, event):
+        self._finished(event, {}, True)
+
+    def _finished(self, event, reply, failed):
+        command = self._started.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+        if command is None or self.mongo is None or duration_ms < self.threshold_ms:
+            return
+
+        collection, shape = command_shape(event.command_name, command)
+        entry = {
+            'at': datetime.utcnow(),
+            'command': event.command_name,
+            'database': event.database_name,
+            'collection': collection,
+            # A string: operator names aren't valid field names on every server version
+            'shape': json.dumps(shape, sort_keys=True, default=str),
+            'shape_id': shape_id(event.command_name, collection, shape),
+            'route': request.url_rule.rule if has_request_context() and request.url_rule else None,
+            'duration_ms': round(duration_ms, 3),
+            'docs_returned': docs_returned(event.command_name, reply),
+            'failed': failed,
+            'explain': None
+        }
+        try:
+            self._writer().put_nowait((entry, command))
+        except queue.Full:
+            pass
+
+    def _writer(self):
+        # One writer thread per process; a forked worker starts its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=MAX_PENDING)
+                    self._explained = {}
+                    threading.Thread(target=self._run, args=(self._queue,), name='slow-query-log', daemon=True).start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _run(self, pending):
+        while True:
+            entry, command = pending.get()
+            try:
+                if self._should_explain(entry):
+                    entry['explain'] = self.explain(entry, command)
+                logger.warning('Slow %s on %s (%s ms)', entry['command'], entry['collection'], entry['duration_ms'], extra={
+                    key: entry[key] for key in ('route', 'shape', 'shape_id', 'docs_returned', 'explain')
+                })
+                self.mongo.get_database()[SLOW_QUERIES_COLLECTION].insert_one(entry)
+            except Exception as e:
+                logger.warning('Slow query log failed: %s', e)
+
+    def _should_explain(self, entry):
+        if entry['command'] not in EXPLAINABLE_COMMANDS or entry['failed'] or entry['duration_ms'] < self.explain_ms:
+            return False
+        now = time.monotonic()
+        if now - self._explained.get(entry['shape_id'], -self.explain_interval) < self.explain_interval:
+            return False
+        self._explained[entry['shape_id']] = now
+        return True
+
+    def explain(self, entry, command):
+        """explain('executionStats') of the original command, off the primary when replicas allow"""
+        analytics = self.mongo.get_database('analytics')
+        database = analytics if analytics.name == entry['database'] else analytics.client.get_database(
+            entry['database'], read_preference=analytics.read_preference
+        )
+        original = {key: value for key, value in command.items()
+                    if not key.startswith('$') and key not in COMMAND_META_FIELDS}
+        explanation = database.command({'explain': original, 'verbosity': 'executionStats'})
+        return explain_summary(explanation)
+
+SLOW_QUERY_LOG = SlowQueryLog()
+
+def top_shapes(db, since, limit=20, collection=None):
+    """Stored query shapes ranked by total time since `since`, with their latest explain sample"""
+    match = {'at': {'$gte': since}}
+    if collection:
+        match['collection'] = collection
+    shapes = list(db[SLOW_QUERIES_COLLECTION].aggregate([
+        {'$match': match},
+        {'$group': {
+            '_id': '$shape_id',
+            'command': {'$first': '$command'},
+            'collection': {'$first': '$collection'},
+            'shape': {'$first': '$shape'},
+            'routes': {'$addToSet': '$route'},
+            'count': {'$sum': 1},
+            'total_ms': {'$sum': '$duration_ms'},
+            'avg_ms': {'$avg': '$duration_ms'},
+            'max_ms': {'$max': '$duration_ms'},
+            'avg_docs_returned': {'$avg': '$docs_returned'}
+        }},
+        {'$sort': {'total_ms': -1}},
+        {'$limit': limit}
+    ]))
+    for shape in shapes:
+        sample = db[SLOW_QUERIES_COLLECTION].find_one(
+            {'shape_id': shape['_id'], 'explain': {'$ne': None}},
+            {'explain': 1},
+            sort=[('at', -1)]
+        )
+        shape['explain'] = sample['explain'] if sample else None
+    return shapes
+
+def init_slow_query_log(app):
+    SLOW_QUERY_LOG.configure(app.mongo, app.config)
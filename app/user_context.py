@@ -0,0 +1,201 @@
+"""
+Shared user lookups for the API.
+
+Every protected route needs the profile of the calling user, and listings need
+the names of the users who registered each record. Profiles are kept in a small
+process-local LRU cache with a TTL, the calling user is resolved once per
+request into `flask.g`, and recently issued access tokens that already carry
+the role and location claims are trusted without touching the database.
+
+The cache is per process: `/users` updates invalidate it immediately in the
+process that handled them, and the TTL bounds staleness everywhere else.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+from flask import current_app, g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+# Profile fields copied into the access token at login
+CLAIM_FIELDS = ['role', 'email', 'full_name', 'region', 'zone', 'woreda', 'kebele']
+
+# Never cache credentials
+PROFILE_PROJECTION = {'password_hash': 0}
+
+class UserCache:
+    """Thread-safe LRU cache of user profiles with a time-to-live"""
+
+    def __init__(self, max_size=2048, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._invalidated_at = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, user = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(user)
+
+    def set(self, user):
+        key = str(user['_id'])
+        with self._lock:
+            self._entries[key] = (time.time(), dict(user))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._invalidated_at[key] = time.time()
+            # Invalidation marks only matter while tokens issued before them are still trusted
+            if len(self._invalidated_at) > self.max_size:
+                cutoff = time.time() - max(self.ttl, 3600)
+                self._invalidated_at = {k: v for k, v in self._invalidated_at.items() if v > cutoff}
+
+    def invalidated_since(self, user_id, timestamp):
+        with self._lock:
+            return self._invalidated_at.get(str(user_id), 0) >= timestamp
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def init_user_cache(app):
+    app.user_cache = UserCache(
+        max_size=app.config.get('USER_CACHE_SIZE', 2048),
+        ttl=app.config.get('USER_CACHE_TTL', 60)
+    )
+
+def _cache():
+    return current_app.user_cache
+
+def load_user(db, user_id):
+    """Fetch a user profile (without password hash), served from the cache when possible"""
+    if not user_id or not ObjectId.is_valid(str(user_id)):
+        return None
+
+    user = _cache().get(user_id)
+    if user is not None:
+        return user
+
+    user = db.users.find_one({'_id': ObjectId(str(user_id))}, PROFILE_PROJECTION)
+    if user:
+        _cache().set(user)
+    return user
+
+def remember_user(user):
+    """Cache a freshly read user document (e.g. at login)"""
+    profile = {k: v for k, v in user.items() if k not in PROFILE_PROJECTION}
+    _cache().set(profile)
+
+def load_users(db, user_ids):
+    """
+    Fetch many user profiles at once, returning a dict keyed by str(user id).
+    Cache misses are resolved with a single $in query.
+    """
+    users = {}
+    missing = []
+    for user_id in {str(u) for u in user_ids if u}:
+        user = _cache().get(user_id)
+        if user is not None:
+            users[user_id] = user
+        elif ObjectId.is_valid(user_id):
+            missing.append(ObjectId(user_id))
+
+    if missing:
+        for user in db.users.find({'_id': {'$in': missing}}, PROFILE_PROJECTION):
+            _cache().set(user)
+            users[str(user['_id'])] = user
+    return users
+
+async def load_user_async(db, user_id):
+    """load_user for a Motor database (async serving mode)"""
+    if not user_id or not ObjectId.is_valid(str(user_id)):
+        return None
+
+    user = _cache().get(user_id)
+    if user is not None:
+        return user
+
+    user = await db.users.find_one({'_id': ObjectId(str(user_id))}, PROFILE_PROJECTION)
+    if user:
+        _cache().set(user)
+    return user
+
+async def load_users_async(db, user_ids):
+    """load_users for a Motor database (async serving mode)"""
+    users = {}
+    missing = []
+    for user_id in {str(u) for u in user_ids if u}:
+        user = _cache().get(user_id)
+        if user is not None:
+            users[user_id] = user
+        elif ObjectId.is_valid(user_id):
+            missing.append(ObjectId(user_id))
+
+    if missing:
+        async for user in db.users.find({'_id': {'$in': missing}}, PROFILE_PROJECTION):
+            _cache().set(user)
+            users[str(user['_id'])] = user
+    return users
+
+def invalidate_user(user_id):
+    """Drop a user's cached profile and stop trusting tokens issued before now"""
+    _cache().invalidate(user_id)
+
+def user_from_claims(user_id, claims):
+    """Build the current user from token claims if the token is recent enough to trust"""
+    if not all(field in claims for field in CLAIM_FIELDS) or not ObjectId.is_valid(str(user_id)):
+        return None
+
+    issued_at = claims.get('iat', 0)
+    if time.time() - issued_at > current_app.config.get('USER_CLAIMS_MAX_AGE', 300):
+        return None
+    if _cache().invalidated_since(user_id, issued_at):
+        return None
+
+    user = {field: claims[field] for field in CLAIM_FIELDS}
+    user['_id'] = ObjectId(str(user_id))
+    return user
+
+def get_current_user():
+    """
+    The calling user for this request, resolved once and kept on flask.g.
+    Must be called inside a @jwt_required() view. Returns None for unknown users.
+    """
+    if 'current_user' in g:
+        return g.current_user
+
+    user_id = get_jwt_identity()
+    user = user_from_claims(user_id, get_jwt())
+    if user is None:
+        user = load_user(current_app.db, user_id)
+
+    g.current_user = user
+    return user
+
+async def get_current_user_async(db):
+    """get_current_user for async views, loading cache misses through a Motor database"""
+    if 'current_user' in g:
+        return g.current_user
+
+    user_id = get_jwt_identity()
+    user = user_from_claims(user_id, get_jwt())
+    if user is None:
+        user = await load_user_async(db, user_id)
+
+    g.current_user = user
+    return user
@@ -0,0 +1,72 @@
+"""
+Validation of new records, shared by the create endpoints and bulk imports.
+
+validate_request_data(db, record_type, data) returns
+(is_valid, errors, warnings, quality_score):
+- errors reject the record: a required field missing, a date that isn't
+  YYYY-MM-DD or lies in the future, an unknown gender, a derived age or
+  duration that would be negative (death before birth, ...)
+- warnings are stored on the record (validation_warnings): a phone number
+  that doesn't look Ethiopian, an implausible age
+- quality_score (0-100) is the share of the record type's fields that are
+  filled in, less 5 points per warning
+"""
+import re
+from datetime import datetime
+
+from .registry import REGISTRY, parse_date, years_between
+
+GENDERS = ['male', 'female']
+PHONE = re.compile(r'^(?:\+?251|0)[79]\d{8}$')
+MAX_AGE = 120
+WARNING_PENALTY = 5
+
+def is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def validate_request_data(db, record_type, data):
+    """Check a new record of `record_type` ('birth', 'death', ...); `db` is for rules that need stored data"""
+    if not isinstance(data, dict):
+        return False, ['Request body must be a JSON object'], [], 0
+    definition = REGISTRY.get(record_type)
+    if definition is None:
+        return False, [f'Unknown record type: {record_type}'], [], 0
+
+    errors = []
+    warnings = []
+    today = datetime.utcnow()
+
+    for field in definition.fields:
+        if field.required and is_blank(data.get(field.name)):
+            errors.append(f'{field.name} is required')
+
+    for name, value in data.items():
+        if is_blank(value):
+            continue
+        if 'date' in name and isinstance(value, str):
+            parsed = parse_date(value)
+            if parsed is None:
+                errors.append(f'{name} must be a date (YYYY-MM-DD)')
+            elif parsed > today:
+                errors.append(f'{name} cannot be in the future')
+        elif 'phone' in name and not PHONE.match(re.sub(r'[\s-]', '', str(value))):
+            warnings.append(f'{name} does not look like an Ethiopian phone number')
+
+    gender = data.get(definition.gender_field) if definition.gender_field else None
+    if not is_blank(gender) and str(gender).lower() not in GENDERS:
+        errors.append(f"{definition.gender_field} must be one of {', '.join(GENDERS)}")
+
+    for derived in definition.derived_fields:
+        years = years_between(data.get(derived.start), data.get(derived.end))
+        if years is None:
+            continue
+        if years < 0:
+            errors.append(f'{derived.end} cannot be before {derived.start}')
+        elif years > MAX_AGE:
+            warnings.append(f'{derived.name} of {years} years is unusually high')
+
+    names = [field.name for field in definition.fields]
+    filled = sum(1 for name in names if not is_blank(data.get(name)))
+    quality_score = max(0, round(100 * filled / len(names)) - WARNING_PENALTY * len(warnings)) if names else 100
+
+    return not errors, errors, warnings, quality_score
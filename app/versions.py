@@ -0,0 +1,59 @@
+"""
+Write-driven version counters for record collections.
+
+One document per collection in `collection_versions`:
+    {'_id': 'birth_records', 'version': 812, 'epoch': 3, 'regions': {'Oromia': 240, ...}}
+- `version` goes up on every write to the collection (listing ETags, cached
+  queries that span regions)
+- `regions.<region>` goes up on writes to records in that region, so a query
+  confined to one region survives writes elsewhere
+- `epoch` goes up on bulk writes whose regions aren't tracked, which counts as
+  a write to every region
+
+The record routes bump them after each create, import, update, status change
+and delete, and the user routes bump `users` when a user is created,
+(de)activated or first logs in on a day (the admin dashboard's counts);
+readers fetch the whole document with one _id lookup.
+"""
+VERSIONS_COLLECTION = 'collection_versions'
+
+def region_key(region):
+    # Field names can't contain '.' or start with '$'
+    return str(region).replace('.', '_').replace('$', '_')
+
+def bump_version(db, collection_name, regions=None, session=None):
+    """
+    Record a write to a collection. `regions` are the regions of the records
+    written (old and new, when a record moves); None invalidates every region.
+    """
+    increments = {'version': 1}
+    if regions is None:
+        increments['epoch'] = 1
+    else:
+        for region in {region for region in regions if region}:
+            increments[f'regions.{region_key(region)}'] = 1
+    db[VERSIONS_COLLECTION].update_one({'_id': collection_name}, {'$inc': increments}, upsert=True, session=session)
+
+def version_document(db, collection_name, session=None):
+    return db[VERSIONS_COLLECTION].find_one({'_id': collection_name}, session=session) or {}
+
+async def version_document_async(db, collection_name, session=None):
+    """version_document for a Motor database (async serving mode)"""
+    return await db[VERSIONS_COLLECTION].find_one({'_id': collection_name}, session=session) or {}
+
+def collection_versions(db, collection_names, session=None):
+    """{collection: version} for several collections in one query"""
+    documents = db[VERSIONS_COLLECTION].find({'_id': {'$in': list(collection_names)}}, {'version': 1}, session=session)
+    versions = dict.fromkeys(collection_names, 0)
+    versions.update((doc['_id'], doc.get('version', 0)) for doc in documents)
+    return versions
+
+async def collection_versions_async(db, collection_names, session=None):
+    documents = await db[VERSIONS_COLLECTION].find({'_id': {'$in': list(collection_names)}}, {'version': 1}, session=session).to_list(None)
+    versions = dict.fromkeys(collection_names, 0)
+    versions.update((doc['_id'], doc.get('version', 0)) for doc in documents)
+    return versions
+
+def region_version(versions, region):
+    """Version of one region's records: its own writes plus bulk writes"""
+    return f"{versions.get('epoch', 0)}.{versions.get('regions', {}).get(region_key(region), 0)}"
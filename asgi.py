@@ -0,0 +1,10 @@
+from app import create_app
+from app.aio import create_asgi_app
+
+# Async serving mode: uvicorn asgi:app --workers 4 (see app/aio.py)
+flask_app = create_app()
+
+if flask_app is None:
+    raise RuntimeError('Failed to create Flask app')
+
+app = create_asgi_app(flask_app)
@@ -0,0 +1,440 @@
+"""
+Benchmark the record API hot paths end to end.
+
+    python benchmarks/api_suite.py --mongod mongod --scale 100000 --workers 4 --duration 20 --save-baseline laptop
+    python benchmarks/api_suite.py --mongod mongod --scale 100000 --workers 4 --duration 20 --compare laptop
+
+Each scenario is driven by --workers processes at once, each with its own
+app (through the Flask test client) or its own keep-alive connection to a
+running server (--url). Every worker logs in as the seeded benchmark users
+(benchmarks/seed.py), runs --warmup untimed requests, waits for the others,
+then sends requests back to back for --duration seconds (or --requests
+each). Reported per scenario: p50/p95/p99 latency, requests per second
+over all workers, and non-2xx responses.
+
+Scenarios (--scenarios), all on --record-type:
+- list:             listing page 1, as the region-scoped VMS officer
+- list-deep:        listing page --deep-page, as an admin
+- search:           listing with a name search, as an admin
+- detail:           one record by id, as an admin
+- create:           a new record, as the clerk (adds records to the database)
+- status:           a submitted record set to submitted again, as the VMS officer
+- login:            the clerk's login (bcrypt at BCRYPT_ROUNDS)
+- dashboard:        the admin dashboard
+- officer-dashboard: the officer dashboard
+
+Database: --mongod starts a throwaway single-node replica set from the given
+binary, on a RAM disk (/dev/shm) when there is one, and seeds --scale
+records per type into it; it is removed afterwards. Without --mongod the
+suite runs against MONGODB_URI, which must already be seeded and name a
+'bench' database. With --url the server's own settings apply: raise its
+login limits (LOGIN_MAX_ATTEMPTS_PER_IP, LOGIN_MAX_FAILURES_PER_EMAIL) before
+running the login scenario.
+
+Baselines: --save-baseline NAME writes the results to
+benchmarks/baselines/NAME.json; --compare NAME reports the change against
+it and exits with status 1 when a scenario's p95 rose, or its throughput
+fell, by more than --tolerance. Compare runs of the same scale, worker count
+and machine.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINES_DIR = os.path.join(BENCHMARKS_DIR, 'baselines')
+
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+# Only the standard library at import time: the app's config must not load before main() sets the environment
+from seed import BENCH_PASSWORD, BENCH_REGION, BENCH_WOREDA, BENCH_USERS, record_payload
+
+SCENARIOS = ['list', 'list-deep', 'search', 'detail', 'create', 'status', 'login', 'dashboard', 'officer-dashboard']
+
+SEARCH_TERMS = ['Abebe', 'Almaz', 'Tigist', 'Haile', 'Selam']
+SAMPLE_IDS = 1000
+
+# Set before the app's config is imported; the suite's own logins mustn't trip the limiter
+BENCH_ENVIRONMENT = {
+    'LOG_LEVEL': 'WARNING',
+    'LOGIN_MAX_ATTEMPTS_PER_IP': '1000000000',
+    'LOGIN_MAX_FAILURES_PER_EMAIL': '1000000000'
+}
+
+class TestClientTransport:
+    """Requests through the Flask test client, against an app built in this process"""
+
+    def __init__(self, accept_encoding):
+        from app import create_app
+
+        self.client = create_app().test_client()
+        self.accept_encoding = accept_encoding
+
+    def request(self, method, path, token=None, body=None):
+        headers = {'Accept-Encoding': self.accept_encoding}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        try:
+            data = response.get_data()
+            return response.status_code, data
+        finally:
+            response.close()
+
+class HttpTransport:
+    """Requests over one keep-alive HTTP connection to a running server"""
+
+    def __init__(self, url, accept_encoding):
+        from urllib.parse import urlsplit
+
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.accept_encoding = accept_encoding
+        self.connection = None
+
+    def _connect(self):
+        import http.client
+
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(self.netloc, timeout=60)
+
+    def request(self, method, path, token=None, body=None):
+        headers = {'Accept-Encoding': self.accept_encoding}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            if self.connection is None:
+                self._connect()
+            try:
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                return response.status, response.read()
+            except (ConnectionError, OSError):
+                # The server closed the idle connection; retry once on a new one
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+def login(transport, email, password):
+    status, data = transport.request('POST', '/api/auth/login', body={'email': email, 'password': password})
+    if status != 200:
+        raise RuntimeError(f'Login as {email} failed ({status}): {data[:200]!r}')
+    return json.loads(data)['access_token']
+
+def scenario_request(name, context, record_type, rng):
+    """(role, method, path, body) of one request of a scenario"""
+    prefix = context['url_prefix']
+    if name == 'list':
+        return 'vms_officer', 'GET', f'{prefix}/?page=1', None
+    if name == 'list-deep':
+        return 'admin', 'GET', f"{prefix}/?page={context['deep_page']}", None
+    if name == 'search':
+        return 'admin', 'GET', f'{prefix}/?page=1&search={rng.choice(SEARCH_TERMS)}', None
+    if name == 'detail':
+        return 'admin', 'GET', f"{prefix}/{rng.choice(context['record_ids'])}", None
+    if name == 'create':
+        return 'clerk', 'POST', f'{prefix}/', record_payload(record_type, rng, BENCH_REGION, BENCH_WOREDA)
+    if name == 'status':
+        return 'vms_officer', 'PATCH', f"{prefix}/{rng.choice(context['submitted_ids'])}/status", {'status': 'submitted'}
+    if name == 'login':
+        return None, 'POST', '/api/auth/login', {'email': BENCH_USERS['clerk']['email'], 'password': BENCH_PASSWORD}
+    if name == 'dashboard':
+        return 'admin', 'GET', '/api/users/stats', None
+    if name == 'officer-dashboard':
+        return 'vms_officer', 'GET', '/api/users/officer-stats', None
+    raise ValueError(f'Unknown scenario: {name}')
+
+def drive(worker, options, context, barrier, results):
+    """One load-driving process: every scenario in turn, in step with the other workers"""
+    from app.registry import REGISTRY
+
+    record_type = REGISTRY[context['record_type']]
+    if options['url']:
+        transport = HttpTransport(options['url'], options['accept_encoding'])
+    else:
+        transport = TestClientTransport(options['accept_encoding'])
+    tokens = {role: login(transport, user['email'], BENCH_PASSWORD) for role, user in BENCH_USERS.items()}
+
+    for name in options['scenarios']:
+        rng = random.Random(f"{options['seed']}:{worker}:{name}")
+
+        def call():
+            role, method, path, body = scenario_request(name, context, record_type, rng)
+            return transport.request(method, path, tokens.get(role), body)[0]
+
+        for _ in range(options['warmup']):
+            call()
+        barrier.wait()
+
+        timings = []
+        errors = 0
+        started = time.perf_counter()
+        deadline = started + options['duration']
+        while True:
+            if options['requests'] and len(timings) >= options['requests']:
+                break
+            if not options['requests'] and time.perf_counter() >= deadline:
+                break
+            request_started = time.perf_counter()
+            status = call()
+            timings.append((time.perf_counter() - request_started) * 1000)
+            if status >= 400:
+                errors += 1
+        results.put((name, timings, errors, time.perf_counter() - started))
+
+def sample_context(uri, record_type_name, deep_page):
+    """Ids the detail and status scenarios pick from, read once from the seeded database"""
+    from app.db import create_client
+    from app.registry import REGISTRY
+
+    record_type = REGISTRY[record_type_name]
+    client = create_client({'MONGODB_URI': uri})
+    try:
+        collection = client.get_database()[record_type.collection]
+        record_ids = [str(doc['_id']) for doc in collection.find({}, {'_id': 1}).limit(SAMPLE_IDS)]
+        submitted_ids = [str(doc['_id']) for doc in collection.find(
+            {'status': 'submitted', record_type.region_field: BENCH_REGION, record_type.woreda_field: BENCH_WOREDA},
+            {'_id': 1}
+        ).limit(SAMPLE_IDS)]
+    finally:
+        client.close()
+    if not record_ids:
+        raise RuntimeError(f'No {record_type.collection} records: seed the database first (benchmarks/seed.py)')
+    return {
+        'record_type': record_type_name,
+        'url_prefix': record_type.url_prefix,
+        'deep_page': deep_page,
+        'record_ids': record_ids,
+        # The status scenario needs a record in the officer's region and woreda
+        'submitted_ids': submitted_ids or record_ids
+    }
+
+def run_suite(options, context):
+    """Run every scenario with options['workers'] processes; returns {scenario: summary}"""
+    ctx = multiprocessing.get_context('spawn')
+    barrier = ctx.Barrier(options['workers'])
+    results = ctx.Queue()
+    workers = [ctx.Process(target=drive, args=(worker, options, context, barrier, results), daemon=True)
+               for worker in range(options['workers'])]
+    for process in workers:
+        process.start()
+
+    collected = {name: [] for name in options['scenarios']}
+    try:
+        for _ in range(options['workers'] * len(options['scenarios'])):
+            while True:
+                try:
+                    name, timings, errors, elapsed = results.get(timeout=5)
+                    break
+                except queue.Empty:
+                    if not all(process.is_alive() for process in workers):
+                        raise RuntimeError('A benchmark worker exited early; see its output above')
+            collected[name].append((timings, errors, elapsed))
+            if len(collected[name]) == options['workers']:
+                print_row(name, summarize(collected[name]))
+    finally:
+        for process in workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+    return {name: summarize(runs) for name, runs in collected.items()}
+
+def summarize(runs):
+    from listing_count import percentile
+
+    timings = [timing for run in runs for timing in run[0]]
+    elapsed = max(run[2] for run in runs)
+    return {
+        'requests': len(timings),
+        'errors': sum(run[1] for run in runs),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'rps': round(len(timings) / elapsed, 2) if elapsed else 0.0
+    }
+
+def print_header():
+    print(f"{'scenario':<18} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+
+def print_row(name, summary):
+    print(
+        f"{name:<18} {summary['requests']:>9} {summary['errors']:>7} {summary['p50_ms']:>9.2f} "
+        f"{summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f} {summary['rps']:>9.1f}"
+    )
+
+def baseline_path(name):
+    return os.path.join(BASELINES_DIR, f'{name}.json')
+
+def save_baseline(name, meta, results):
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def compare(baseline, meta, results, tolerance):
+    """Print the change against a baseline; returns the scenarios that regressed"""
+    for key in ('scale', 'workers', 'record_type', 'transport'):
+        if baseline['meta'].get(key) != meta.get(key):
+            print(f"warning: baseline {key}={baseline['meta'].get(key)!r}, this run {key}={meta.get(key)!r}")
+
+    regressions = []
+    print(f"{'scenario':<18} {'p95 ms':>9} {'base':>9} {'change':>8} {'req/s':>9} {'base':>9} {'change':>8}")
+    for name, summary in results.items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f'{name:<18} (not in baseline)')
+            continue
+        p95_change = summary['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0.0
+        rps_change = summary['rps'] / base['rps'] - 1 if base['rps'] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance or summary['errors'] > base['errors']
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<18} {summary['p95_ms']:>9.2f} {base['p95_ms']:>9.2f} {p95_change:>+8.1%} "
+            f"{summary['rps']:>9.1f} {base['rps']:>9.1f} {rps_change:>+8.1%}{'  REGRESSED' if regressed else ''}"
+        )
+    return regressions
+
+def start_mongod(binary, port):
+    """A single-node replica set (the app uses transactions) in a temporary directory; returns (process, dbpath)"""
+    from pymongo import MongoClient
+
+    dbpath = tempfile.mkdtemp(prefix='evems-bench-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    process = subprocess.Popen(
+        [binary, '--dbpath', dbpath, '--port', str(port), '--bind_ip', '127.0.0.1', '--replSet', 'bench', '--quiet'],
+        stdout=subprocess.DEVNULL
+    )
+    client = MongoClient('127.0.0.1', port, directConnection=True, serverSelectionTimeoutMS=30000)
+    try:
+        client.admin.command('ping')
+        client.admin.command('replSetInitiate', {'_id': 'bench', 'members': [{'_id': 0, 'host': f'127.0.0.1:{port}'}]})
+        deadline = time.monotonic() + 60
+        while not client.admin.command('hello').get('isWritablePrimary'):
+            if time.monotonic() > deadline:
+                raise RuntimeError('mongod did not become primary')
+            time.sleep(0.2)
+    except Exception:
+        stop_mongod(process, dbpath)
+        raise
+    finally:
+        client.close()
+    return process, dbpath
+
+def stop_mongod(process, dbpath):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+    shutil.rmtree(dbpath, ignore_errors=True)
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARKS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the record API hot paths')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--record-type', default='birth')
+    parser.add_argument('--workers', type=int, default=4, help='load-driving processes')
+    parser.add_argument('--duration', type=float, default=10, help='timed seconds per scenario')
+    parser.add_argument('--requests', type=int, default=0, help='timed requests per worker and scenario, instead of --duration')
+    parser.add_argument('--warmup', type=int, default=20, help='untimed requests per worker and scenario')
+    parser.add_argument('--deep-page', type=int, default=500)
+    parser.add_argument('--accept-encoding', default='gzip', help="Accept-Encoding sent with every request ('identity' for none)")
+    parser.add_argument('--url', help='benchmark a running server instead of the test client')
+    parser.add_argument('--mongod', help='mongod binary: benchmark a fresh, seeded throwaway instance')
+    parser.add_argument('--port', type=int, default=27117, help='port for --mongod')
+    parser.add_argument('--scale', type=int, default=10000, help='records per type seeded into --mongod')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save-baseline', metavar='NAME')
+    parser.add_argument('--compare', metavar='NAME', help='baseline to check this run against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 rise / throughput drop, as a fraction')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(baseline_path(args.compare), encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    mongod = None
+    if args.mongod:
+        mongod = start_mongod(args.mongod, args.port)
+        os.environ['MONGODB_URI'] = f'mongodb://127.0.0.1:{args.port}/evems_bench?directConnection=true'
+    for key, value in BENCH_ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+
+    try:
+        # Imported only now, so Config sees the environment above
+        from config import Config
+        from app.registry import REGISTRY
+        from seed import seed_database
+
+        if args.record_type not in REGISTRY:
+            parser.error(f'--record-type must be one of {sorted(REGISTRY)}')
+        uri = Config.MONGODB_URI
+        if mongod:
+            seed_database(uri, args.scale, workers=args.workers, seed=args.seed, bcrypt_rounds=Config.BCRYPT_ROUNDS)
+
+        options = {
+            'scenarios': args.scenarios,
+            'workers': args.workers,
+            'duration': args.duration,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'accept_encoding': args.accept_encoding,
+            'url': args.url,
+            'seed': args.seed
+        }
+        context = sample_context(uri, args.record_type, args.deep_page)
+        meta = {
+            'at': datetime.utcnow().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'machine': f'{platform.node()} ({platform.machine()}, {os.cpu_count()} cpus)',
+            'python': platform.python_version(),
+            'scale': args.scale if mongod else None,
+            'workers': args.workers,
+            'record_type': args.record_type,
+            'transport': 'http' if args.url else 'test-client',
+            'duration': args.duration,
+            'requests': args.requests
+        }
+
+        print(f"{meta['transport']} x {args.workers} workers, {args.record_type} records")
+        print_header()
+        results = run_suite(options, context)
+    finally:
+        if mongod:
+            stop_mongod(*mongod)
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, meta, results)
+        print(f'Saved baseline {baseline_path(args.save_baseline)}')
+    if baseline is not None:
+        regressions = compare(baseline, meta, results, args.tolerance)
+        if regressions:
+            print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
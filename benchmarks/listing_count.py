@@ -0,0 +1,78 @@
+"""
+Compare the listing count strategies (app/listing.py) on the configured database.
+
+    python benchmarks/listing_count.py --record-type birth --pages 1 10 100 --region Oromia
+
+Each strategy fetches the same pages with the same filters as the listing
+endpoint (unscoped, as an admin sees them) and the latency percentiles are
+printed per page. Read-only: nothing is written.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app.db import create_client, operation_options
+from app.listing import fetch_page, COUNT_STRATEGIES
+from app.registry import REGISTRY
+from app.routes.records import LISTING_SORT
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def run(collection, record_type, filters, page, per_page, strategy, repeat, warmup):
+    skip = (page - 1) * per_page
+    timings = []
+    total = None
+    for i in range(warmup + repeat):
+        started = time.perf_counter()
+        records, total = fetch_page(
+            collection, filters, record_type.listing_projection, LISTING_SORT, skip, per_page, strategy=strategy
+        )
+        if i >= warmup:
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings, total, len(records)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark listing count strategies')
+    parser.add_argument('--record-type', choices=sorted(REGISTRY), default='birth')
+    parser.add_argument('--strategies', nargs='+', choices=COUNT_STRATEGIES, default=COUNT_STRATEGIES)
+    parser.add_argument('--pages', nargs='+', type=int, default=[1, 10, 100], help='page numbers to fetch')
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=50, help='timed runs per strategy and page')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--search', default='', help='same as the listing search parameter')
+    parser.add_argument('--region', default='')
+    parser.add_argument('--status', default='')
+    args = parser.parse_args()
+
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    record_type = REGISTRY[args.record_type]
+    admin = {'role': 'admin'}
+    filters = record_type.build_filters(admin, None, {'search': args.search, 'region': args.region, 'status': args.status})
+
+    client = create_client(config)
+    try:
+        collection = client.get_database(**operation_options(config, 'listing'))[record_type.collection]
+        print(f'{record_type.collection} filters={filters}')
+        print(f"{'page':>6} {'strategy':<11} {'median ms':>10} {'p95 ms':>8} {'max ms':>8} {'rows':>5} {'total':>8}")
+        for page in args.pages:
+            for strategy in args.strategies:
+                timings, total, rows = run(
+                    collection, record_type, filters, page, args.per_page, strategy, args.repeat, args.warmup
+                )
+                print(
+                    f'{page:>6} {strategy:<11} {statistics.median(timings):>10.2f} '
+                    f'{percentile(timings, 95):>8.2f} {max(timings):>8.2f} {rows:>5} {total:>8}'
+                )
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+Seed a database with synthetic vital-event records for the benchmarks.
+
+    python benchmarks/seed.py --uri mongodb://localhost:27017/evems_bench --scale 100000 --workers 4
+
+Writes --scale records of every record type, shaped by the same
+RecordType.build_document the create endpoint uses, spread over the regions
+(weighted roughly by population) and a few woredas each, with a realistic
+status mix and three years of registration dates. Also writes one benchmark
+user per role (BENCH_USERS, password BENCH_PASSWORD) and builds the app's
+indexes. Generation is deterministic for a given --seed and --scale.
+
+The target database is dropped first unless --append, so its name must
+contain 'bench'.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Region -> relative share of registrations
+REGIONS = {
+    'Oromia': 35, 'Amhara': 22, 'Southern Nations': 10, 'Sidama': 5, 'Tigray': 6, 'Somali': 6,
+    'Addis Ababa': 6, 'Afar': 2, 'Benishangul-Gumuz': 1, 'Gambela': 1, 'Harari': 1, 'Dire Dawa': 1,
+    'South West Ethiopia': 4
+}
+WOREDAS_PER_REGION = 8
+
+STATUS_MIX = {'approved': 60, 'submitted': 25, 'draft': 10, 'rejected': 5}
+
+FIRST_NAMES = [
+    'Abebe', 'Almaz', 'Bekele', 'Birtukan', 'Chaltu', 'Dawit', 'Eleni', 'Fikru', 'Genet', 'Haile',
+    'Hirut', 'Kebede', 'Lemlem', 'Mekdes', 'Mulugeta', 'Nardos', 'Selam', 'Tadesse', 'Tigist', 'Yonas',
+    'Zewditu', 'Girma', 'Meron', 'Solomon', 'Tsion', 'Ayana', 'Obsa', 'Lensa', 'Hamza', 'Amina'
+]
+
+BENCH_PASSWORD = 'bench-password'
+BENCH_REGION = 'Oromia'
+BENCH_WOREDA = 'W01'
+
+# role -> user; every scoped role sits in BENCH_REGION / BENCH_WOREDA
+BENCH_USERS = {
+    role: {
+        'email': f'bench-{role}@evems.test',
+        'full_name': f'Benchmark {role.replace("_", " ").title()}',
+        'role': role,
+        'region': BENCH_REGION,
+        'zone': 'Z01',
+        'woreda': BENCH_WOREDA,
+        'kebele': 'K01',
+        'badge_number': f'BENCH-{role.upper()}',
+        'is_active': True
+    }
+    for role in ['admin', 'vms_officer', 'clerk', 'statistician']
+}
+
+def weighted_choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def random_date(rng, start_year, end_year):
+    start = datetime(start_year, 1, 1)
+    return start + timedelta(days=rng.randrange((datetime(end_year, 12, 31) - start).days))
+
+def field_value(name, rng, region, woreda):
+    """A plausible value for a record input field, from its name"""
+    if name.endswith('_region'):
+        return region
+    if name.endswith('_woreda'):
+        return woreda
+    if name.endswith('_zone'):
+        return 'Z01'
+    if name.endswith('_kebele'):
+        return f'K{rng.randint(1, 20):02d}'
+    if name.endswith('photo'):
+        return None
+    if 'gender' in name:
+        return rng.choice(['male', 'female'])
+    if 'date_of_birth' in name:
+        return random_date(rng, 1950, 2000).strftime('%Y-%m-%d')
+    if 'date' in name:
+        return random_date(rng, 2021, 2024).strftime('%Y-%m-%d')
+    if name.startswith('time_of'):
+        return f'{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}'
+    if 'nationality' in name:
+        return 'Ethiopian'
+    if 'full_name' in name:
+        return ' '.join(rng.sample(FIRST_NAMES, 3))
+    if 'name' in name:
+        return rng.choice(FIRST_NAMES)
+    if 'phone' in name:
+        return f'09{rng.randint(10000000, 99999999)}'
+    if 'id_number' in name:
+        return f'ID{rng.randint(100000, 999999)}'
+    if name.startswith('weight'):
+        return round(rng.uniform(2.0, 4.5), 2)
+    if name.endswith('age'):
+        return rng.randint(18, 90)
+    return f'{name.rsplit("_", 1)[-1]} {rng.randint(1, 5)}'
+
+def record_payload(record_type, rng, region=None, woreda=None):
+    """Request body for the create endpoint of a record type"""
+    region = region or weighted_choice(rng, REGIONS)
+    woreda = woreda or f'W{rng.randint(1, WOREDAS_PER_REGION):02d}'
+    fields = [field.name for field in record_type.fields] + record_type.updatable_fields
+    return {name: field_value(name, rng, region, woreda) for name in dict.fromkeys(fields)}
+
+def record_document(record_type, rng, index, registrars):
+    """A stored record as if created through the API, then moved through review"""
+    payload = record_payload(record_type, rng)
+    registrar_id, registrar = rng.choice(registrars)
+    document = record_type.build_document(
+        payload, registrar, registrar_id, f'BENCH/{record_type.name.upper()}/{index:09d}', rng.randint(60, 100), []
+    )
+    created_at = random_date(rng, 2021, 2024) + timedelta(seconds=rng.randrange(86400))
+    status = weighted_choice(rng, STATUS_MIX)
+    document.update({'status': status, 'created_at': created_at, 'updated_at': created_at})
+    if status == 'approved':
+        document.update({'approved_by': registrar_id, 'approved_at': created_at + timedelta(days=rng.randint(0, 14))})
+    elif status == 'rejected':
+        document.update({'rejected_by': registrar_id, 'rejected_at': created_at, 'rejection_reason': 'Incomplete'})
+    return document
+
+def seed_slice(uri, record_type_name, start, stop, seed, batch_size, registrars):
+    """Insert records [start, stop) of one type; runs in a worker process"""
+    from app.db import create_client
+    from app.registry import REGISTRY
+
+    record_type = REGISTRY[record_type_name]
+    client = create_client({'MONGODB_URI': uri})
+    try:
+        collection = client.get_database()[record_type.collection]
+        for batch_start in range(start, stop, batch_size):
+            batch_stop = min(stop, batch_start + batch_size)
+            # A generator per batch, so any slicing of the work yields the same records
+            rng = random.Random(f'{seed}:{record_type_name}:{batch_start}')
+            collection.insert_many(
+                [record_document(record_type, rng, index, registrars) for index in range(batch_start, batch_stop)],
+                ordered=False
+            )
+    finally:
+        client.close()
+    return stop - start
+
+def seed_users(db, rounds):
+    import bcrypt
+
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+    now = datetime.utcnow()
+    registrars = []
+    for user in BENCH_USERS.values():
+        document = {**user, 'password_hash': password_hash, 'created_at': now, 'updated_at': now}
+        db.users.replace_one({'email': user['email']}, document, upsert=True)
+        stored = db.users.find_one({'email': user['email']}, {'_id': 1})
+        if user['role'] in ('clerk', 'vms_officer'):
+            registrars.append((str(stored['_id']), user))
+    return registrars
+
+def seed_database(uri, scale, workers=4, seed=42, batch_size=5000, append=False, bcrypt_rounds=12):
+    """Seed `scale` records of every type into the database named by the URI; returns the counts"""
+    from app.db import create_client
+    from app.indexes import ensure_indexes
+    from app.registry import REGISTRY
+    from app.versions import bump_version
+
+    client = create_client({'MONGODB_URI': uri})
+    try:
+        db = client.get_database()
+        if 'bench' not in db.name:
+            raise ValueError(f"Refusing to seed '{db.name}': benchmark database names must contain 'bench'")
+        if not append:
+            client.drop_database(db.name)
+        registrars = seed_users(db, bcrypt_rounds)
+        # Indexes first: building them over millions of records afterwards takes longer
+        ensure_indexes(db)
+
+        counts = {}
+        # Slices start on batch boundaries, so batches (and their generators) don't depend on --workers
+        chunk = -(-max(batch_size, -(-scale // max(1, workers))) // batch_size) * batch_size
+        with multiprocessing.get_context('spawn').Pool(workers) as pool:
+            for name, record_type in REGISTRY.items():
+                started = time.perf_counter()
+                slices = [(uri, name, start, min(scale, start + chunk), seed, batch_size, registrars)
+                          for start in range(0, scale, chunk)]
+                counts[name] = sum(pool.starmap(seed_slice, slices))
+                bump_version(db, record_type.collection)
+                print(f'{record_type.collection}: {counts[name]} records in {time.perf_counter() - started:.1f}s')
+        return counts
+    finally:
+        client.close()
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Seed synthetic vital-event records for benchmarks')
+    parser.add_argument('--uri', default=Config.MONGODB_URI, help='MongoDB URI naming the benchmark database')
+    parser.add_argument('--scale', type=int, default=10000, help='records per record type')
+    parser.add_argument('--workers', type=int, default=4, help='inserting processes')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--append', action='store_true', help='keep existing data')
+    args = parser.parse_args()
+
+    seed_database(args.uri, args.scale, args.workers, args.seed, args.batch_size, args.append, Config.BCRYPT_ROUNDS)
+
+if __name__ == '__main__':
+    main()
@@ -4,14 +4,141 @@ from datetime import timedelta
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=7)
     
     # MongoDB
     MONGODB_URI = os.environ.get('MONGODB_URI') or 'mongodb://localhost:27017/ethiopian_vital_management'
     
+    # Connection pool, per process: size it as (threads per worker + background threads)
+    MONGODB_MAX_POOL_SIZE = int(os.environ.get('MONGODB_MAX_POOL_SIZE') or 100)
+    MONGODB_MIN_POOL_SIZE = int(os.environ.get('MONGODB_MIN_POOL_SIZE') or 0)
+    MONGODB_MAX_IDLE_TIME_MS = int(os.environ.get('MONGODB_MAX_IDLE_TIME_MS') or 300000)
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGODB_WAIT_QUEUE_TIMEOUT_MS') or 10000)
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS') or 10000)
+    MONGODB_APP_NAME = os.environ.get('MONGODB_APP_NAME') or 'evems'
+    
+    # Per-operation routing: listings and report aggregations may read from secondaries
+    # (never more than MONGODB_MAX_STALENESS_SECONDS behind), audit writes only wait for the primary
+    MONGODB_LISTING_READ_PREFERENCE = os.environ.get('MONGODB_LISTING_READ_PREFERENCE') or 'secondaryPreferred'
+    MONGODB_ANALYTICS_READ_PREFERENCE = os.environ.get('MONGODB_ANALYTICS_READ_PREFERENCE') or 'secondaryPreferred'
+    MONGODB_MAX_STALENESS_SECONDS = int(os.environ.get('MONGODB_MAX_STALENESS_SECONDS') or 90)
+    MONGODB_AUDIT_WRITE_CONCERN = os.environ.get('MONGODB_AUDIT_WRITE_CONCERN') or 1
+    
     # File Uploads
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or './uploads'
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH') or 16777216)
     
     # Allowed file extensions
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'doc', 'docx'}
\ No newline at end of file
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'doc', 'docx'}
+    
+    # Report generation workers
+    REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS') or 2)
+    REPORT_ARTIFACT_FOLDER = os.environ.get('REPORT_ARTIFACT_FOLDER') or './report_artifacts'
+    REPORT_JOB_POLL_INTERVAL = float(os.environ.get('REPORT_JOB_POLL_INTERVAL') or 2)
+    REPORT_JOB_LEASE_SECONDS = int(os.environ.get('REPORT_JOB_LEASE_SECONDS') or 300)
+    
+    # Streaming exports
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE') or 1000)
+    EXPORT_GZIP_LEVEL = int(os.environ.get('EXPORT_GZIP_LEVEL') or 6)
+    
+    # Parquet analytics exports (run by the report workers)
+    PARQUET_EXPORT_FOLDER = os.environ.get('PARQUET_EXPORT_FOLDER') or './exports/parquet'
+    PARQUET_ROW_GROUP_SIZE = int(os.environ.get('PARQUET_ROW_GROUP_SIZE') or 50000)
+    
+    # Bulk registration imports
+    IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS') or 20000)
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE') or 1000)
+    IMPORT_VALIDATION_WORKERS = int(os.environ.get('IMPORT_VALIDATION_WORKERS') or 4)
+    
+    # Bulk status transitions (approval queues)
+    BULK_STATUS_MAX_RECORDS = int(os.environ.get('BULK_STATUS_MAX_RECORDS') or 5000)
+    
+    # Per-process user profile cache; role/location claims in access tokens
+    # younger than USER_CLAIMS_MAX_AGE seconds are trusted without a lookup
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 2048)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
+    USER_CLAIMS_MAX_AGE = int(os.environ.get('USER_CLAIMS_MAX_AGE') or 300)
+    
+    # Password hashing pool; changing BCRYPT_ROUNDS rehashes passwords on next login
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS') or 12)
+    BCRYPT_WORKERS = int(os.environ.get('BCRYPT_WORKERS') or 4)
+    BCRYPT_MAX_QUEUE = int(os.environ.get('BCRYPT_MAX_QUEUE') or 32)
+    BCRYPT_TIMEOUT = float(os.environ.get('BCRYPT_TIMEOUT') or 10)
+    
+    # Login throttling: 'memory' for a single node, 'mongo' to share counters between nodes
+    LOGIN_RATE_LIMIT_BACKEND = os.environ.get('LOGIN_RATE_LIMIT_BACKEND') or 'memory'
+    LOGIN_MAX_ATTEMPTS_PER_IP = int(os.environ.get('LOGIN_MAX_ATTEMPTS_PER_IP') or 30)
+    LOGIN_IP_WINDOW = int(os.environ.get('LOGIN_IP_WINDOW') or 60)
+    LOGIN_MAX_FAILURES_PER_EMAIL = int(os.environ.get('LOGIN_MAX_FAILURES_PER_EMAIL') or 5)
+    LOGIN_EMAIL_WINDOW = int(os.environ.get('LOGIN_EMAIL_WINDOW') or 900)
+    
+    # Reverse proxies in front of the app whose X-Forwarded-For/-Proto headers are trusted
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT') or 0)
+    
+    # Token revocation: how often each process pulls revocations made elsewhere
+    REVOCATION_SYNC_INTERVAL = int(os.environ.get('REVOCATION_SYNC_INTERVAL') or 5)
+    REVOCATION_BLOOM_CAPACITY = int(os.environ.get('REVOCATION_BLOOM_CAPACITY') or 100000)
+    
+    # Async serving mode (asgi.py): threads running the Flask routes that aren't served natively
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS') or 16)
+    
+    # Listings: 'sequential', 'concurrent' (page and count in flight together) or 'facet'
+    # (one $facet aggregation); RecordType.count_strategy overrides it per record type
+    LISTING_COUNT_STRATEGY = os.environ.get('LISTING_COUNT_STRATEGY') or 'concurrent'
+    LISTING_COUNT_THREADS = int(os.environ.get('LISTING_COUNT_THREADS') or 8)
+    
+    # Listing ETags also expire after this many seconds (replicas can lag each other)
+    LISTING_ETAG_TTL = int(os.environ.get('LISTING_ETAG_TTL') or 60)
+    
+    # Listing query results: 'memory' (per-process LRU bounded by QUERY_CACHE_MAX_BYTES),
+    # 'redis' (shared through QUERY_CACHE_REDIS_URL) or 'none'; entries never outlive QUERY_CACHE_TTL
+    QUERY_CACHE_BACKEND = os.environ.get('QUERY_CACHE_BACKEND') or 'memory'
+    QUERY_CACHE_MAX_BYTES = int(os.environ.get('QUERY_CACHE_MAX_BYTES') or 67108864)
+    QUERY_CACHE_TTL = int(os.environ.get('QUERY_CACHE_TTL') or 30)
+    QUERY_CACHE_REDIS_URL = os.environ.get('QUERY_CACHE_REDIS_URL') or 'redis://localhost:6379/0'
+    
+    # Response encoding: 'orjson' (falls back to 'stdlib' when orjson isn't installed) or 'stdlib'
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER') or 'orjson'
+    
+    # Response compression (br needs the brotli package): bodies under COMPRESSION_MIN_SIZE bytes go
+    # out as they are; the STORED levels apply to cached payloads, which are compressed only once
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE') or 1024)
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL') or 6)
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY') or 5)
+    COMPRESSION_STORED_GZIP_LEVEL = int(os.environ.get('COMPRESSION_STORED_GZIP_LEVEL') or 9)
+    COMPRESSION_STORED_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_STORED_BROTLI_QUALITY') or 11)
+    
+    # Precompressed dashboard snapshots (stored like QUERY_CACHE_BACKEND)
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES') or 16777216)
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL') or 30)
+    
+    # Request and MongoDB command metrics on GET /metrics ('1' installs the hooks and listener);
+    # scrapers send METRICS_TOKEN as a bearer token, and /metrics isn't served without one
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED') == '1'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+    
+    # Slow-query log: commands taking SLOW_QUERY_THRESHOLD_MS or longer are stored ('0' turns it off);
+    # those over SLOW_QUERY_EXPLAIN_MS get an explain sample, once per shape per SLOW_QUERY_EXPLAIN_INTERVAL
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS') or 100)
+    SLOW_QUERY_EXPLAIN_MS = int(os.environ.get('SLOW_QUERY_EXPLAIN_MS') or 500)
+    SLOW_QUERY_EXPLAIN_INTERVAL = int(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL') or 3600)
+    
+    # Logging: 'json' lines (or 'text') written by a background thread; DEBUG/INFO records of the loggers
+    # in LOG_SAMPLE_RATES ('app.access=0.1') are sampled, and requests over LOG_SLOW_REQUEST_MS log a warning
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
+    LOG_FORMAT = os.environ.get('LOG_FORMAT') or 'json'
+    LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES') or ''
+    LOG_SLOW_REQUEST_MS = int(os.environ.get('LOG_SLOW_REQUEST_MS') or 1000)
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE') or 10000)
+    
+    # Request profiling ('1' to enable): requests sending X-Profile: PROFILING_TOKEN, plus PROFILING_SAMPLE_RATE
+    # of all requests (or what an admin sets at runtime), are profiled into PROFILING_FOLDER
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN') or None
+    PROFILING_MODE = os.environ.get('PROFILING_MODE') or 'sample'
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE') or 0)
+    PROFILING_INTERVAL_MS = float(os.environ.get('PROFILING_INTERVAL_MS') or 5)
+    PROFILING_REFRESH_SECONDS = int(os.environ.get('PROFILING_REFRESH_SECONDS') or 10)
+    PROFILING_FOLDER = os.environ.get('PROFILING_FOLDER') or './profiles'
+    PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES') or 500)
@@ -98,7 +98,9 @@ export const AuthProvider = ({ children }) => {
 
   // Logout function
   const logout = () => {
+    authAPI.logout();
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     localStorage.removeItem('user');
     dispatch({ type: 'LOGOUT' });
   };
@@ -62,7 +62,8 @@ const AdminDashboard = () => {
     queryKey: ['users'],
     queryFn: () => {
       console.log('Fetching users...');
-      return usersAPI.getUsers();
+      // Newest users first; the directory is paginated server-side
+      return usersAPI.getUsers({ limit: 200 });
     },
     select: (data) => {
       console.log('Users data received:', data);
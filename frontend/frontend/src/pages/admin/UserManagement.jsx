@@ -22,22 +22,48 @@ const UserManagement = () => {
   const [selectedUser, setSelectedUser] = useState(null);
   const [showFilters, setShowFilters] = useState(false);
   const [roleFilter, setRoleFilter] = useState('');
+  const [regionFilter, setRegionFilter] = useState('');
+  const [statusFilter, setStatusFilter] = useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [totalUsers, setTotalUsers] = useState(0);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // Search runs on the server, so wait for the admin to stop typing
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearch(searchTerm.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
   useEffect(() => {
     if (user?.role === 'admin') {
       fetchUsers();
     }
-  }, [user, roleFilter]);
+  }, [user, roleFilter, regionFilter, statusFilter, debouncedSearch]);
+
+  const buildParams = (cursor) => {
+    const params = {};
+    if (debouncedSearch) params.search = debouncedSearch;
+    if (roleFilter) params.role = roleFilter;
+    if (regionFilter) params.region = regionFilter;
+    if (statusFilter) params.is_active = statusFilter;
+    if (cursor) params.cursor = cursor;
+    return params;
+  };
 
   const fetchUsers = async () => {
     try {
       setLoading(true);
-      const response = await usersAPI.getUsers();
+      const response = await usersAPI.getUsers(buildParams());
       
       if (response && response.users) {
         setUsers(response.users);
+        setNextCursor(response.next_cursor || null);
+        setTotalUsers(response.total ?? response.users.length);
       } else {
         setUsers([]);
+        setNextCursor(null);
+        setTotalUsers(0);
       }
     } catch (error) {
       console.error('Error fetching users:', error);
@@ -48,6 +74,21 @@ const UserManagement = () => {
     }
   };
 
+  const fetchMoreUsers = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await usersAPI.getUsers(buildParams(nextCursor));
+      setUsers((current) => [...current, ...(response?.users || [])]);
+      setNextCursor(response?.next_cursor || null);
+    } catch (error) {
+      console.error('Error fetching users:', error);
+      toast.error(t('users.failedToLoad'));
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDeleteUser = async (id) => {
     if (window.confirm(t('users.deleteConfirm'))) {
       try {
@@ -118,6 +159,8 @@ const UserManagement = () => {
 
   const clearRoleFilter = () => {
     setRoleFilter('');
+    setRegionFilter('');
+    setStatusFilter('');
     toast.info(t('users.filterCleared'));
   };
 
@@ -153,16 +196,8 @@ const UserManagement = () => {
     }
   };
 
-  // Filter users based on search term and role
-  const filteredUsers = users.filter(user => {
-    const matchesSearch = user.full_name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      user.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      user.badge_number?.toLowerCase().includes(searchTerm.toLowerCase());
-    
-    const matchesRole = roleFilter === '' || user.role === roleFilter;
-    
-    return matchesSearch && matchesRole;
-  });
+  // Search and filters are applied by the server
+  const filteredUsers = users;
 
   if (user?.role !== 'admin') {
     return (
@@ -189,7 +224,7 @@ const UserManagement = () => {
                 {t('users.title')}
               </h1>
               <p className="text-purple-100 mt-2 text-lg">
-                {t('users.description')} • {users.length} {t('users.totalUsers')}
+                {t('users.description')} • {totalUsers} {t('users.totalUsers')}
               </p>
             </div>
             <Button 
@@ -260,6 +295,27 @@ const UserManagement = () => {
                   <option value="statistician">{t('users.statistician')}</option>
                 </select>
               </div>
+              <div>
+                <label className="block text-sm font-medium text-gray-700 mb-2">{t('users.region')}</label>
+                <Input
+                  value={regionFilter}
+                  onChange={(e) => setRegionFilter(e.target.value)}
+                  placeholder={t('users.region')}
+                  className="w-full rounded-lg border-gray-300 shadow-sm focus:border-purple-500 focus:ring-purple-500"
+                />
+              </div>
+              <div>
+                <label className="block text-sm font-medium text-gray-700 mb-2">{t('users.status')}</label>
+                <select
+                  value={statusFilter}
+                  onChange={(e) => setStatusFilter(e.target.value)}
+                  className="w-full rounded-lg border-gray-300 shadow-sm focus:border-purple-500 focus:ring-purple-500"
+                >
+                  <option value="">{t('users.allStatuses')}</option>
+                  <option value="true">{t('users.active')}</option>
+                  <option value="false">{t('users.inactive')}</option>
+                </select>
+              </div>
             </div>
             <div className="flex gap-3 mt-6">
               <Button
@@ -406,6 +462,18 @@ const UserManagement = () => {
                   )}
                 </tbody>
               </table>
+              {nextCursor && (
+                <div className="flex justify-center py-4 border-t border-gray-200">
+                  <Button
+                    onClick={fetchMoreUsers}
+                    disabled={loadingMore}
+                    variant="outline"
+                    className="border-2 border-purple-600 text-purple-600 hover:bg-purple-600 hover:text-white font-semibold px-6 py-2 rounded-lg"
+                  >
+                    {loadingMore ? t('users.loadingUsers') : t('users.loadMore')}
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </Card>
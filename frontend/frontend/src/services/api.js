@@ -80,6 +80,22 @@ const ERROR_MESSAGES = {
   default: 'An error occurred. Please try again.',
 };
 
+// Operation time of this tab's latest write (X-Operation-Time). Sent back as
+// X-After-Operation-Time so listings read from replicas include that write.
+let lastOperationTime = null;
+
+const compareOperationTimes = (a, b) => {
+  const [aSeconds, aIncrement] = a.split('.').map(Number);
+  const [bSeconds, bIncrement] = b.split('.').map(Number);
+  return aSeconds - bSeconds || aIncrement - bIncrement;
+};
+
+const rememberOperationTime = (value) => {
+  if (value && (!lastOperationTime || compareOperationTimes(value, lastOperationTime) > 0)) {
+    lastOperationTime = value;
+  }
+};
+
 // Request interceptor to add auth token and handle common headers
 api.interceptors.request.use(
   (config) => {
@@ -90,6 +106,10 @@ api.interceptors.request.use(
       config.headers.Authorization = `Bearer ${token}`;
     }
     
+    if (lastOperationTime) {
+      config.headers['X-After-Operation-Time'] = lastOperationTime;
+    }
+    
     // Add request timestamp for debugging
     config.headers['X-Request-Timestamp'] = new Date().toISOString();
     
@@ -112,9 +132,58 @@ api.interceptors.request.use(
   }
 );
 
+// Access tokens are short-lived; renew them with the refresh token.
+// Concurrent 401s share a single refresh request.
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshPromise = (refreshToken
+      ? axios.post(`${api.defaults.baseURL}/auth/refresh`, null, {
+          headers: { Authorization: `Bearer ${refreshToken}` },
+        })
+          .then((res) => {
+            localStorage.setItem('token', res.data.access_token);
+            return res.data.access_token;
+          })
+          .catch(() => null)
+      : Promise.resolve(null)
+    ).finally(() => {
+      refreshPromise = null;
+    });
+  }
+  return refreshPromise;
+};
+
+const clearSession = () => {
+  localStorage.removeItem('token');
+  localStorage.removeItem('refresh_token');
+  localStorage.removeItem('user');
+  // Only redirect if not already on login page
+  if (!window.location.pathname.includes('/login')) {
+    window.location.href = '/login';
+  }
+};
+
 // Response interceptor to handle errors globally
 api.interceptors.response.use(
-  (response) => {
+  async (response) => {
+    rememberOperationTime(response.headers?.['x-operation-time']);
+    
+    // 4xx responses resolve (see validateStatus), so expired tokens are handled here
+    const isAuthRequest = response.config.url?.includes('/auth/');
+    if (response.status === 401 && !isAuthRequest && !response.config._retried) {
+      const accessToken = await refreshAccessToken();
+      if (accessToken) {
+        response.config._retried = true;
+        response.config.headers.Authorization = `Bearer ${accessToken}`;
+        return api(response.config);
+      }
+      clearSession();
+      return response;
+    }
+    
     if (isDevelopment) {
       console.log(`API Response: ${response.config.method?.toUpperCase()} ${response.config.url}`, response);
     }
@@ -183,12 +252,7 @@ api.interceptors.response.use(
 
     // Handle logout if needed
     if (shouldLogout) {
-      localStorage.removeItem('token');
-      localStorage.removeItem('user');
-      // Only redirect if not already on login page
-      if (!window.location.pathname.includes('/login')) {
-        window.location.href = '/login';
-      }
+      clearSession();
     }
 
     // Show error toast if not explicitly disabled
@@ -225,6 +289,9 @@ export const authAPI = {
       // If login is successful, store the token
       if (response.data && response.data.access_token) {
         localStorage.setItem('token', response.data.access_token);
+        if (response.data.refresh_token) {
+          localStorage.setItem('refresh_token', response.data.refresh_token);
+        }
         return response.data;
       } else {
         throw new Error('Login failed - no access token received');
@@ -252,6 +319,22 @@ export const authAPI = {
     }
   },
   
+  logout: async () => {
+    try {
+      // Revoke both tokens server-side; read them now, the caller clears the session right away
+      const token = localStorage.getItem('token');
+      const refreshToken = localStorage.getItem('refresh_token');
+      if (!token) return;
+      await api.post(
+        '/auth/logout',
+        { refresh_token: refreshToken },
+        { headers: { Authorization: `Bearer ${token}` }, showError: false }
+      );
+    } catch (error) {
+      console.error('Logout error:', error);
+    }
+  },
+  
   getCurrentUser: async () => {
     const response = await api.get('/auth/me');
     return response.data;
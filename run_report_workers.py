@@ -0,0 +1,16 @@
+import argparse
+from config import Config
+from app.jobs import run_worker_pool
+
+def main():
+    parser = argparse.ArgumentParser(description='Run background report generation workers')
+    parser.add_argument('--processes', type=int, default=Config.REPORT_WORKERS, help='number of worker processes')
+    args = parser.parse_args()
+
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    print(f"🛠️ Starting {args.processes} report worker(s)...")
+    run_worker_pool(config, args.processes)
+    print("✅ Report workers stopped")
+
+if __name__ == '__main__':
+    main()
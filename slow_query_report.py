@@ -0,0 +1,45 @@
+import argparse
+import json
+from datetime import datetime, timedelta
+from config import Config
+from app.db import create_client, operation_options
+from app.slow_queries import top_shapes
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank slow MongoDB query shapes by total time')
+    parser.add_argument('--hours', type=float, default=24, help='look back this many hours')
+    parser.add_argument('--limit', type=int, default=20, help='number of shapes to show')
+    parser.add_argument('--collection', default='', help='only this collection')
+    parser.add_argument('--json', action='store_true', help='print the raw result as JSON')
+    args = parser.parse_args()
+
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    client = create_client(config)
+    try:
+        db = client.get_database(**operation_options(config, 'analytics'))
+        shapes = top_shapes(db, datetime.utcnow() - timedelta(hours=args.hours), args.limit, args.collection or None)
+    finally:
+        client.close()
+
+    if args.json:
+        print(json.dumps(shapes, indent=2, default=str))
+        return
+    if not shapes:
+        print(f"✅ No slow queries in the last {args.hours:g} hours")
+        return
+
+    print(f"🐢 Slowest query shapes in the last {args.hours:g} hours, by total time")
+    for rank, shape in enumerate(shapes, 1):
+        routes = ', '.join(sorted(route for route in shape['routes'] if route)) or '-'
+        print(f"\n#{rank} {shape['command']} on {shape['collection']}: {shape['total_ms']:.0f} ms total, "
+              f"{shape['count']} runs, avg {shape['avg_ms']:.1f} ms, max {shape['max_ms']:.1f} ms, "
+              f"avg {shape['avg_docs_returned'] or 0:.1f} docs returned")
+        print(f"   routes: {routes}")
+        print(f"   shape:  {shape['shape']}")
+        explain = shape['explain']
+        if explain:
+            print(f"   plan:   {explain['plan']} - examined {explain['docs_examined']} docs / "
+                  f"{explain['keys_examined']} keys for {explain['n_returned']} returned")
+
+if __name__ == '__main__':
+    main()
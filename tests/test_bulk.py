@@ -0,0 +1,188 @@
+from datetime import datetime
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from app.indexes import ensure_unique_certificates
+from app.bulk import allocate_certificate_numbers, bulk_update_status, import_records, insert_in_batches, parse_rows
+from app.registry import BIRTH
+
+CLERK = {'_id': ObjectId(), 'full_name': 'Test Clerk', 'role': 'clerk', 'region': 'OR', 'woreda': '3'}
+OFFICER = {'_id': ObjectId(), 'full_name': 'Test Officer', 'role': 'vms_officer', 'region': 'Oromia', 'woreda': 'W01'}
+
+CSV_HEADER = 'child_first_name,child_father_name,child_gender,date_of_birth,father_full_name,mother_full_name,father_phone'
+
+def birth_rows(*lines):
+    return parse_rows('\n'.join([CSV_HEADER, *lines]), 'csv')
+
+def build(data, certificate_number, quality_score, warnings):
+    return BIRTH.build_document(data, CLERK, str(CLERK['_id']), certificate_number, quality_score, warnings)
+
+def run_import(db, rows, **options):
+    return import_records(db, db.birth_records, 'birth', rows, CLERK, build, BIRTH.describe, ip_address='10.0.0.1', **options)
+
+def test_certificate_numbers_are_allocated_in_consecutive_blocks(db):
+    first = allocate_certificate_numbers(db, 'birth', 'OR', '3', 3, year='2016')
+    second = allocate_certificate_numbers(db, 'birth', 'OR', '3', 2, year='2016')
+
+    assert first == ['BR/OR/03/2016/00001', 'BR/OR/03/2016/00002', 'BR/OR/03/2016/00003']
+    assert second == ['BR/OR/03/2016/00004', 'BR/OR/03/2016/00005']
+    assert allocate_certificate_numbers(db, 'birth', 'OR', '3', 0) == []
+    # Other woredas count separately
+    assert allocate_certificate_numbers(db, 'birth', 'OR', '4', 1, year='2016') == ['BR/OR/04/2016/00001']
+
+def test_certificate_counters_continue_after_numbers_already_issued(db):
+    db.birth_records.insert_many([
+        {'certificate_number': 'BR/OR/03/2016/48213'},
+        {'certificate_number': 'BR/OR/03/2016/00917'},
+        {'certificate_number': 'BR/OR/03/2015/99999'}
+    ])
+
+    assert allocate_certificate_numbers(db, 'birth', 'OR', '3', 2, year='2016') == [
+        'BR/OR/03/2016/48214', 'BR/OR/03/2016/48215'
+    ]
+    assert allocate_certificate_numbers(db, 'birth', 'OR', '3', 1, year='2016') == ['BR/OR/03/2016/48216']
+
+def test_import_renumbers_rows_whose_certificate_number_is_taken(db):
+    ensure_unique_certificates(db.birth_records)
+    year = datetime.now().year - 8
+    allocate_certificate_numbers(db, 'birth', 'OR', '3', 1)
+    # Issued behind the counter's back, e.g. by a node still running the random generator
+    db.birth_records.insert_one({'certificate_number': f'BR/OR/03/{year}/00002'})
+
+    report = run_import(db, birth_rows(
+        'Abebe,Kebede,male,2023-05-01,Kebede Alemu,Almaz Bekele,',
+        'Yonas,Solomon,male,2023-07-01,Solomon Tadesse,Hirut Mulugeta,'
+    ))
+
+    assert (report['inserted'], report['failed']) == (2, 0)
+    assert sorted(record['certificate_number'] for record in report['records']) == [
+        f'BR/OR/03/{year}/00003', f'BR/OR/03/{year}/00004'
+    ]
+
+def test_import_reports_every_row(db):
+    rows = birth_rows(
+        'Abebe,Kebede,male,2023-05-01,Kebede Alemu,Almaz Bekele,0911234567',
+        ',Haile,female,2023-06-01,Haile Girma,Selam Tesfaye,',
+        'Tigist,Dawit,female,2999-01-01,Dawit Yonas,Meron Abate,',
+        'Yonas,Solomon,male,2023-07-01,Solomon Tadesse,Hirut Mulugeta,12345'
+    )
+
+    report = run_import(db, rows)
+
+    assert (report['total'], report['valid'], report['inserted'], report['failed']) == (4, 2, 2, 2)
+    assert [error['row'] for error in report['errors']] == [3, 4]
+    assert 'child_first_name is required' in report['errors'][0]['errors']
+    assert 'date_of_birth cannot be in the future' in report['errors'][1]['errors']
+
+    assert [record['row'] for record in report['records']] == [2, 5]
+    year = datetime.now().year - 8
+    assert [record['certificate_number'] for record in report['records']] == [
+        f'BR/OR/03/{year}/00001', f'BR/OR/03/{year}/00002'
+    ]
+    assert report['records'][1]['warnings'] == ['father_phone does not look like an Ethiopian phone number']
+
+    stored = list(db.birth_records.find({}, sort=[('certificate_number', 1)]))
+    assert [record['child_first_name'] for record in stored] == ['Abebe', 'Yonas']
+    assert {record['import_batch'] for record in stored} == {report['batch_id']}
+    assert all(record['status'] == 'draft' for record in stored)
+
+    audit = list(db.audit_logs.find())
+    assert sorted(entry['record_id'] for entry in audit) == sorted(record['id'] for record in report['records'])
+    assert {(entry['action'], entry['user_role'], entry['ip_address']) for entry in audit} == {('create', 'clerk', '10.0.0.1')}
+
+def test_dry_run_validates_without_writing(db):
+    report = run_import(db, birth_rows('Abebe,Kebede,male,2023-05-01,Kebede Alemu,Almaz Bekele,'), dry_run=True)
+
+    assert (report['valid'], report['inserted'], report['dry_run']) == (1, 0, True)
+    assert db.birth_records.count_documents({}) == 0
+    assert db.counters.count_documents({}) == 0
+    assert db.audit_logs.count_documents({}) == 0
+
+def test_ndjson_parse_errors_are_reported_per_row(db):
+    rows = parse_rows('{"child_first_name": "Abebe"\n\n{not json}\n', 'ndjson')
+
+    report = run_import(db, rows)
+
+    assert report['inserted'] == 0
+    assert [error['row'] for error in report['errors']] == [1, 3]
+    assert report['errors'][1]['errors'][0].startswith('Invalid JSON')
+
+def test_insert_in_batches_reports_failed_documents(db):
+    existing = ObjectId()
+    db.birth_records.insert_one({'_id': existing})
+    documents = [{'n': 0}, {'_id': existing, 'n': 1}, {'n': 2}, {'n': 3}]
+
+    inserted, failed = insert_in_batches(db.birth_records, documents, batch_size=2)
+
+    assert sorted(inserted) == [0, 2, 3]
+    assert list(failed) == [1]
+    assert db.birth_records.count_documents({}) == 4
+
+def scoped_filters(args):
+    return {'birth_region': OFFICER['region']}
+
+def insert_births(db, *specs):
+    return [db.birth_records.insert_one({'birth_region': region, 'status': status}).inserted_id for region, status in specs]
+
+def test_bulk_rejection_with_reasons_updates_each_record(db):
+    first, second, elsewhere, done = insert_births(
+        db, ('Oromia', 'submitted'), ('Oromia', 'submitted'), ('Amhara', 'submitted'), ('Oromia', 'rejected')
+    )
+
+    report = bulk_update_status(
+        db, db.birth_records, 'birth', OFFICER, str(OFFICER['_id']),
+        {
+            'status': 'rejected',
+            'ids': [str(first), str(second), str(elsewhere), str(done), str(first)],
+            'rejection_reason': 'Incomplete',
+            'reasons': {str(second): 'Wrong woreda'}
+        },
+        scoped_filters, ip_address='10.0.0.2'
+    )
+
+    assert report['matched'] == 2
+    assert report['updated_ids'] == sorted([str(first), str(second)])
+    assert report['skipped_ids'] == [str(elsewhere), str(done)]
+    assert db.birth_records.find_one({'_id': first})['rejection_reason'] == 'Incomplete'
+    assert db.birth_records.find_one({'_id': second})['rejection_reason'] == 'Wrong woreda'
+    assert db.birth_records.find_one({'_id': elsewhere})['status'] == 'submitted'
+
+    details = sorted(entry['details'] for entry in db.audit_logs.find({'action': 'reject'}))
+    assert details == [
+        'Changed status to rejected (bulk) - Reason: Incomplete',
+        'Changed status to rejected (bulk) - Reason: Wrong woreda'
+    ]
+
+def test_bulk_status_by_filter_stays_in_scope(db):
+    inside, elsewhere = insert_births(db, ('Oromia', 'submitted'), ('Amhara', 'submitted'))
+
+    report = bulk_update_status(
+        db, db.birth_records, 'birth', OFFICER, str(OFFICER['_id']),
+        {'status': 'approved', 'filter': {'status': 'submitted'}}, scoped_filters
+    )
+
+    assert report['updated_ids'] == [str(inside)]
+    assert 'skipped_ids' not in report
+    assert db.birth_records.find_one({'_id': inside})['approved_by'] == str(OFFICER['_id'])
+    assert db.birth_records.find_one({'_id': elsewhere})['status'] == 'submitted'
+
+def test_bulk_approval_needs_an_approver(db):
+    with pytest.raises(PermissionError):
+        bulk_update_status(
+            db, db.birth_records, 'birth', CLERK, str(CLERK['_id']), {'status': 'approved', 'ids': []}, scoped_filters
+        )
+
+def test_bulk_audit_entries_go_to_the_audit_handle(db):
+    audit_db = mongomock.MongoClient().get_database('evems_audit')
+    inside, = insert_births(db, ('Oromia', 'submitted'))
+
+    bulk_update_status(
+        db, db.birth_records, 'birth', OFFICER, str(OFFICER['_id']),
+        {'status': 'approved', 'ids': [str(inside)]}, scoped_filters, audit_db=audit_db
+    )
+    run_import(db, birth_rows('Abebe,Kebede,male,2023-05-01,Kebede Alemu,Almaz Bekele,'), audit_db=audit_db)
+
+    assert db.audit_logs.count_documents({}) == 0
+    assert sorted(entry['action'] for entry in audit_db.audit_logs.find()) == ['approve', 'create']
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.jobs import JobCancelled, ReportJobQueue, job_handler, report_data_version, run_job
+from app.versions import bump_version
+
+PARAMS = {'record_types': ['birth'], 'region': 'Oromia'}
+
+@job_handler('test')
+def run_test_job(db, job, progress, config):
+    progress(50)
+    return {'csv': config['artifact']}, {'rows': 1}
+
+@pytest.fixture
+def queue(db):
+    return ReportJobQueue(db, lease_seconds=60)
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / 'report.csv'
+    path.write_text('record_type,count\n')
+    return str(path)
+
+def finish(queue, db, artifact, worker_id='worker-1'):
+    job = queue.claim(worker_id)
+    run_job(queue, db, job, {'artifact': artifact})
+    return job
+
+def test_completed_work_is_shared_through_a_job_of_the_requesters_own(queue, db, artifact):
+    first, _ = queue.enqueue('test', PARAMS, 'alice', report_id='5f0000000000000000000001')
+    finish(queue, db, artifact)
+
+    second, cached = queue.enqueue('test', PARAMS, 'bob', report_id='5f0000000000000000000002')
+
+    assert cached
+    assert second['_id'] != first['_id']
+    assert (second['requested_by'], str(second['report_id'])) == ('bob', '5f0000000000000000000002')
+    assert (second['status'], second['artifacts']) == ('completed', {'csv': artifact})
+    assert queue.claim('worker-2') is None
+
+def test_completed_work_is_not_reused_once_the_records_changed(queue, db, artifact):
+    params = {'record_types': ['birth']}
+    first, _ = queue.enqueue('test', params, 'alice', data_version=report_data_version(db, params))
+    finish(queue, db, artifact)
+
+    assert queue.enqueue('test', params, 'bob', data_version=report_data_version(db, params))[1]
+    # Writes to other record types don't matter
+    bump_version(db, 'death_records')
+    assert queue.enqueue('test', params, 'bob', data_version=report_data_version(db, params))[1]
+
+    bump_version(db, 'birth_records', ['Oromia'])
+    second, cached = queue.enqueue('test', params, 'bob', data_version=report_data_version(db, params))
+    assert not cached
+    assert (second['status'], second['shares_job_id']) == ('queued', None)
+    assert not queue.enqueue('test', params, 'carol', reuse_artifacts=False)[1]
+
+def test_a_follower_mirrors_the_active_job_and_keeps_its_outcome(queue, db, artifact):
+    first, _ = queue.enqueue('test', PARAMS, 'alice')
+    second, cached = queue.enqueue('test', PARAMS, 'bob')
+
+    assert not cached
+    assert second['shares_job_id'] == first['_id']
+    assert second['requested_by'] == 'bob'
+
+    finish(queue, db, artifact)
+    # Only one job ran; the follower was never claimed
+    assert queue.claim('worker-2') is None
+    followed = queue.get(str(second['_id']))
+    assert (followed['status'], followed['artifacts']) == ('completed', {'csv': artifact})
+    assert db.report_jobs.find_one({'_id': second['_id']})['status'] == 'completed'
+
+def test_cancelling_a_follower_leaves_the_shared_work_running(queue, db, artifact):
+    first, _ = queue.enqueue('test', PARAMS, 'alice')
+    second, _ = queue.enqueue('test', PARAMS, 'bob')
+
+    assert queue.cancel(str(second['_id']))['status'] == 'cancelled'
+    assert queue.get(str(first['_id']))['status'] == 'queued'
+
+def test_a_follower_runs_itself_when_the_leader_is_cancelled(queue, db, artifact):
+    first, _ = queue.enqueue('test', PARAMS, 'alice')
+    second, _ = queue.enqueue('test', PARAMS, 'bob')
+
+    queue.cancel(str(first['_id']))
+
+    assert queue.get(str(second['_id']))['status'] == 'queued'
+    assert queue.claim('worker-1')['_id'] == second['_id']
+
+def test_a_cancelled_job_whose_worker_died_is_finished_and_releases_its_followers(queue, db, artifact):
+    first, _ = queue.enqueue('test', PARAMS, 'alice')
+    queue.claim('worker-1')
+    second, _ = queue.enqueue('test', PARAMS, 'bob')
+    queue.cancel(str(first['_id']))
+    db.report_jobs.update_one({'_id': first['_id']}, {'$set': {'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)}})
+
+    assert queue.claim('worker-2') is None
+    assert queue.get(str(first['_id']))['status'] == 'cancelled'
+    assert queue.get(str(second['_id']))['status'] == 'queued'
+    assert queue.claim('worker-2')['_id'] == second['_id']
+
+def test_a_stale_worker_cannot_finish_a_job_taken_over_by_another(queue, db, artifact):
+    job, _ = queue.enqueue('test', PARAMS, 'alice')
+    stale = queue.claim('worker-1')
+    db.report_jobs.update_one({'_id': job['_id']}, {'$set': {'worker_id': 'worker-2'}})
+
+    with pytest.raises(JobCancelled):
+        queue.report_progress(job['_id'], 'worker-1', 50)
+    assert not queue.complete(job['_id'], 'worker-1', {'csv': artifact})
+    assert not queue.fail(job['_id'], 'worker-1', 'boom')
+
+    run_job(queue, db, stale, {'artifact': artifact})
+    assert queue.get(str(job['_id']))['status'] == 'running'
+
+def test_a_cancel_after_the_last_progress_check_wins(queue, db, artifact):
+    job, _ = queue.enqueue('test', PARAMS, 'alice')
+    queue.claim('worker-1')
+    queue.cancel(str(job['_id']))
+
+    assert not queue.complete(job['_id'], 'worker-1', {'csv': artifact})
+    assert queue.mark_cancelled(job['_id'], 'worker-1')
+    assert queue.get(str(job['_id']))['status'] == 'cancelled'
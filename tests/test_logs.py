@@ -0,0 +1,31 @@
+import json
+import logging
+import sys
+
+from app.logs import JsonFormatter, RedactionFilter, RequestContextFilter, TextFormatter
+
+def make_record(msg, args=(), exc_info=None):
+    return logging.LogRecord('app.test', logging.ERROR, __file__, 1, msg, args, exc_info)
+
+def test_a_message_whose_arguments_do_not_fit_is_kept_instead_of_raising():
+    record = make_record('user %s has %d records', ('clerk@example.com',))
+
+    assert RedactionFilter().filter(record)
+    assert record.getMessage() == 'user %s has %d records'
+
+def test_tracebacks_are_redacted_in_both_formats():
+    try:
+        raise ValueError("E11000 duplicate key error dup key: { email: 'clerk@example.com', phone: '0911234567' }")
+    except ValueError:
+        record = make_record('Insert failed for %s', ('clerk@example.com',), exc_info=sys.exc_info())
+    RequestContextFilter().filter(record)
+    RedactionFilter().filter(record)
+
+    entry = json.loads(JsonFormatter().format(record))
+    record.exc_text = None
+    line = TextFormatter().format(record)
+
+    for text in (entry['message'], entry['exc_info'], line):
+        assert 'clerk@example.com' not in text
+        assert '0911234567' not in text
+    assert 'E11000 duplicate key error' in entry['exc_info']
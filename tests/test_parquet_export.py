@@ -0,0 +1,96 @@
+import os
+from datetime import datetime
+
+import pyarrow.parquet as pq
+import pytest
+
+from app.parquet_export import export_record_type, note_vacated_partition
+
+def partition_folder(root, region, eth_year):
+    return os.path.join(root, 'record_type=birth', f'region={region}', f'eth_year={eth_year}')
+
+def exported_names(root, region, eth_year):
+    table = pq.read_table(os.path.join(partition_folder(root, region, eth_year), 'part-0.parquet'))
+    return sorted(table.column('child_first_name').to_pylist())
+
+def insert_birth(db, name, region, date_of_birth):
+    return db.birth_records.insert_one({
+        'child_first_name': name, 'birth_region': region, 'date_of_birth': date_of_birth, 'updated_at': datetime.utcnow()
+    }).inserted_id
+
+def test_incremental_export_rewrites_the_partitions_records_left(db, tmp_path):
+    root = str(tmp_path)
+    moved = insert_birth(db, 'Abebe', 'Oromia', '2023-05-01')
+    insert_birth(db, 'Almaz', 'Oromia', '2023-06-01')
+    deleted = insert_birth(db, 'Tigist', 'Amhara', '2023-07-01')
+    export_record_type(db, 'birth', root)
+    assert exported_names(root, 'Oromia', '2015') == ['Abebe', 'Almaz']
+
+    # As the update and delete routes do it
+    db.birth_records.update_one({'_id': moved}, {'$set': {'birth_region': 'Sidama', 'updated_at': datetime.utcnow()}})
+    note_vacated_partition(db, 'birth_records', 'Oromia', '2023-05-01')
+    db.birth_records.delete_one({'_id': deleted})
+    note_vacated_partition(db, 'birth_records', 'Amhara', '2023-07-01')
+
+    assert export_record_type(db, 'birth', root) == 3
+    assert exported_names(root, 'Oromia', '2015') == ['Almaz']
+    assert exported_names(root, 'Sidama', '2015') == ['Abebe']
+    assert not os.path.exists(partition_folder(root, 'Amhara', '2015'))
+    assert db.export_changes.count_documents({}) == 0
+
+    # Nothing changed since
+    assert export_record_type(db, 'birth', root) == 0
+
+def test_records_are_partitioned_by_the_ethiopian_year_starting_in_september(db, tmp_path):
+    root = str(tmp_path)
+    # Meskerem 1 fell on 11 September 2022, and on 12 September 2023 (2024 is a leap year)
+    insert_birth(db, 'Abebe', 'Oromia', '2022-09-10')
+    insert_birth(db, 'Almaz', 'Oromia', '2022-09-11')
+    insert_birth(db, 'Tigist', 'Oromia', '2023-09-11')
+    insert_birth(db, 'Yonas', 'Oromia', '2023-12-25')
+    insert_birth(db, 'Hirut', 'Oromia', '2023')
+
+    assert export_record_type(db, 'birth', root) == 4
+    assert exported_names(root, 'Oromia', '2014') == ['Abebe']
+    assert exported_names(root, 'Oromia', '2015') == ['Almaz', 'Tigist']
+    assert exported_names(root, 'Oromia', '2016') == ['Yonas']
+    assert exported_names(root, 'Oromia', 'unknown') == ['Hirut']
+
+def test_partitions_are_streamed_in_row_groups_with_one_type_per_column(db, tmp_path):
+    root = str(tmp_path)
+    for index in range(5):
+        db.birth_records.insert_one({
+            'child_first_name': f'Child {index}', 'birth_region': 'Oromia', 'date_of_birth': '2023-05-01',
+            'weight_kg': 3.2 if index % 2 else '3,4', 'updated_at': datetime.utcnow()
+        })
+    db.birth_records.insert_one({'child_first_name': 'Late', 'birth_region': 'Oromia', 'date_of_birth': '2023-05-02', 'place_of_birth': 'home'})
+
+    export_record_type(db, 'birth', root, row_group_size=2)
+
+    parquet = pq.ParquetFile(os.path.join(partition_folder(root, 'Oromia', '2015'), 'part-0.parquet'))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column('weight_kg').to_pylist() == ['3,4', '3.2', '3,4', '3.2', '3,4', None]
+    assert table.column('place_of_birth').to_pylist() == [None] * 5 + ['home']
+
+def test_a_failed_full_export_leaves_the_previous_one_in_place(db, tmp_path, monkeypatch):
+    root = str(tmp_path)
+    insert_birth(db, 'Abebe', 'Oromia', '2023-05-01')
+    export_record_type(db, 'birth', root)
+    insert_birth(db, 'Almaz', 'Amhara', '2023-05-01')
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    monkeypatch.setattr('app.parquet_export.write_partition', fail)
+    with pytest.raises(OSError):
+        export_record_type(db, 'birth', root, full=True)
+    monkeypatch.undo()
+
+    assert exported_names(root, 'Oromia', '2015') == ['Abebe']
+    assert os.listdir(root) == ['record_type=birth']
+
+    db.birth_records.delete_many({'child_first_name': 'Abebe'})
+    assert export_record_type(db, 'birth', root, full=True) == 1
+    assert exported_names(root, 'Amhara', '2015') == ['Almaz']
+    assert not os.path.exists(partition_folder(root, 'Oromia', '2015'))
+    assert os.listdir(root) == ['record_type=birth']
@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from app.rate_limit import MemoryBackend, MongoBackend, RateLimiter
+
+RULES = [('ip:10.0.0.5', 30, 60), ('email:clerk@example.com', 5, 900)]
+
+@pytest.fixture(params=['memory', 'mongo'])
+def limiter(request, db):
+    backend = MemoryBackend() if request.param == 'memory' else MongoBackend(db)
+    return RateLimiter(backend)
+
+def test_the_attempt_over_the_limit_is_rejected_with_a_wait(limiter):
+    for _ in range(5):
+        assert limiter.acquire(RULES)[0] == 0
+    retry_after, attempts = limiter.acquire(RULES)
+    assert 0 < retry_after <= 901
+    assert attempts == []
+
+def test_rejected_and_released_attempts_do_not_count(limiter):
+    for _ in range(5):
+        limiter.acquire(RULES)
+    limiter.acquire(RULES)
+    limiter.reset('email:clerk@example.com')
+    _, attempts = limiter.acquire(RULES)
+    limiter.release(attempts)
+    for _ in range(5):
+        assert limiter.acquire(RULES)[0] == 0
+    assert limiter.acquire(RULES)[0] > 0
+
+def test_concurrent_attempts_cannot_all_pass_the_check():
+    limiter = RateLimiter(MemoryBackend())
+    barrier = threading.Barrier(20)
+    allowed = []
+
+    def attempt():
+        barrier.wait()
+        if not limiter.acquire(RULES)[0]:
+            allowed.append(1)
+
+    threads = [threading.Thread(target=attempt) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(allowed) == 5
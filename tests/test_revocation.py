@@ -0,0 +1,66 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.revocation import RevocationStore, issue_claims
+
+LIFETIME = timedelta(days=7)
+
+@pytest.fixture
+def make_store(db):
+    # A long interval keeps the background sync thread asleep; the tests call sync() themselves
+    def make_store(**options):
+        store = RevocationStore(db, sync_interval=3600, **options)
+        store.is_revoked({})
+        return store
+    return make_store
+
+def token(user_id='u1', jti='jti-1', **claims):
+    return {'sub': user_id, 'jti': jti, 'iat': int(time.time()), **claims}
+
+def test_a_revoked_token_is_seen_by_another_process_after_it_syncs(make_store):
+    first, second = make_store(), make_store()
+    expires_at = datetime.utcnow() + timedelta(minutes=15)
+
+    first.revoke('jti-1', expires_at, user_id='u1', reason='logout')
+
+    assert first.is_revoked(token())
+    assert not second.is_revoked(token())
+    second.sync()
+    assert second.is_revoked(token())
+    assert not second.is_revoked(token(jti='jti-2'))
+
+def test_a_user_revocation_covers_tokens_issued_before_it_only(make_store):
+    first, second = make_store(), make_store()
+    before = token(**issue_claims())
+    legacy = token(jti='jti-legacy')
+    time.sleep(0.002)
+
+    first.revoke_user('u1', LIFETIME, reason='role_changed')
+    second.sync()
+    time.sleep(0.002)
+    # Issued in the same second as the revocation, but after it
+    after = token(jti='jti-2', **issue_claims())
+
+    for store in (first, second):
+        assert store.is_revoked(before)
+        assert store.is_revoked(legacy)
+        assert not store.is_revoked(after)
+        assert not store.is_revoked(token(user_id='u2', **issue_claims()))
+
+def test_a_rebuild_drops_expired_revocations(db, make_store):
+    first = make_store()
+    first.revoke('jti-live', datetime.utcnow() + timedelta(minutes=15))
+    first.revoke('jti-expired', datetime.utcnow() - timedelta(seconds=1))
+    db.revoked_users.insert_one({
+        '_id': 'u2', 'revoked_at': datetime.utcnow() - timedelta(days=8), 'expires_at': datetime.utcnow() - timedelta(days=1)
+    })
+
+    # rebuild_interval=0: every sync reloads what is still unexpired
+    second = make_store(rebuild_interval=0)
+    second.sync()
+
+    assert second.is_revoked(token(jti='jti-live'))
+    assert 'jti-expired' not in second._bloom
+    assert not second.is_revoked(token(user_id='u2', jti='jti-other', iat=0))